@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from enum import Enum, unique
+import logging
+import random
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+LOG = logging.getLogger(__name__)
+
+# Share of the backoff delay that is randomized, spreads the retries of callers that failed together
+DEFAULT_JITTER = 0.5
+
+
+@unique
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a failing service and probes it again after a backoff.
+
+    The breaker opens after `failure_threshold` consecutive failures. Once the
+    backoff has elapsed a single probe is let through (half-open), its success
+    closes the breaker while its failure opens it again for twice as long, up
+    to `max_delay`. A probe that never reports back is replaced by a new one
+    after the same backoff.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        base_delay: float,
+        max_delay: float,
+        failure_threshold: int = 1,
+        jitter: float = DEFAULT_JITTER,
+        on_state_change: Callable[[BreakerState], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.name = name
+        self.__base_delay = base_delay
+        self.__max_delay = max_delay
+        self.__failure_threshold = failure_threshold
+        self.__jitter = jitter
+        self.__on_state_change = on_state_change
+        self.__clock = clock
+        self.__rng = rng
+        self.__state = BreakerState.CLOSED
+        self.__failures = 0
+        self.__openings = 0
+        self.__retry_delay = 0.0
+        self.__retry_at = 0.0
+
+    def configure(self, *, base_delay: float, max_delay: float) -> None:
+        self.__base_delay = base_delay
+        self.__max_delay = max(base_delay, max_delay)
+
+    @property
+    def state(self) -> BreakerState:
+        return self.__state
+
+    @property
+    def retry_delay(self) -> float:
+        """Backoff applied when the breaker last opened, in seconds."""
+        return self.__retry_delay
+
+    def can_request(self) -> bool:
+        """Whether a request would be let through, without claiming the probe."""
+        return self.__state is BreakerState.CLOSED or self.__clock() >= self.__retry_at
+
+    def before_request(self) -> bool:
+        """Claim the right to send a request, turning into the probe when due."""
+        if not self.can_request():
+            return False
+        if self.__state is not BreakerState.CLOSED:
+            # Wait as long again before replacing a probe that never reports back
+            self.__retry_at = self.__clock() + self.__retry_delay
+            self.__set_state(BreakerState.HALF_OPEN)
+        return True
+
+    def seconds_until_retry(self) -> float | None:
+        """Seconds until a request is let through again, None while closed."""
+        if self.__state is BreakerState.CLOSED:
+            return None
+        return max(self.__retry_at - self.__clock(), 0.0)
+
+    def record_success(self) -> None:
+        self.__failures = 0
+        self.__openings = 0
+        self.__set_state(BreakerState.CLOSED)
+
+    def release(self) -> None:
+        """Give back a claimed probe without an outcome, so the next request probes."""
+        if self.__state is BreakerState.HALF_OPEN:
+            self.__retry_at = self.__clock()
+
+    def record_failure(self) -> None:
+        self.__failures += 1
+        if (
+            self.__state is BreakerState.HALF_OPEN
+            or self.__failures >= self.__failure_threshold
+        ):
+            self.__open()
+
+    def __open(self) -> None:
+        delay = min(self.__base_delay * (2**self.__openings), self.__max_delay)
+        self.__openings += 1
+        # Equal jitter: keep part of the backoff, randomize the rest
+        self.__retry_delay = delay * (1 - self.__jitter * self.__rng())
+        self.__retry_at = self.__clock() + self.__retry_delay
+        LOG.info(
+            "Circuit breaker of %s opened, retrying in %.1f seconds",
+            self.name,
+            self.__retry_delay,
+        )
+        self.__set_state(BreakerState.OPEN)
+
+    def __set_state(self, state: BreakerState) -> None:
+        if state is self.__state:
+            return
+        self.__state = state
+        if self.__on_state_change is not None:
+            self.__on_state_change(state)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Final
 
 if TYPE_CHECKING:
     from zoneinfo import ZoneInfo
@@ -19,8 +19,29 @@ class TransportProtocol(Enum):
     TLS = "tcp", True
 
 
+class SaicAccount:
+    def __init__(
+        self,
+        *,
+        username: str,
+        password: str,
+        phone_country_code: str | None = None,
+    ) -> None:
+        self.username: Final = username
+        self.password: Final = password
+        self.__phone_country_code: Final = phone_country_code
+
+    @property
+    def username_is_email(self) -> bool:
+        return "@" in self.username
+
+    @property
+    def phone_country_code(self) -> str | None:
+        return None if self.username_is_email else self.__phone_country_code
+
+
 class Configuration:
-    def __init__(self) -> None:
+    def __init__(self) -> None:  # noqa: PLR0915
         self.saic_user: str | None = None
         self.saic_password: str | None = None
         self.__saic_phone_country_code: str | None = None
@@ -29,7 +50,14 @@ class Configuration:
         self.saic_tenant_id: str = "459771"
         self.saic_relogin_delay: int = 15 * 60  # in seconds
         self.saic_read_timeout: float = 10.0  # in seconds
+        self.saic_poll_call_timeout: float = 60.0  # in seconds
+        self.saic_alarm_registration_concurrency: int = 4
+        self.saic_api_rate_limit: float = 5.0  # in requests per second
+        # How long a vehicle command waits for a newer value of the same setting
+        self.command_coalescing_window: float = 1.0  # in seconds
         self.saic_user_timezone: ZoneInfo | None = None
+        # Additional accounts served by this gateway, see the accounts property
+        self.saic_accounts: list[SaicAccount] = []
         self.battery_capacity_map: dict[str, float] = {}
         self.mqtt_host: str | None = None
         self.mqtt_port: int = 1883
@@ -41,6 +69,8 @@ class Configuration:
         self.mqtt_client_id: str = "saic-python-mqtt-gateway"
         self.mqtt_topic: str = "saic"
         self.mqtt_allow_dots_in_topic: bool = True
+        self.mqtt_publish_cache_enabled: bool = False
+        self.mqtt_publish_cache_refresh_interval: int = 60 * 60  # in seconds
         self.charging_stations_by_vin: dict[str, ChargingStation] = {}
         self.anonymized_publishing: bool = False
         self.messages_request_interval: int = 60  # in seconds
@@ -48,8 +78,19 @@ class Configuration:
         self.ha_discovery_enabled: bool = True
         self.ha_discovery_prefix: str = "homeassistant"
         self.ha_show_unavailable: bool = True
+        self.ha_device_discovery: bool = False
+        self.ha_discovery_rate: float = 50.0
         self.charge_dynamic_polling_min_percentage: float = 1.0
         self.publish_raw_api_data: bool = False
+        # Capture one in every N calls, or only the failed ones
+        self.raw_api_data_sample_rate: int = 1
+        self.raw_api_data_errors_only: bool = False
+        self.raw_api_data_max_body_size: int = 64 * 1024  # in characters
+        # Where the gateway keeps state that should survive a restart
+        self.state_directory: str | None = None
+        # Serve the Prometheus metrics over HTTP when a port is set
+        self.metrics_port: int | None = None
+        self.metrics_host: str = "127.0.0.1"
 
         # ABRP Integration
         self.abrp_token_map: dict[str, str] = {}
@@ -70,6 +111,27 @@ class Configuration:
     def username_is_email(self) -> bool:
         return self.saic_user is not None and "@" in self.saic_user
 
+    @property
+    def accounts(self) -> list[SaicAccount]:
+        """All the SAIC accounts served by this gateway.
+
+        The account configured with saic_user and saic_password, if any, comes first.
+        """
+        accounts = []
+        if self.saic_user and self.saic_password:
+            accounts.append(
+                SaicAccount(
+                    username=self.saic_user,
+                    password=self.saic_password,
+                    phone_country_code=self.saic_phone_country_code,
+                )
+            )
+        known_usernames = {a.username for a in accounts}
+        accounts.extend(
+            a for a in self.saic_accounts if a.username not in known_usernames
+        )
+        return accounts
+
     @property
     def ha_lwt_topic(self) -> str:
         return f"{self.ha_discovery_prefix}/status"
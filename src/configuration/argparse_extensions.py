@@ -106,6 +106,14 @@ def check_positive_float(value: str) -> float:
     return fvalue
 
 
+def check_non_negative_float(value: str) -> float:
+    fvalue = float(value)
+    if fvalue < 0:
+        msg = f"{fvalue} is an invalid non-negative float value"
+        raise argparse.ArgumentTypeError(msg)
+    return fvalue
+
+
 def check_bool(value: str) -> bool:
     return str(value).lower() in ["true", "1", "yes", "y"]
 
@@ -7,12 +7,13 @@ import logging
 from pathlib import Path
 import urllib.parse
 
-from configuration import Configuration, TransportProtocol
+from configuration import Configuration, SaicAccount, TransportProtocol
 from configuration.argparse_extensions import (
     ArgumentHelpFormatter,
     EnvDefault,
     cfg_value_to_dict,
     check_bool,
+    check_non_negative_float,
     check_positive,
     check_positive_float,
     check_timezone,
@@ -72,6 +73,12 @@ def __setup_gateway_features(args: Namespace, config: Configuration) -> None:
         raise SystemExit(msg) from ve
     if args.account_refresh_interval:
         config.account_refresh_interval = args.account_refresh_interval
+    if args.state_directory:
+        config.state_directory = args.state_directory
+    if args.metrics_port:
+        config.metrics_port = args.metrics_port
+    if args.metrics_host:
+        config.metrics_host = args.metrics_host
 
 
 def __setup_openwb(args: Namespace, config: Configuration) -> None:
@@ -87,6 +94,12 @@ def __setup_mqtt(args: Namespace, config: Configuration) -> None:
     config.mqtt_client_id = args.mqtt_client_id
     config.mqtt_topic = args.mqtt_topic
     config.mqtt_allow_dots_in_topic = args.mqtt_allow_dots_in_topic
+    if args.mqtt_publish_cache_enabled is not None:
+        config.mqtt_publish_cache_enabled = args.mqtt_publish_cache_enabled
+    if args.mqtt_publish_cache_refresh_interval:
+        config.mqtt_publish_cache_refresh_interval = (
+            args.mqtt_publish_cache_refresh_interval
+        )
     __parse_mqtt_transport(args, config)
 
 
@@ -128,8 +141,23 @@ def __setup_saic_api(args: Namespace, config: Configuration) -> None:
         config.saic_relogin_delay = args.saic_relogin_delay
     if args.saic_read_timeout:
         config.saic_read_timeout = args.saic_read_timeout
+    if args.saic_poll_call_timeout:
+        config.saic_poll_call_timeout = args.saic_poll_call_timeout
+    if args.saic_alarm_registration_concurrency:
+        config.saic_alarm_registration_concurrency = (
+            args.saic_alarm_registration_concurrency
+        )
+    if args.saic_api_rate_limit:
+        config.saic_api_rate_limit = args.saic_api_rate_limit
+    if args.command_coalescing_window is not None:
+        config.command_coalescing_window = args.command_coalescing_window
     if args.saic_user_timezone is not None:
         config.saic_user_timezone = args.saic_user_timezone
+    if args.saic_accounts_file:
+        __process_saic_accounts_file(config, args.saic_accounts_file)
+    if not config.accounts:
+        msg = "Please configure a SAIC username and password or a SAIC accounts file"
+        raise SystemExit(msg)
 
 
 def __setup_home_assistant(args: Namespace, config: Configuration) -> None:
@@ -137,8 +165,18 @@ def __setup_home_assistant(args: Namespace, config: Configuration) -> None:
         config.ha_discovery_enabled = args.ha_discovery_enabled
     if args.publish_raw_api_data is not None:
         config.publish_raw_api_data = args.publish_raw_api_data
+    if args.raw_api_data_sample_rate is not None:
+        config.raw_api_data_sample_rate = args.raw_api_data_sample_rate
+    if args.raw_api_data_errors_only is not None:
+        config.raw_api_data_errors_only = args.raw_api_data_errors_only
+    if args.raw_api_data_max_body_size is not None:
+        config.raw_api_data_max_body_size = args.raw_api_data_max_body_size
     if args.ha_show_unavailable is not None:
         config.ha_show_unavailable = args.ha_show_unavailable
+    if args.ha_device_discovery is not None:
+        config.ha_device_discovery = args.ha_device_discovery
+    if args.ha_discovery_rate is not None:
+        config.ha_discovery_rate = args.ha_discovery_rate
     if args.ha_discovery_prefix:
         config.ha_discovery_prefix = args.ha_discovery_prefix
 
@@ -265,6 +303,26 @@ def __add_mqtt_argument_group(
         default=True,
         type=check_bool,
     )
+    mqtt.add_argument(
+        "--mqtt-publish-cache",
+        help="""Skip retained publishes whose payload did not change since the last publish.""",
+        dest="mqtt_publish_cache_enabled",
+        required=False,
+        action=EnvDefault,
+        envvar="MQTT_PUBLISH_CACHE",
+        default=False,
+        type=check_bool,
+    )
+    mqtt.add_argument(
+        "--mqtt-publish-cache-refresh-interval",
+        help="""How often in seconds unchanged values are published again when the publish cache is enabled.""",
+        default=3600,
+        dest="mqtt_publish_cache_refresh_interval",
+        required=False,
+        action=EnvDefault,
+        envvar="MQTT_PUBLISH_CACHE_REFRESH_INTERVAL",
+        type=check_positive,
+    )
     return mqtt
 
 
@@ -291,7 +349,7 @@ def __add_saic_api_argument_group(
         "--saic-user",
         help="""The SAIC user name.""",
         dest="saic_user",
-        required=True,
+        required=False,
         action=EnvDefault,
         envvar="SAIC_USER",
         type=str,
@@ -301,11 +359,21 @@ def __add_saic_api_argument_group(
         "--saic-password",
         help="""The SAIC password.""",
         dest="saic_password",
-        required=True,
+        required=False,
         action=EnvDefault,
         envvar="SAIC_PASSWORD",
         type=str,
     )
+    saic_api.add_argument(
+        "--saic-accounts-json",
+        help="""Additional SAIC accounts to serve from this gateway.
+        JSON file with a list of objects with username, password and the optional phoneCountryCode""",
+        dest="saic_accounts_file",
+        required=False,
+        action=EnvDefault,
+        envvar="SAIC_ACCOUNTS_JSON",
+        type=str,
+    )
     saic_api.add_argument(
         "--saic-phone-country-code",
         help="""The SAIC phone country code.""",
@@ -364,6 +432,45 @@ def __add_saic_api_argument_group(
         envvar="SAIC_READ_TIMEOUT",
         type=check_positive_float,
     )
+    saic_api.add_argument(
+        "--saic-poll-call-timeout",
+        help="""How long to wait for each SAIC API call of a vehicle poll cycle, in seconds.""",
+        dest="saic_poll_call_timeout",
+        required=False,
+        action=EnvDefault,
+        envvar="SAIC_POLL_CALL_TIMEOUT",
+        type=check_positive_float,
+    )
+    saic_api.add_argument(
+        "--saic-alarm-registration-concurrency",
+        help="""How many vehicles can register for alarm messages at the same time.""",
+        default=4,
+        dest="saic_alarm_registration_concurrency",
+        required=False,
+        action=EnvDefault,
+        envvar="SAIC_ALARM_REGISTRATION_CONCURRENCY",
+        type=check_positive,
+    )
+    saic_api.add_argument(
+        "--saic-api-rate-limit",
+        help="""How many SAIC API requests each account can send per second. Vehicle commands are served first when requests queue up.""",
+        default=5.0,
+        dest="saic_api_rate_limit",
+        required=False,
+        action=EnvDefault,
+        envvar="SAIC_API_RATE_LIMIT",
+        type=check_positive_float,
+    )
+    saic_api.add_argument(
+        "--command-coalescing-window",
+        help="""How long a vehicle command waits for a newer value of the same setting, in seconds. Only the last value of a burst, e.g. from a temperature slider, is sent to the car. Set to 0 to send commands right away.""",
+        default=1.0,
+        dest="command_coalescing_window",
+        required=False,
+        action=EnvDefault,
+        envvar="COMMAND_COALESCING_WINDOW",
+        type=check_non_negative_float,
+    )
     saic_api.add_argument(
         "--saic-user-timezone",
         help="""Force the account timezone instead of trusting the SAIC API value.
@@ -396,6 +503,34 @@ def __add_saic_api_argument_group(
         default=24 * 60 * 60,
         type=check_positive,
     )
+    saic_api.add_argument(
+        "--state-directory",
+        help="""Directory where the gateway keeps state that should survive a restart.""",
+        dest="state_directory",
+        required=False,
+        action=EnvDefault,
+        envvar="STATE_DIRECTORY",
+        type=str,
+    )
+    saic_api.add_argument(
+        "--metrics-port",
+        help="""Port of the HTTP endpoint serving the gateway metrics in the Prometheus format. Disabled by default.""",
+        dest="metrics_port",
+        required=False,
+        action=EnvDefault,
+        envvar="METRICS_PORT",
+        type=check_positive,
+    )
+    saic_api.add_argument(
+        "--metrics-host",
+        help="""Address the metrics endpoint listens on.""",
+        default="127.0.0.1",
+        dest="metrics_host",
+        required=False,
+        action=EnvDefault,
+        envvar="METRICS_HOST",
+        type=str,
+    )
     saic_api.add_argument(
         "--charge-min-percentage",
         help="""How many percentage points we should try to refresh the charge state.""",
@@ -416,6 +551,36 @@ def __add_saic_api_argument_group(
         default=False,
         type=check_bool,
     )
+    saic_api.add_argument(
+        "--raw-api-data-sample-rate",
+        help="""Publish the raw data of one in every N API calls.""",
+        default="1",
+        dest="raw_api_data_sample_rate",
+        required=False,
+        action=EnvDefault,
+        envvar="RAW_API_DATA_SAMPLE_RATE",
+        type=check_positive,
+    )
+    saic_api.add_argument(
+        "--raw-api-data-errors-only",
+        help="""Publish the raw data of the failed API calls only.""",
+        default=False,
+        dest="raw_api_data_errors_only",
+        required=False,
+        action=EnvDefault,
+        envvar="RAW_API_DATA_ERRORS_ONLY",
+        type=check_bool,
+    )
+    saic_api.add_argument(
+        "--raw-api-data-max-body-size",
+        help="""Truncate the raw request and response bodies to this many characters.""",
+        default="65536",
+        dest="raw_api_data_max_body_size",
+        required=False,
+        action=EnvDefault,
+        envvar="RAW_API_DATA_MAX_BODY_SIZE",
+        type=check_positive,
+    )
     return saic_api
 
 
@@ -473,6 +638,26 @@ def __add_homeassistant_argument_group(
         default=True,
         type=check_bool,
     )
+    homeassistant_integration.add_argument(
+        "--ha-device-discovery",
+        help="""Publish one Home Assistant discovery message per device instead of one per entity.""",
+        dest="ha_device_discovery",
+        required=False,
+        action=EnvDefault,
+        envvar="HA_DEVICE_DISCOVERY",
+        default=False,
+        type=check_bool,
+    )
+    homeassistant_integration.add_argument(
+        "--ha-discovery-rate",
+        help="""How many Home Assistant discovery messages to send per second when Home Assistant comes online.""",
+        dest="ha_discovery_rate",
+        required=False,
+        action=EnvDefault,
+        envvar="HA_DISCOVERY_RATE",
+        default=50.0,
+        type=check_positive_float,
+    )
     return homeassistant_integration
 
 
@@ -593,3 +778,28 @@ def __process_charging_stations_file(config: Configuration, json_file: str) -> N
     except json.JSONDecodeError as e:
         msg = f"Reading {json_file} failed"
         raise MqttGatewayException(msg) from e
+
+
+def __process_saic_accounts_file(config: Configuration, json_file: str) -> None:
+    try:
+        with Path(json_file).open(encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError as e:
+        msg = f"File {json_file} does not exist"
+        raise MqttGatewayException(msg) from e
+    except json.JSONDecodeError as e:
+        msg = f"Reading {json_file} failed"
+        raise MqttGatewayException(msg) from e
+
+    try:
+        config.saic_accounts = [
+            SaicAccount(
+                username=item["username"],
+                password=item["password"],
+                phone_country_code=item.get("phoneCountryCode"),
+            )
+            for item in data
+        ]
+    except (KeyError, TypeError) as e:
+        msg = f"Invalid SAIC account entry in {json_file}"
+        raise MqttGatewayException(msg) from e
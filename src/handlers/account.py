@@ -0,0 +1,474 @@
+from __future__ import annotations
+
+import asyncio
+from asyncio import Task
+import contextlib
+import datetime
+import logging
+from typing import TYPE_CHECKING, Any, override
+
+from saic_ismart_client_ng.api.vehicle.alarm import AlarmType
+from saic_ismart_client_ng.model import SaicApiConfiguration
+
+from circuit_breaker import BreakerState, CircuitBreaker
+from handlers.message import MessageHandler
+from handlers.relogin import JOB_ID, ReloginHandler
+from handlers.vehicle import VehicleHandler, VehicleHandlerLocator
+from integrations.home_assistant.gateway_discovery import HomeAssistantGatewayDiscovery
+import mqtt_topics
+from saic_api_limiter import PriorityRateLimiter, RateLimitedSaicApi
+from saic_api_listener import MqttGatewaySaicApiListener
+from state_snapshot import StateSnapshot
+from utils import datetime_to_str, get_gateway_version, parse_timezone
+from vehicle import VehicleState
+from vehicle_info import VehicleInfo
+
+if TYPE_CHECKING:
+    from zoneinfo import ZoneInfo
+
+    from apscheduler.schedulers.base import BaseScheduler
+    from saic_ismart_client_ng.api.vehicle import VinInfo
+
+    from configuration import Configuration, SaicAccount
+    from publisher.core import Publisher
+
+LOG = logging.getLogger(__name__)
+
+PUBLISH_API_RATE_LIMITER_STATS_INTERVAL = 60  # in seconds
+# Consecutive failed polls, across all the vehicles of an account, that stop polling the account
+ACCOUNT_BREAKER_FAILURE_THRESHOLD = 3
+ACCOUNT_BREAKER_BASE_DELAY = 60  # in seconds
+ACCOUNT_BREAKER_MAX_DELAY = 60 * 60  # in seconds
+
+
+class AccountHandler(VehicleHandlerLocator):
+    """Serves the vehicles of a single SAIC account.
+
+    Every account owns its API client, relogin handler and vehicle handlers,
+    while the publisher and the scheduler are shared by the whole gateway.
+    """
+
+    def __init__(
+        self,
+        *,
+        config: Configuration,
+        account: SaicAccount,
+        publisher: Publisher,
+        scheduler: BaseScheduler,
+        state_snapshot: StateSnapshot | None = None,
+    ) -> None:
+        self.configuration = config
+        self.account = account
+        self.publisher = publisher
+        self.__scheduler = scheduler
+        self.__state_snapshot = (
+            state_snapshot if state_snapshot is not None else StateSnapshot()
+        )
+        self.__vehicle_handlers: dict[str, VehicleHandler] = {}
+        self.__vehicle_tasks: list[Task[Any]] = []
+        self.__user_timezone: ZoneInfo | None = config.saic_user_timezone
+        if config.publish_raw_api_data:
+            listener = MqttGatewaySaicApiListener(self.publisher)
+        else:
+            listener = None
+
+        self.saic_api = RateLimitedSaicApi(
+            configuration=SaicApiConfiguration(
+                username=account.username,
+                password=account.password,
+                username_is_email=account.username_is_email,
+                phone_country_code=account.phone_country_code,
+                base_uri=self.configuration.saic_rest_uri,
+                region=self.configuration.saic_region,
+                tenant_id=self.configuration.saic_tenant_id,
+                read_timeout=self.configuration.saic_read_timeout,
+            ),
+            listener=listener,
+            rate_limiter=PriorityRateLimiter(
+                requests_per_second=self.configuration.saic_api_rate_limit
+            ),
+        )
+        self.__account_prefix = f"{account.username}"
+        self.__relogin_handler = ReloginHandler(
+            relogin_relay=self.configuration.saic_relogin_delay,
+            api=self.saic_api,
+            scheduler=self.__scheduler,
+            job_id=f"{JOB_ID}_{account.username}",
+        )
+        self.__gateway_discovery = self.__setup_gateway_discovery()
+        self.__breaker = CircuitBreaker(
+            f"account {account.username}",
+            base_delay=ACCOUNT_BREAKER_BASE_DELAY,
+            max_delay=ACCOUNT_BREAKER_MAX_DELAY,
+            failure_threshold=ACCOUNT_BREAKER_FAILURE_THRESHOLD,
+            on_state_change=self.__on_breaker_state_change,
+        )
+
+    def __setup_gateway_discovery(self) -> HomeAssistantGatewayDiscovery | None:
+        if self.configuration.ha_discovery_enabled:
+            return HomeAssistantGatewayDiscovery(
+                publisher=self.publisher,
+                account_prefix=self.__account_prefix,
+                discovery_prefix=self.configuration.ha_discovery_prefix,
+                device_discovery=self.configuration.ha_device_discovery,
+            )
+        return None
+
+    @property
+    def username(self) -> str:
+        return self.account.username
+
+    async def run(self) -> None:
+        self.__relogin_handler.add_post_login_callback(self.__on_login_success)
+        self.__relogin_handler.add_post_login_callback(self.__refresh_account_data)
+        self.__relogin_handler.add_login_failure_callback(self.__on_login_failure)
+
+        message_request_interval = self.configuration.messages_request_interval
+        await self.__do_initial_login(message_request_interval)
+
+        message_handler = MessageHandler(
+            gateway=self,
+            relogin_handler=self.__relogin_handler,
+            saicapi=self.saic_api,
+            account_breaker=self.__breaker,
+        )
+        snapshot_key = f"accounts/{self.username}/messages"
+        if (snapshot := self.__state_snapshot.restore(snapshot_key)) is not None:
+            message_handler.restore_snapshot(snapshot)
+        self.__state_snapshot.track(snapshot_key, message_handler.to_snapshot)
+        acks_snapshot_key = f"accounts/{self.username}/message_acks"
+        if (snapshot := self.__state_snapshot.restore(acks_snapshot_key)) is not None:
+            message_handler.acknowledger.restore_snapshot(snapshot)
+        self.__state_snapshot.track(
+            acks_snapshot_key, message_handler.acknowledger.to_snapshot
+        )
+
+        self.__scheduler.add_job(
+            func=message_handler.check_for_new_messages,
+            trigger="interval",
+            seconds=message_request_interval,
+            id=f"message_handler_{self.username}",
+            name=f"Check for new messages of {self.username}",
+            max_instances=1,
+        )
+
+        self.__scheduler.add_job(
+            func=self.__refresh_account_data,
+            trigger="interval",
+            seconds=self.configuration.account_refresh_interval,
+            id=f"account_refresh_{self.username}",
+            name=f"Refresh account data of {self.username}",
+            max_instances=1,
+        )
+
+        self.__scheduler.add_job(
+            func=self.__publish_api_rate_limiter_stats,
+            trigger="interval",
+            seconds=PUBLISH_API_RATE_LIMITER_STATS_INTERVAL,
+            id=f"api_rate_limiter_stats_{self.username}",
+            name=f"Publish the SAIC API rate limiter statistics of {self.username}",
+            max_instances=1,
+        )
+
+        # We defer this later in the process so that we can properly configure the gateway and each car via MQTT
+        LOG.info("Enabling MQTT command handling for account %s", self.username)
+        self.publisher.enable_account_commands(self.username)
+
+        await self.__run_until_all_tasks_done()
+
+    async def __fetch_user_timezone(self) -> ZoneInfo | None:
+        try:
+            resp = await self.saic_api.get_user_timezone()
+            if resp.timezone:
+                tz = parse_timezone(resp.timezone)
+                LOG.info("User timezone from API: %s → %s", resp.timezone, tz)
+                return tz
+            LOG.warning("API returned no timezone, using system default")
+        except Exception:
+            LOG.warning(
+                "Failed to fetch user timezone, using system default", exc_info=True
+            )
+        return None
+
+    def __on_breaker_state_change(self, state: BreakerState) -> None:
+        self.__publish_account_str(mqtt_topics.ACCOUNT_CIRCUIT_BREAKER, state.value)
+        # Vehicles waiting for the breaker to close re-evaluate their own schedule
+        for vh in self.vehicle_handlers.values():
+            vh.vehicle_state.notify_refresh_trigger()
+
+    async def __publish_api_rate_limiter_stats(self) -> None:
+        self.publisher.publish_json(
+            self.__get_account_topic(mqtt_topics.INTERNAL_API_RATE_LIMITER),
+            self.saic_api.rate_limiter.stats,
+            retain=False,
+        )
+
+    def __get_account_topic(self, topic: str) -> str:
+        return f"{self.__account_prefix}/{topic}"
+
+    def __publish_account_str(self, topic: str, value: str) -> None:
+        self.publisher.publish_str(self.__get_account_topic(topic), value)
+
+    def __publish_account_int(self, topic: str, value: int) -> None:
+        self.publisher.publish_int(self.__get_account_topic(topic), value)
+
+    async def __refresh_user_timezone(self) -> None:
+        forced_tz = self.configuration.saic_user_timezone
+        api_tz = await self.__fetch_user_timezone()
+        tz: ZoneInfo | None
+        if forced_tz is not None:
+            if api_tz is not None:
+                # Compare offsets at "now": IANA zones (Europe/Rome) and the
+                # API's fixed Etc/GMT zones never compare equal by identity,
+                # but their current UTC offset will match when DST aligns.
+                now = datetime.datetime.now(tz=datetime.UTC)
+                if forced_tz.utcoffset(now) != api_tz.utcoffset(now):
+                    LOG.warning(
+                        "Forced user timezone %s (offset %s) differs from "
+                        "API value %s (offset %s); using forced value",
+                        forced_tz,
+                        forced_tz.utcoffset(now),
+                        api_tz,
+                        api_tz.utcoffset(now),
+                    )
+            tz = forced_tz
+        else:
+            tz = api_tz
+        if tz is not None:
+            self.__user_timezone = tz
+            for vh in self.vehicle_handlers.values():
+                vh.vehicle_state.update_user_timezone(tz)
+        tz_str = (
+            str(self.__user_timezone) if self.__user_timezone is not None else "unknown"
+        )
+        self.__publish_account_str(mqtt_topics.ACCOUNT_USER_TIMEZONE, tz_str)
+
+    async def __on_login_success(self) -> None:
+        now = datetime_to_str(datetime.datetime.now(tz=datetime.UTC))
+        self.__publish_account_str(mqtt_topics.ACCOUNT_LAST_LOGIN, now)
+
+    async def __on_login_failure(self) -> None:
+        now = datetime_to_str(datetime.datetime.now(tz=datetime.UTC))
+        self.__publish_account_str(mqtt_topics.ACCOUNT_LAST_LOGIN_ERROR, now)
+
+    async def __refresh_account_data(self) -> None:
+        await self.__refresh_vehicle_list()
+        await self.__refresh_user_timezone()
+        self.__publish_account_str(
+            mqtt_topics.ACCOUNT_GATEWAY_VERSION,
+            get_gateway_version(),
+        )
+        self.__publish_account_int(
+            mqtt_topics.ACCOUNT_REFRESH_INTERVAL,
+            self.configuration.account_refresh_interval,
+        )
+        self.__publish_account_str(
+            mqtt_topics.ACCOUNT_LAST_REFRESH,
+            datetime_to_str(datetime.datetime.now(tz=datetime.UTC)),
+        )
+        self.publish_gateway_discovery()
+
+    def publish_gateway_discovery(self) -> int:
+        """Return the number of discovery messages sent."""
+        if self.__gateway_discovery is None:
+            return 0
+        self.__gateway_discovery.publish_ha_discovery_messages()
+        return self.__gateway_discovery.sent_count
+
+    def reset_ha_discovery(self) -> None:
+        if self.__gateway_discovery is not None:
+            self.__gateway_discovery.reset()
+        for vin, vh in self.vehicle_handlers.items():
+            LOG.debug(f"Resetting HA discovery for vehicle {vin}")
+            vh.reset_ha_discovery()
+
+    async def __do_initial_login(self, message_request_interval: int) -> None:
+        while True:
+            try:
+                await self.__relogin_handler.login()
+                break
+            except Exception as e:
+                LOG.exception(
+                    "Could not complete initial login of account %s to the SAIC API, retrying in %d seconds",
+                    self.username,
+                    message_request_interval,
+                    exc_info=e,
+                )
+                await asyncio.sleep(message_request_interval)
+
+        while not self.__vehicle_tasks:
+            LOG.warning(
+                "No vehicles were set up for account %s, retrying discovery in %d seconds",
+                self.username,
+                message_request_interval,
+            )
+            await asyncio.sleep(message_request_interval)
+            await self.__refresh_vehicle_list()
+
+    async def __register_alarm_switches(
+        self, alarm_switches: list[AlarmType], vin: str
+    ) -> None:
+        LOG.info(
+            f"Registering for {[x.name for x in alarm_switches]} messages. vin={vin}"
+        )
+        await self.saic_api.set_alarm_switches(alarm_switches=alarm_switches, vin=vin)
+        LOG.info(
+            f"Registered for {[x.name for x in alarm_switches]} messages. vin={vin}"
+        )
+
+    def __create_vehicle_handler(self, vin_info: VinInfo) -> VehicleHandler:
+        vin = vin_info.vin
+        total_battery_capacity = (
+            self.configuration.battery_capacity_map.get(vin, None) if vin else None
+        )
+        info = VehicleInfo(vin_info, total_battery_capacity)
+        account_prefix = f"{self.__account_prefix}/{mqtt_topics.VEHICLES}/{vin}"
+        vehicle_state = VehicleState(
+            self.publisher,
+            self.__scheduler,
+            account_prefix,
+            info,
+            charge_polling_min_percent=self.configuration.charge_dynamic_polling_min_percentage,
+            user_timezone=self.__user_timezone,
+        )
+        snapshot_key = f"vehicles/{vin}"
+        if (snapshot := self.__state_snapshot.restore(snapshot_key)) is not None:
+            vehicle_state.restore_snapshot(snapshot)
+        self.__state_snapshot.track(snapshot_key, vehicle_state.to_snapshot)
+        return VehicleHandler(
+            self.configuration,
+            self.__relogin_handler,
+            self.saic_api,
+            self.publisher,
+            info,
+            vehicle_state,
+            account_breaker=self.__breaker,
+        )
+
+    async def __refresh_vehicle_list(self) -> None:
+        LOG.info("Refreshing vehicle list of account %s", self.username)
+        try:
+            vin_list = await self.saic_api.vehicle_list()
+        except Exception:
+            LOG.warning("Failed to refresh vehicle list", exc_info=True)
+            return
+
+        alarm_switches = list(AlarmType)
+        known_vins = set(self.vehicle_handlers.keys())
+        api_vins = {v.vin for v in vin_list.vinList if v.vin}
+
+        # Registrations run concurrently. New vehicles are queued first and start
+        # polling as soon as their own registration is done.
+        semaphore = asyncio.Semaphore(
+            self.configuration.saic_alarm_registration_concurrency
+        )
+        await asyncio.gather(
+            *(
+                self.__set_up_vehicle(semaphore, alarm_switches, vin, vin_info)
+                for vin_info in vin_list.vinList
+                if (vin := vin_info.vin) and vin not in known_vins
+            ),
+            *(
+                self.__re_register_alarm_switches(semaphore, alarm_switches, vin)
+                for vin in known_vins & api_vins
+            ),
+        )
+
+        # Stop polling removed vehicles and mark them unavailable
+        for vin in known_vins - api_vins:
+            LOG.warning("Vehicle %s no longer in API vehicle list, stopping", vin)
+            vh = self.vehicle_handlers.pop(vin)
+            vh.vehicle_state.mark_failed_refresh()
+            self.__state_snapshot.untrack(f"vehicles/{vin}")
+            task = self.__cancel_vehicle_task(vin)
+            if task is not None:
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+            await vh.close()
+
+    async def __set_up_vehicle(
+        self,
+        semaphore: asyncio.Semaphore,
+        alarm_switches: list[AlarmType],
+        vin: str,
+        vin_info: VinInfo,
+    ) -> None:
+        LOG.info("Setting up vehicle: %s", vin)
+        try:
+            async with semaphore:
+                await self.__register_alarm_switches(alarm_switches, vin)
+            vh = self.__create_vehicle_handler(vin_info)
+            self.vehicle_handlers[vin] = vh
+            self.__start_vehicle_task(vh)
+        except Exception:
+            LOG.warning("Failed to set up new vehicle %s", vin, exc_info=True)
+
+    async def __re_register_alarm_switches(
+        self, semaphore: asyncio.Semaphore, alarm_switches: list[AlarmType], vin: str
+    ) -> None:
+        try:
+            async with semaphore:
+                await self.__register_alarm_switches(alarm_switches, vin)
+        except Exception:
+            LOG.warning(
+                "Failed to re-register alarm switches for vin=%s",
+                vin,
+                exc_info=True,
+            )
+
+    def __start_vehicle_task(self, vh: VehicleHandler) -> None:
+        vin = vh.vin_info.vin
+        task = asyncio.create_task(vh.handle_vehicle(), name=f"handle_vehicle_{vin}")
+        self.__vehicle_tasks.append(task)
+        LOG.info("Started polling task for vehicle %s", vin)
+
+    def __cancel_vehicle_task(self, vin: str) -> Task[Any] | None:
+        task_name = f"handle_vehicle_{vin}"
+        cancelled_task = None
+        remaining = []
+        for t in self.__vehicle_tasks:
+            if t.get_name() == task_name:
+                t.cancel()
+                cancelled_task = t
+            else:
+                remaining.append(t)
+        self.__vehicle_tasks = remaining
+        return cancelled_task
+
+    @override
+    def get_vehicle_handler(self, vin: str) -> VehicleHandler | None:
+        if vin in self.vehicle_handlers:
+            return self.vehicle_handlers[vin]
+        LOG.error(f"No vehicle handler found for VIN {vin}")
+        return None
+
+    @property
+    @override
+    def vehicle_handlers(self) -> dict[str, VehicleHandler]:
+        return self.__vehicle_handlers
+
+    async def __run_until_all_tasks_done(self) -> None:
+        while True:
+            # Clean up completed tasks
+            self.__vehicle_tasks = [t for t in self.__vehicle_tasks if not t.done()]
+            if not self.__vehicle_tasks:
+                await asyncio.sleep(1.0)
+                continue
+
+            done, _pending = await asyncio.wait(
+                self.__vehicle_tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                task_name = task.get_name()
+                if task.cancelled():
+                    LOG.debug(f"{task_name!r} task was cancelled")
+                elif (exception := task.exception()) is not None:
+                    LOG.exception(
+                        f"{task_name!r} task crashed with an exception",
+                        exc_info=exception,
+                    )
+                    raise SystemExit(-1)
+                else:
+                    LOG.warning(
+                        f"{task_name!r} task terminated cleanly with result={task.result()}"
+                    )
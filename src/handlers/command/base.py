@@ -57,6 +57,16 @@ class CommandHandlerBase(metaclass=ABCMeta):
         """
         return False
 
+    @classmethod
+    def is_coalescable(cls) -> bool:
+        """Whether only the last of several quick successive values matters.
+
+        Default False: every command runs. Override to True on handlers that
+        set a value, e.g. a temperature or a level, so that a burst of values
+        from a slider reaches the car as a single command.
+        """
+        return False
+
     @classmethod
     @abstractmethod
     def topic(cls) -> str:
@@ -15,6 +15,11 @@ LOG = logging.getLogger(__name__)
 
 
 class ClimateHeatedSeatsFrontLeftLevelCommand(IntCommandHandler):
+    @classmethod
+    @override
+    def is_coalescable(cls) -> bool:
+        return True
+
     @classmethod
     @override
     def topic(cls) -> str:
@@ -40,6 +45,11 @@ class ClimateHeatedSeatsFrontLeftLevelCommand(IntCommandHandler):
 
 
 class ClimateHeatedSeatsFrontRightLevelCommand(IntCommandHandler):
+    @classmethod
+    @override
+    def is_coalescable(cls) -> bool:
+        return True
+
     @classmethod
     @override
     def topic(cls) -> str:
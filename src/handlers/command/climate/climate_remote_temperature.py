@@ -15,6 +15,11 @@ LOG = logging.getLogger(__name__)
 
 
 class ClimateRemoteTemperatureCommand(IntCommandHandler):
+    @classmethod
+    @override
+    def is_coalescable(cls) -> bool:
+        return True
+
     @classmethod
     @override
     def topic(cls) -> str:
@@ -21,6 +21,11 @@ LOG = logging.getLogger(__name__)
 class DrivetrainChargeCurrentLimitCommand(
     PayloadConvertingCommandHandler[ChargeCurrentLimitCode]
 ):
+    @classmethod
+    @override
+    def is_coalescable(cls) -> bool:
+        return True
+
     @classmethod
     def topic(cls) -> str:
         return mqtt_topics.DRIVETRAIN_CHARGECURRENT_LIMIT_SET
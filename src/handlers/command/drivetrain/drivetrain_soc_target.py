@@ -17,6 +17,11 @@ LOG = logging.getLogger(__name__)
 
 
 class DrivetrainSoCTargetCommand(PayloadConvertingCommandHandler[TargetBatteryCode]):
+    @classmethod
+    @override
+    def is_coalescable(cls) -> bool:
+        return True
+
     @classmethod
     @override
     def topic(cls) -> str:
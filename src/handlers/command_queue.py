@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_COALESCING_WINDOW = 1.0  # in seconds
+
+
+@dataclass(kw_only=True)
+class _PendingCommand:
+    run_at: float
+    on_superseded: Callable[[], None]
+    superseded: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class CommandQueue:
+    """Run the commands of one vehicle one at a time, collapsing repeated values.
+
+    A command with a coalescing key waits for the coalescing window before it
+    runs. When a newer command with the same key arrives before the older one
+    started, the older one is dropped and reported as superseded, and the newer
+    one keeps its deadline, so that a stream of values cannot postpone the
+    command forever. Commands without a key run as soon as the vehicle is free.
+    """
+
+    def __init__(self, *, coalescing_window: float = DEFAULT_COALESCING_WINDOW) -> None:
+        self.__coalescing_window = coalescing_window
+        self.__lock = asyncio.Lock()
+        self.__pending: dict[str, _PendingCommand] = {}
+
+    async def run(
+        self,
+        command: Callable[[], Awaitable[None]],
+        *,
+        coalescing_key: str | None = None,
+        on_superseded: Callable[[], None] | None = None,
+    ) -> bool:
+        """Run the command in turn, return False when a newer one replaced it."""
+        if coalescing_key is None:
+            async with self.__lock:
+                await command()
+            return True
+
+        loop = asyncio.get_running_loop()
+        previous = self.__pending.get(coalescing_key)
+        pending = _PendingCommand(
+            run_at=(
+                previous.run_at
+                if previous is not None
+                else loop.time() + self.__coalescing_window
+            ),
+            on_superseded=on_superseded or (lambda: None),
+        )
+        self.__pending[coalescing_key] = pending
+        if previous is not None:
+            self.__supersede(coalescing_key, previous)
+
+        try:
+            try:
+                # Woken up early when superseded, so that its result is reported right away
+                async with asyncio.timeout_at(pending.run_at):
+                    await pending.superseded.wait()
+                return False
+            except TimeoutError:
+                pass
+
+            async with self.__lock:
+                if pending.superseded.is_set():
+                    return False
+                # From now on a newer value queues up behind this command
+                del self.__pending[coalescing_key]
+                await command()
+            return True
+        finally:
+            if self.__pending.get(coalescing_key) is pending:
+                del self.__pending[coalescing_key]
+
+    def __supersede(self, coalescing_key: str, pending: _PendingCommand) -> None:
+        LOG.info("Command %s superseded by a newer value", coalescing_key)
+        pending.superseded.set()
+        try:
+            pending.on_superseded()
+        except Exception as e:
+            LOG.exception(
+                "Failed to report superseded command %s", coalescing_key, exc_info=e
+            )
@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import datetime
 import logging
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from saic_ismart_client_ng.exceptions import SaicApiException, SaicLogoutException
 
+from handlers.message_ack import MessageAcknowledger
+from metrics import SAIC_API_CALL_DURATION, time_call
+from state_snapshot import datetime_from_snapshot, datetime_to_snapshot
 from utils import ensure_datetime_aware
 from vehicle import RefreshMode
 
@@ -13,11 +16,17 @@ if TYPE_CHECKING:
     from saic_ismart_client_ng import SaicApi
     from saic_ismart_client_ng.api.message.schema import MessageEntity
 
+    from circuit_breaker import CircuitBreaker
     from handlers.relogin import ReloginHandler
     from handlers.vehicle import VehicleHandlerLocator
 
 LOG = logging.getLogger(__name__)
 
+# A quiet account only needs the first small page, a busy one catches up in a few larger pages
+FIRST_PAGE_SIZE = 5
+MAX_PAGE_SIZE = 40
+MAX_MESSAGES = 100
+
 
 class MessageHandler:
     def __init__(
@@ -25,12 +34,35 @@ class MessageHandler:
         gateway: VehicleHandlerLocator,
         relogin_handler: ReloginHandler,
         saicapi: SaicApi,
+        account_breaker: CircuitBreaker | None = None,
     ) -> None:
         self.gateway = gateway
         self.saicapi = saicapi
         self.relogin_handler = relogin_handler
+        self.account_breaker = account_breaker
         self.last_message_ts = datetime.datetime.min.replace(tzinfo=datetime.UTC)
         self.last_message_id: str | int | None = None
+        self.acknowledger = MessageAcknowledger(saicapi)
+
+    def to_snapshot(self) -> dict[str, Any]:
+        return {
+            "last_message_ts": datetime_to_snapshot(self.last_message_ts),
+            "last_message_id": self.last_message_id,
+        }
+
+    def restore_snapshot(self, snapshot: dict[str, Any]) -> None:
+        """Resume from the last message seen by a previous run."""
+        try:
+            last_message_ts = datetime_from_snapshot(snapshot["last_message_ts"])
+            last_message_id = snapshot["last_message_id"]
+        except (KeyError, TypeError, ValueError):
+            LOG.warning("Ignoring malformed message handler snapshot", exc_info=True)
+            return
+        if last_message_id is not None and not isinstance(last_message_id, str | int):
+            LOG.warning(f"Ignoring malformed last message ID {last_message_id!r}")
+            return
+        self.last_message_ts = last_message_ts
+        self.last_message_id = last_message_id
 
     async def check_for_new_messages(self) -> None:
         if self.__should_poll():
@@ -45,10 +77,15 @@ class MessageHandler:
             all_messages = await self.__get_all_alarm_messages()
             LOG.info(f"{len(all_messages)} messages received")
 
-            new_messages = [m for m in all_messages if m.read_status != "read"]
+            # Messages with a pending acknowledgement have already been processed
+            new_messages = [
+                m
+                for m in all_messages
+                if m.read_status != "read" and not self.acknowledger.is_pending(m)
+            ]
             for message in new_messages:
                 LOG.info(message.details)
-                await self.__read_message(message)
+                self.acknowledger.mark_read(message)
 
             latest_message = self.__get_latest_message(all_messages)
             if (
@@ -76,7 +113,9 @@ class MessageHandler:
                 if m.messageType == "323" and m.messageId != self.last_message_id
             ]
             for vehicle_start_message in vehicle_start_messages:
-                await self.__delete_message(vehicle_start_message)
+                self.acknowledger.delete(vehicle_start_message)
+
+            await self.acknowledger.flush()
         except SaicLogoutException as e:
             LOG.warning(
                 "API Client was logged out, scheduling delayed relogin",
@@ -91,29 +130,16 @@ class MessageHandler:
             LOG.exception("MessageHandler poll loop failed unexpectedly", exc_info=e)
 
     async def __get_all_alarm_messages(self) -> list[MessageEntity]:
-        idx = 1
-        all_messages = []
-        max_pages = 100
-        while idx <= max_pages:
+        all_messages: list[MessageEntity] = []
+        seen_message_ids: set[str | int] = set()
+        page_num = 1
+        page_size = FIRST_PAGE_SIZE
+        while len(all_messages) < MAX_MESSAGES:
             try:
-                message_list = await self.saicapi.get_alarm_list(
-                    page_num=idx, page_size=1
-                )
-                if (
-                    message_list is not None
-                    and message_list.messages
-                    and len(message_list.messages) > 0
-                ):
-                    all_messages.extend(message_list.messages)
-                else:
-                    return all_messages
-                oldest_message = self.__get_oldest_message(all_messages)
-                if (
-                    oldest_message is not None
-                    and ensure_datetime_aware(oldest_message.message_time)
-                    < self.last_message_ts
-                ):
-                    return all_messages
+                with time_call(SAIC_API_CALL_DURATION, call="alarmList"):
+                    message_list = await self.saicapi.get_alarm_list(
+                        page_num=page_num, page_size=page_size
+                    )
             except SaicLogoutException:
                 raise
             except Exception as e:
@@ -123,36 +149,42 @@ class MessageHandler:
                     exc_info=e,
                 )
                 return all_messages
-            finally:
-                idx = idx + 1
+
+            page = message_list.messages if message_list is not None else None
+            if not page:
+                return all_messages
+            for message in page:
+                # New messages shift the pages between two calls, skip duplicates
+                if message.messageId is not None:
+                    if message.messageId in seen_message_ids:
+                        continue
+                    seen_message_ids.add(message.messageId)
+                all_messages.append(message)
+
+            if len(page) < page_size or self.__reached_last_seen_message(page):
+                return all_messages
+
+            # Grow the pages geometrically: every page starts where the previous one ended
+            fetched = page_num * page_size
+            page_size = min(fetched, MAX_PAGE_SIZE)
+            page_num = fetched // page_size + 1
         LOG.warning(
-            "Reached max page limit (%d) while fetching alarm messages", max_pages
+            "Reached max message limit (%d) while fetching alarm messages",
+            MAX_MESSAGES,
         )
         return all_messages
 
-    async def __delete_message(self, message: MessageEntity) -> None:
-        try:
-            message_id = message.messageId
-            if message_id is not None:
-                await self.saicapi.delete_message(message_id=message_id)
-                LOG.info(f"{message.title} message with ID {message_id} deleted")
-            else:
-                LOG.warning("Could not delete message '%s' as it has no ID", message)
-        except Exception as e:
-            LOG.exception("Could not delete message from server", exc_info=e)
-
-    async def __read_message(self, message: MessageEntity) -> None:
-        try:
-            message_id = message.messageId
-            if message_id is not None:
-                await self.saicapi.read_message(message_id=message_id)
-                LOG.info(f"{message.title} message with ID {message_id} marked as read")
-            else:
-                LOG.warning(
-                    "Could not mark message '%s' as read as it has not ID", message
-                )
-        except Exception as e:
-            LOG.exception("Could not mark message as read from server", exc_info=e)
+    def __reached_last_seen_message(self, page: list[MessageEntity]) -> bool:
+        if self.last_message_id is not None and any(
+            m.messageId == self.last_message_id for m in page
+        ):
+            return True
+        oldest_message = self.__get_oldest_message(page)
+        return (
+            oldest_message is not None
+            and ensure_datetime_aware(oldest_message.message_time)
+            < self.last_message_ts
+        )
 
     def __should_poll(self) -> bool:
         vehicle_handlers = self.gateway.vehicle_handlers or {}
@@ -172,6 +204,11 @@ class MessageHandler:
                 "Not checking for new messages as we are waiting to log back in"
             )
             return False
+        if self.account_breaker is not None and not self.account_breaker.can_request():
+            LOG.debug(
+                "Not checking for new messages as the SAIC API is failing for this account"
+            )
+            return False
         return True
 
     @staticmethod
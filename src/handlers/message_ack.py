@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+from enum import Enum
+import logging
+from typing import TYPE_CHECKING, Any
+
+from saic_ismart_client_ng.exceptions import SaicLogoutException
+
+from metrics import SAIC_API_CALL_DURATION, time_call
+
+if TYPE_CHECKING:
+    from saic_ismart_client_ng import SaicApi
+    from saic_ismart_client_ng.api.message.schema import MessageEntity
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+class AckAction(Enum):
+    READ = "read"
+    DELETE = "delete"
+
+
+class PendingAck:
+    def __init__(
+        self, action: AckAction, message_id: str | int, title: str | None
+    ) -> None:
+        self.action = action
+        self.message_id = message_id
+        self.title = title
+        self.attempts = 0
+
+
+class MessageAcknowledger:
+    """Marks alarm messages as read or deletes them with a bounded worker pool.
+
+    Acknowledgements stay pending until they succeed, so a failed call is
+    retried on the next flush instead of the message being processed again.
+    An acknowledgement is given up after `max_attempts` failed flushes.
+    """
+
+    def __init__(
+        self,
+        saicapi: SaicApi,
+        *,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> None:
+        self.__saicapi = saicapi
+        self.__max_concurrency = max_concurrency
+        self.__max_attempts = max_attempts
+        self.__pending: dict[tuple[AckAction, str | int], PendingAck] = {}
+
+    def to_snapshot(self) -> dict[str, Any]:
+        return {
+            "pending": [
+                {
+                    "action": ack.action.value,
+                    "message_id": ack.message_id,
+                    "title": ack.title,
+                    "attempts": ack.attempts,
+                }
+                for ack in self.__pending.values()
+            ]
+        }
+
+    def restore_snapshot(self, snapshot: dict[str, Any]) -> None:
+        """Resume the acknowledgements still pending when a previous run stopped."""
+        try:
+            restored = [
+                (
+                    AckAction(entry["action"]),
+                    entry["message_id"],
+                    entry["title"],
+                    int(entry["attempts"]),
+                )
+                for entry in snapshot["pending"]
+            ]
+        except (KeyError, TypeError, ValueError):
+            LOG.warning(
+                "Ignoring malformed message acknowledger snapshot", exc_info=True
+            )
+            return
+        for action, message_id, title, attempts in restored:
+            if not isinstance(message_id, str | int) or (
+                title is not None and not isinstance(title, str)
+            ):
+                LOG.warning(
+                    f"Ignoring malformed pending acknowledgement {message_id!r}"
+                )
+                continue
+            self.__add(action, message_id, title)
+            self.__pending[(action, message_id)].attempts = attempts
+
+    @property
+    def pending_count(self) -> int:
+        return len(self.__pending)
+
+    def is_pending(self, message: MessageEntity) -> bool:
+        return any(
+            (action, message.messageId) in self.__pending for action in AckAction
+        )
+
+    def mark_read(self, message: MessageEntity) -> None:
+        if (message_id := message.messageId) is None:
+            LOG.warning("Could not mark message '%s' as read as it has not ID", message)
+            return
+        # Reading a message that is going to be deleted is pointless
+        if (AckAction.DELETE, message_id) in self.__pending:
+            return
+        self.__add(AckAction.READ, message_id, message.title)
+
+    def delete(self, message: MessageEntity) -> None:
+        if (message_id := message.messageId) is None:
+            LOG.warning("Could not delete message '%s' as it has no ID", message)
+            return
+        self.__pending.pop((AckAction.READ, message_id), None)
+        self.__add(AckAction.DELETE, message_id, message.title)
+
+    def __add(
+        self, action: AckAction, message_id: str | int, title: str | None
+    ) -> None:
+        key = (action, message_id)
+        if key not in self.__pending:
+            self.__pending[key] = PendingAck(action, message_id, title)
+
+    async def flush(self) -> None:
+        """Send every pending acknowledgement.
+
+        Raises SaicLogoutException after all workers are done if the API client
+        got logged out; the affected acknowledgements stay pending.
+        """
+        if not self.__pending:
+            return
+        semaphore = asyncio.Semaphore(self.__max_concurrency)
+        results = await asyncio.gather(
+            *(self.__send(semaphore, ack) for ack in list(self.__pending.values())),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, SaicLogoutException):
+                raise result
+        LOG.debug("%d message acknowledgements still pending", self.pending_count)
+
+    async def __send(self, semaphore: asyncio.Semaphore, ack: PendingAck) -> None:
+        async with semaphore:
+            try:
+                if ack.action == AckAction.READ:
+                    with time_call(SAIC_API_CALL_DURATION, call="readMessage"):
+                        await self.__saicapi.read_message(message_id=ack.message_id)
+                    LOG.info(
+                        f"{ack.title} message with ID {ack.message_id} marked as read"
+                    )
+                else:
+                    with time_call(SAIC_API_CALL_DURATION, call="deleteMessage"):
+                        await self.__saicapi.delete_message(message_id=ack.message_id)
+                    LOG.info(f"{ack.title} message with ID {ack.message_id} deleted")
+            except SaicLogoutException:
+                raise
+            except Exception as e:
+                ack.attempts += 1
+                if ack.attempts < self.__max_attempts:
+                    LOG.warning(
+                        "Could not %s message with ID %s, retrying later (attempt %d of %d)",
+                        ack.action.value,
+                        ack.message_id,
+                        ack.attempts,
+                        self.__max_attempts,
+                        exc_info=e,
+                    )
+                    return
+                LOG.exception(
+                    "Could not %s message with ID %s, giving up",
+                    ack.action.value,
+                    ack.message_id,
+                    exc_info=e,
+                )
+            self.__pending.pop((ack.action, ack.message_id), None)
@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 import logging
 from typing import TYPE_CHECKING
 
+from metrics import OUTCOME_ERROR, OUTCOME_SUCCESS, RELOGINS
+
 if TYPE_CHECKING:
     from collections.abc import Awaitable, Callable
 
@@ -18,9 +20,15 @@ JOB_ID = "relogin_task"
 
 class ReloginHandler:
     def __init__(
-        self, *, relogin_relay: int, api: SaicApi, scheduler: BaseScheduler
+        self,
+        *,
+        relogin_relay: int,
+        api: SaicApi,
+        scheduler: BaseScheduler,
+        job_id: str = JOB_ID,
     ) -> None:
         self.__relogin_relay = relogin_relay
+        self.__job_id = job_id
         self.__scheduler = scheduler
         self.__api = api
         self.__login_task: Job | None = None
@@ -50,7 +58,7 @@ class ReloginHandler:
                 func=self.login,
                 trigger="date",
                 run_date=datetime.now() + timedelta(seconds=self.__relogin_relay),
-                id=JOB_ID,
+                id=self.__job_id,
                 name="Re-login the API client after a set delay",
                 max_instances=1,
             )
@@ -59,8 +67,8 @@ class ReloginHandler:
         """Cancel any pending delayed relogin and login immediately."""
         if self.__login_task is not None:
             LOG.info("Cancelling pending delayed relogin for immediate login")
-            if self.__scheduler.get_job(JOB_ID) is not None:
-                self.__scheduler.remove_job(JOB_ID)
+            if self.__scheduler.get_job(self.__job_id) is not None:
+                self.__scheduler.remove_job(self.__job_id)
             self.__login_task = None
         await self.login()
 
@@ -71,16 +79,18 @@ class ReloginHandler:
                 LOG.info("Logging in to SAIC API")
                 login_response_message = await self.__api.login()
                 LOG.info("Logged in as %s", login_response_message.account)
+                RELOGINS.inc(outcome=OUTCOME_SUCCESS)
                 await self.__run_post_login_callbacks()
             except Exception as e:
+                RELOGINS.inc(outcome=OUTCOME_ERROR)
                 LOG.exception(
                     "Could not login to the SAIC API due to an error", exc_info=e
                 )
                 await self.__run_login_failure_callbacks()
                 raise
             finally:
-                if self.__scheduler.get_job(JOB_ID) is not None:
-                    self.__scheduler.remove_job(JOB_ID)
+                if self.__scheduler.get_job(self.__job_id) is not None:
+                    self.__scheduler.remove_job(self.__job_id)
                 self.__login_task = None
                 self.__login_in_progress = False
 
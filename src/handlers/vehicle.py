@@ -4,23 +4,31 @@ from abc import ABC, abstractmethod
 import asyncio
 import datetime
 import logging
+import time
 from typing import TYPE_CHECKING
 
 from saic_ismart_client_ng.exceptions import SaicApiException, SaicLogoutException
 
+from circuit_breaker import BreakerState
 from exceptions import VehicleStatusDriftException
 from handlers.vehicle_command import VehicleCommandHandler
 from integrations import IntegrationException
-from integrations.abrp.api import AbrpApi
+from integrations.abrp.api import SKIPPED_MISSING_CONFIGURATION, AbrpApi
 from integrations.home_assistant.discovery import HomeAssistantDiscovery
 from integrations.openwb import OpenWBIntegration
 from integrations.osmand.api import OsmAndApi
+from integrations.outbound_queue import OutboundQueue
+from log_config import log_context, log_vin, new_poll_cycle_id
+from metrics import SAIC_API_CALL_DURATION, LoopPhase, time_call
 import mqtt_topics
+from saic_api_limiter import ApiPriority, api_priority_scope
 from saic_api_listener import MqttGatewayAbrpListener, MqttGatewayOsmAndListener
 from status_publisher.vehicle_info import VehicleInfoPublisher
 from vehicle import RefreshMode
 
 if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
     from saic_ismart_client_ng import SaicApi
     from saic_ismart_client_ng.api.vehicle.schema import VehicleStatusResp
     from saic_ismart_client_ng.api.vehicle_charging import (
@@ -28,6 +36,7 @@ if TYPE_CHECKING:
         ScheduledBatteryHeatingResp,
     )
 
+    from circuit_breaker import CircuitBreaker
     from configuration import Configuration
     from handlers.relogin import ReloginHandler
     from publisher.core import Publisher
@@ -42,6 +51,18 @@ if TYPE_CHECKING:
 
 LOG = logging.getLogger(__name__)
 
+# Seconds to wait before re-checking the refresh conditions when no trigger can wake us up
+RELOGIN_CHECK_INTERVAL = 1.0
+# Lower bound for a wait, avoids spinning when a refresh deadline is due but not yet passed
+MIN_REFRESH_WAIT = 0.01
+CONFIGURATION_COMPLETION_DELAY = datetime.timedelta(seconds=10)
+
+# Keys of the per-call latency report published after each poll cycle
+POLL_LATENCY_VEHICLE_STATUS = "vehicleStatus"
+POLL_LATENCY_CHARGE_STATUS = "chargeStatus"
+POLL_LATENCY_BATTERY_HEATING_SCHEDULE = "batteryHeatingSchedule"
+POLL_LATENCY_TOTAL = "total"
+
 
 class VehicleHandler:
     def __init__(
@@ -52,6 +73,8 @@ class VehicleHandler:
         publisher: Publisher,
         vin_info: VehicleInfo,
         vehicle_state: VehicleState,
+        *,
+        account_breaker: CircuitBreaker | None = None,
     ) -> None:
         self.configuration = config
         self.relogin_handler = relogin_handler
@@ -59,14 +82,24 @@ class VehicleHandler:
         self.publisher = publisher
         self.vin_info = vin_info
         self.vehicle_prefix = self.publisher.get_topic(
-            f"{self.configuration.saic_user}/vehicles/{self.vin_info.vin}", True
+            vehicle_state.mqtt_vin_prefix, True
         )
         self.vehicle_state = vehicle_state
+        self.__account_breaker = account_breaker
+        self.__loop_phase = LoopPhase(vin_info.vin)
         self.__ha_discovery = self.__setup_ha_discovery(vehicle_state, vin_info, config)
 
         self.openwb_integration = self.__setup_openwb(config, vin_info, publisher)
         self.abrp_api = self.__setup_abrp(config, vin_info)
         self.osmand_api = self.__setup_osmand(config, vin_info)
+        self.abrp_queue: OutboundQueue[
+            tuple[VehicleStatusResp, ChrgMgmtDataResp | None]
+        ] = OutboundQueue("ABRP", self.__send_abrp, on_result=self.__on_abrp_result)
+        self.osmand_queue: OutboundQueue[
+            tuple[VehicleStatusResp, ChrgMgmtDataResp | None]
+        ] = OutboundQueue(
+            "OsmAnd", self.__send_osmand, on_result=self.__on_osmand_result
+        )
         self.__vehicle_info_publisher = VehicleInfoPublisher(
             self.vin_info, self.publisher, self.vehicle_prefix
         )
@@ -76,6 +109,7 @@ class VehicleHandler:
             relogin_handler=relogin_handler,
             mqtt_topic=self.configuration.mqtt_topic,
             vehicle_prefix=self.vehicle_prefix,
+            coalescing_window=self.configuration.command_coalescing_window,
         )
 
     def __setup_openwb(
@@ -123,6 +157,9 @@ class VehicleHandler:
         )
 
     async def close(self) -> None:
+        self.__loop_phase.clear()
+        await self.abrp_queue.close()
+        await self.osmand_queue.close()
         try:
             await self.abrp_api.close()
         finally:
@@ -130,6 +167,8 @@ class VehicleHandler:
                 await self.osmand_api.close()
 
     async def handle_vehicle(self) -> None:
+        # Runs in its own task, every log line of the loop is about this vehicle
+        log_vin.set(self.vin_info.vin)
         start_time = datetime.datetime.now(tz=datetime.UTC)
         self.__vehicle_info_publisher.publish()
         self.vehicle_state.notify_car_activity()
@@ -142,108 +181,297 @@ class VehicleHandler:
                 self.vehicle_state.configure_missing()
 
             if self.__should_poll():
+                self.__loop_phase.set(LoopPhase.POLLING)
+                # Whether the SAIC API answered, None when the poll tells nothing about it
+                api_available: bool | None = None
                 try:
                     LOG.debug("Polling vehicle status")
-                    await self.__polling()
+                    await self.poll()
+                    api_available = True
                 except SaicLogoutException as e:
                     self.vehicle_state.mark_failed_refresh()
-                    if self.vehicle_state.refresh_mode == RefreshMode.FORCE:
-                        LOG.warning(
-                            "API Client was logged out during forced refresh,"
-                            " attempting immediate relogin",
-                            exc_info=e,
-                        )
-                        try:
-                            await self.relogin_handler.force_login()
-                        except Exception:
-                            LOG.warning(
-                                "Immediate relogin failed, scheduling delayed relogin"
-                            )
-                            self.relogin_handler.relogin()
-                    else:
-                        LOG.warning(
-                            "API Client was logged out, scheduling delayed relogin",
-                            exc_info=e,
-                        )
-                        self.relogin_handler.relogin()
+                    await self.__handle_logout(e)
                 except SaicApiException as e:
                     self.vehicle_state.mark_failed_refresh()
+                    api_available = False
                     LOG.exception(
                         "handle_vehicle loop failed during SAIC API call", exc_info=e
                     )
                 except VehicleStatusDriftException as e:
                     self.vehicle_state.mark_failed_refresh()
+                    # The API answered, only with stale data
+                    api_available = True
                     LOG.error(
                         "Skipping vehicle status update: %s",
                         e,
                     )
+                except TimeoutError:
+                    self.vehicle_state.mark_failed_refresh()
+                    api_available = False
+                    LOG.warning(
+                        "Timed out after %.1f seconds waiting for the vehicle status",
+                        self.configuration.saic_poll_call_timeout,
+                    )
                 except IntegrationException as ae:
+                    # Integrations only run once the SAIC API answered
+                    api_available = True
                     LOG.exception(
                         "handle_vehicle loop failed during integration processing",
                         exc_info=ae,
                     )
                 except Exception as e:
                     self.vehicle_state.mark_failed_refresh()
+                    api_available = False
                     LOG.exception(
                         "handle_vehicle loop failed with an unexpected exception",
                         exc_info=e,
                     )
                 finally:
+                    # Also on logouts and cancellations, a claimed probe must never dangle
+                    self.__record_account_outcome(api_available)
                     self.publish_ha_discovery_messages(force=False)
             else:
-                # car not active, wait a second
-                await asyncio.sleep(1.0)
+                # car not active, sleep until the next refresh is due or something wakes us up
+                self.__loop_phase.set(self.__idle_loop_phase())
+                await self.vehicle_state.wait_for_refresh_trigger(
+                    self.__seconds_until_next_check(start_time)
+                )
 
-    async def __polling(self) -> None:
-        (
-            vehicle_status,
-            vehicle_status_processing_result,
-        ) = await self.update_vehicle_status()
+    async def __handle_logout(self, e: SaicLogoutException) -> None:
+        if self.vehicle_state.refresh_mode == RefreshMode.FORCE:
+            LOG.warning(
+                "API Client was logged out during forced refresh,"
+                " attempting immediate relogin",
+                exc_info=e,
+            )
+            try:
+                await self.relogin_handler.force_login()
+            except Exception:
+                LOG.warning("Immediate relogin failed, scheduling delayed relogin")
+                self.relogin_handler.relogin()
+        else:
+            LOG.warning(
+                "API Client was logged out, scheduling delayed relogin",
+                exc_info=e,
+            )
+            self.relogin_handler.relogin()
+
+    async def poll(self) -> None:
+        """Fetch the vehicle status once and publish it, regardless of the refresh schedule."""
+        priority = (
+            ApiPriority.CHARGING_POLL
+            if self.vehicle_state.is_charging
+            else ApiPriority.POLL
+        )
+        # The fetch tasks inherit the priority and the log context when they are created
+        with (
+            api_priority_scope(priority),
+            log_context(vin=self.vin_info.vin, poll_cycle=new_poll_cycle_id()),
+        ):
+            await self.__poll_vehicle()
+
+    async def __poll_vehicle(self) -> None:
+        # Fire all the SAIC API calls at once, the cycle then takes as long as the slowest one
+        latencies: dict[str, float] = {}
+        poll_start = time.perf_counter()
+        vehicle_status_fetch = asyncio.create_task(
+            self.__timed_fetch(
+                POLL_LATENCY_VEHICLE_STATUS,
+                self.saic_api.get_vehicle_status,
+                latencies,
+            )
+        )
+        charge_status_fetch: asyncio.Task[ChrgMgmtDataResp] | None = None
+        battery_heating_fetch: asyncio.Task[ScheduledBatteryHeatingResp] | None = None
+        if self.vin_info.is_ev:
+            charge_status_fetch = asyncio.create_task(
+                self.__timed_fetch(
+                    POLL_LATENCY_CHARGE_STATUS,
+                    self.saic_api.get_vehicle_charging_management_data,
+                    latencies,
+                )
+            )
+            battery_heating_fetch = asyncio.create_task(
+                self.__timed_fetch(
+                    POLL_LATENCY_BATTERY_HEATING_SCHEDULE,
+                    self.saic_api.get_vehicle_battery_heating_schedule,
+                    latencies,
+                )
+            )
+        else:
+            LOG.debug("Skipping EV-related updates as the vehicle is not an EV")
+
+        try:
+            await self.__process_poll_results(
+                vehicle_status_fetch, charge_status_fetch, battery_heating_fetch
+            )
+        finally:
+            for fetch in (
+                vehicle_status_fetch,
+                charge_status_fetch,
+                battery_heating_fetch,
+            ):
+                if fetch is None:
+                    continue
+                if not fetch.done():
+                    fetch.cancel()
+                elif not fetch.cancelled():
+                    # Results we did not get to use must still be retrieved to avoid asyncio warnings
+                    fetch.exception()
+            latencies[POLL_LATENCY_TOTAL] = round(time.perf_counter() - poll_start, 3)
+            LOG.debug(
+                "Poll cycle latencies for vehicle %s: %s", self.vin_info.vin, latencies
+            )
+            self.publisher.publish_json(
+                f"{self.vehicle_prefix}/{mqtt_topics.INTERNAL_POLL_LATENCY}", latencies
+            )
+
+    async def __process_poll_results(
+        self,
+        vehicle_status_fetch: asyncio.Task[VehicleStatusResp],
+        charge_status_fetch: asyncio.Task[ChrgMgmtDataResp] | None,
+        battery_heating_fetch: asyncio.Task[ScheduledBatteryHeatingResp] | None,
+    ) -> None:
+        vehicle_status = await vehicle_status_fetch
+        # Each result goes out as one burst as soon as it is in, so that the
+        # vehicle status never waits for the slower charge status
+        with self.publisher.transaction():
+            # The vehicle status must be processed first, the charge status relies on its mileage
+            vehicle_status_processing_result = self.__process_vehicle_status(
+                vehicle_status
+            )
 
         charge_status = None
-        charge_status_processing_result = None
-        if self.vin_info.is_ev:
+        if charge_status_fetch is not None:
             try:
-                (
-                    charge_status,
-                    charge_status_processing_result,
-                ) = await self.update_charge_status()
+                charge_status = await charge_status_fetch
+            except TimeoutError:
+                LOG.warning("Timed out updating charge status")
             except Exception as e:
                 LOG.exception("Error updating charge status", exc_info=e)
 
+        with self.publisher.transaction():
+            charge_status_processing_result = None
+            if charge_status is not None:
+                try:
+                    charge_status_processing_result = self.__process_charge_status(
+                        charge_status
+                    )
+                except Exception as e:
+                    LOG.exception("Error updating charge status", exc_info=e)
+
+            self.vehicle_state.update_data_conflicting_in_vehicle_and_bms(
+                vehicle_status_processing_result, charge_status_processing_result
+            )
+
+            self.vehicle_state.mark_successful_refresh()
+            LOG.info("Refreshing vehicle status succeeded...")
+
+            self.__refresh_openwb(
+                vehicle_status_processing_result, charge_status_processing_result
+            )
+
+        # Third-party uploads run in the background, polling never waits for them
+        if self.abrp_api.abrp_user_token is not None:
+            self.abrp_queue.put((vehicle_status, charge_status))
+        else:
+            # Nothing to upload, only report why
+            self.publisher.publish_str(
+                f"{self.vehicle_prefix}/{mqtt_topics.INTERNAL_ABRP}",
+                SKIPPED_MISSING_CONFIGURATION,
+            )
+        if self.osmand_api is not None:
+            self.osmand_queue.put((vehicle_status, charge_status))
+
+        # The heating schedule is the least important result, never let it delay the rest
+        if battery_heating_fetch is not None:
             try:
-                await self.update_scheduled_battery_heating_status()
+                self.__process_scheduled_battery_heating_status(
+                    await battery_heating_fetch
+                )
+            except TimeoutError:
+                LOG.warning("Timed out updating scheduled battery heating status")
             except Exception as e:
                 LOG.exception(
                     "Error updating scheduled battery heating status", exc_info=e
                 )
-        else:
-            LOG.debug("Skipping EV-related updates as the vehicle is not an EV")
 
-        self.vehicle_state.update_data_conflicting_in_vehicle_and_bms(
-            vehicle_status_processing_result, charge_status_processing_result
-        )
-
-        self.vehicle_state.mark_successful_refresh()
-        LOG.info("Refreshing vehicle status succeeded...")
-
-        self.__refresh_openwb(
-            vehicle_status_processing_result, charge_status_processing_result
-        )
-        await self.__refresh_abrp(charge_status, vehicle_status)
-        await self.__refresh_osmand(charge_status, vehicle_status)
+    async def __timed_fetch[T](
+        self,
+        name: str,
+        fetch: Callable[[str], Awaitable[T]],
+        latencies: dict[str, float],
+    ) -> T:
+        start = time.perf_counter()
+        try:
+            with time_call(SAIC_API_CALL_DURATION, call=name):
+                async with asyncio.timeout(self.configuration.saic_poll_call_timeout):
+                    return await fetch(self.vin_info.vin)
+        finally:
+            latencies[name] = round(time.perf_counter() - start, 3)
 
     def __should_poll(self) -> bool:
+        if (
+            self.relogin_handler.relogin_in_progress
+            or not self.vehicle_state.is_complete()
+        ):
+            return False
+        breaker = self.__account_breaker
+        # Checked first so that a pending forced refresh survives an account outage
+        if breaker is not None and not breaker.can_request():
+            return False
+        if not self.vehicle_state.should_refresh():
+            return False
+        return breaker is None or breaker.before_request()
+
+    def __record_account_outcome(self, api_available: bool | None) -> None:
+        if self.__account_breaker is None:
+            return
+        if api_available is None:
+            self.__account_breaker.release()
+        elif api_available:
+            self.__account_breaker.record_success()
+        else:
+            self.__account_breaker.record_failure()
+
+    def __idle_loop_phase(self) -> str:
+        if self.relogin_handler.relogin_in_progress:
+            return LoopPhase.RELOGIN
+        if not self.vehicle_state.is_complete():
+            return LoopPhase.CONFIGURING
+        breaker = self.__account_breaker
+        if (
+            breaker is not None and not breaker.can_request()
+        ) or self.vehicle_state.refresh_breaker_state is not BreakerState.CLOSED:
+            return LoopPhase.BACKOFF
+        return LoopPhase.WAITING
+
+    def __should_complete_configuration(self, start_time: datetime.datetime) -> bool:
         return (
-            not self.relogin_handler.relogin_in_progress
-            and self.vehicle_state.is_complete()
-            and self.vehicle_state.should_refresh()
+            not self.vehicle_state.is_complete()
+            and datetime.datetime.now(tz=datetime.UTC)
+            > start_time + CONFIGURATION_COMPLETION_DELAY
         )
 
-    def __should_complete_configuration(self, start_time: datetime.datetime) -> bool:
-        return not self.vehicle_state.is_complete() and datetime.datetime.now(
-            tz=datetime.UTC
-        ) > start_time + datetime.timedelta(seconds=10)
+    def __seconds_until_next_check(self, start_time: datetime.datetime) -> float | None:
+        if self.relogin_handler.relogin_in_progress:
+            # The relogin handler does not notify us when it is done
+            return RELOGIN_CHECK_INTERVAL
+        if not self.vehicle_state.is_complete():
+            configuration_deadline = start_time + CONFIGURATION_COMPLETION_DELAY
+            remaining = (
+                configuration_deadline - datetime.datetime.now(tz=datetime.UTC)
+            ).total_seconds()
+            return max(remaining, MIN_REFRESH_WAIT)
+        seconds = self.vehicle_state.seconds_until_refresh()
+        if seconds is None:
+            return None
+        if (
+            self.__account_breaker is not None
+            and (retry := self.__account_breaker.seconds_until_retry()) is not None
+        ):
+            seconds = max(seconds, retry)
+        return max(seconds, MIN_REFRESH_WAIT)
 
     def __refresh_openwb(
         self,
@@ -256,46 +484,58 @@ class VehicleHandler:
             vehicle_status_processing_result, charge_status_processing_result
         )
 
-    async def __refresh_osmand(
-        self,
-        charge_status: ChrgMgmtDataResp | None,
-        vehicle_status: VehicleStatusResp,
-    ) -> None:
+    async def __send_osmand(
+        self, statuses: tuple[VehicleStatusResp, ChrgMgmtDataResp | None]
+    ) -> tuple[bool, str]:
         if not self.osmand_api:
-            return
-        refreshed, response = await self.osmand_api.update_osmand(
-            vehicle_status, charge_status
-        )
+            return False, "OsmAnd request skipped because of missing configuration"
+        vehicle_status, charge_status = statuses
+        return await self.osmand_api.update_osmand(vehicle_status, charge_status)
+
+    def __on_osmand_result(self, refreshed: bool, response: str) -> None:
         self.publisher.publish_str(
             f"{self.vehicle_prefix}/{mqtt_topics.INTERNAL_OSMAND}", response
         )
+        self.publisher.publish_json(
+            f"{self.vehicle_prefix}/{mqtt_topics.INTERNAL_OSMAND_QUEUE}",
+            self.osmand_queue.metrics,
+        )
         if refreshed:
             LOG.info("Refreshing OsmAnd status succeeded...")
         else:
             LOG.info(f"OsmAnd not refreshed, reason {response}")
 
-    async def __refresh_abrp(
-        self, charge_status: ChrgMgmtDataResp | None, vehicle_status: VehicleStatusResp
-    ) -> None:
-        abrp_refreshed, abrp_response = await self.abrp_api.update_abrp(
-            vehicle_status, charge_status
-        )
+    async def __send_abrp(
+        self, statuses: tuple[VehicleStatusResp, ChrgMgmtDataResp | None]
+    ) -> tuple[bool, str]:
+        vehicle_status, charge_status = statuses
+        return await self.abrp_api.update_abrp(vehicle_status, charge_status)
+
+    def __on_abrp_result(self, refreshed: bool, response: str) -> None:
         self.publisher.publish_str(
-            f"{self.vehicle_prefix}/{mqtt_topics.INTERNAL_ABRP}", abrp_response
+            f"{self.vehicle_prefix}/{mqtt_topics.INTERNAL_ABRP}", response
         )
-        if abrp_refreshed:
+        self.publisher.publish_json(
+            f"{self.vehicle_prefix}/{mqtt_topics.INTERNAL_ABRP_QUEUE}",
+            self.abrp_queue.metrics,
+        )
+        if refreshed:
             LOG.info("Refreshing ABRP status succeeded...")
         else:
-            LOG.info(f"ABRP not refreshed, reason {abrp_response}")
-
-    def publish_ha_discovery_messages(self, *, force: bool = False) -> None:
-        if self.__ha_discovery is not None:
-            LOG.info(
-                f"Sending HA discovery messages for {self.vin_info.vin} (Force: {force})"
-            )
-            published = self.__ha_discovery.publish_ha_discovery_messages(force=force)
-            if published:
-                self.vehicle_state.republish_command_states()
+            LOG.info(f"ABRP not refreshed, reason {response}")
+
+    def publish_ha_discovery_messages(self, *, force: bool = False) -> int:
+        """Return the number of discovery messages sent."""
+        if self.__ha_discovery is None:
+            return 0
+        LOG.info(
+            f"Sending HA discovery messages for {self.vin_info.vin} (Force: {force})"
+        )
+        published = self.__ha_discovery.publish_ha_discovery_messages(force=force)
+        if not published:
+            return 0
+        self.vehicle_state.republish_command_states()
+        return self.__ha_discovery.sent_count
 
     def reset_ha_discovery(self) -> None:
         if self.__ha_discovery is not None:
@@ -304,41 +544,63 @@ class VehicleHandler:
     async def update_vehicle_status(
         self,
     ) -> tuple[VehicleStatusResp, VehicleStatusRespProcessingResult]:
-        LOG.info("Updating vehicle status")
         vehicle_status_response = await self.saic_api.get_vehicle_status(
             self.vin_info.vin
         )
-        result = self.vehicle_state.handle_vehicle_status(vehicle_status_response)
+        result = self.__process_vehicle_status(vehicle_status_response)
         return (vehicle_status_response, result)
 
     async def update_charge_status(
         self,
     ) -> tuple[ChrgMgmtDataResp, ChrgMgmtDataRespProcessingResult]:
-        LOG.info("Updating charging status")
         charge_mgmt_data = await self.saic_api.get_vehicle_charging_management_data(
             self.vin_info.vin
         )
-        result = self.vehicle_state.handle_charge_status(charge_mgmt_data)
+        result = self.__process_charge_status(charge_mgmt_data)
         return charge_mgmt_data, result
 
     async def update_scheduled_battery_heating_status(
         self,
     ) -> ScheduledBatteryHeatingResp:
-        LOG.info("Updating scheduled battery heating status")
         scheduled_battery_heating_status = (
             await self.saic_api.get_vehicle_battery_heating_schedule(self.vin_info.vin)
         )
-        self.vehicle_state.handle_scheduled_battery_heating_status(
+        self.__process_scheduled_battery_heating_status(
             scheduled_battery_heating_status
         )
         return scheduled_battery_heating_status
 
+    # Shared by the poll cycle and the single update methods above
+    def __process_vehicle_status(
+        self, vehicle_status: VehicleStatusResp
+    ) -> VehicleStatusRespProcessingResult:
+        LOG.info("Updating vehicle status")
+        return self.vehicle_state.handle_vehicle_status(vehicle_status)
+
+    def __process_charge_status(
+        self, charge_status: ChrgMgmtDataResp
+    ) -> ChrgMgmtDataRespProcessingResult:
+        LOG.info("Updating charging status")
+        return self.vehicle_state.handle_charge_status(charge_status)
+
+    def __process_scheduled_battery_heating_status(
+        self, scheduled_battery_heating_status: ScheduledBatteryHeatingResp
+    ) -> None:
+        LOG.info("Updating scheduled battery heating status")
+        self.vehicle_state.handle_scheduled_battery_heating_status(
+            scheduled_battery_heating_status
+        )
+
     async def handle_mqtt_command(
         self, *, topic: str, payload: str, retained: bool = False
     ) -> None:
-        await self.__command_handler.handle_mqtt_command(
-            topic=topic, payload=payload, retained=retained
-        )
+        with (
+            api_priority_scope(ApiPriority.COMMAND),
+            log_context(vin=self.vin_info.vin),
+        ):
+            await self.__command_handler.handle_mqtt_command(
+                topic=topic, payload=payload, retained=retained
+            )
 
     def __setup_ha_discovery(
         self, vehicle_state: VehicleState, vin_info: VehicleInfo, config: Configuration
@@ -2,12 +2,15 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 import logging
+import time
 from typing import TYPE_CHECKING, Any, Final
 
 from saic_ismart_client_ng.exceptions import SaicApiException, SaicLogoutException
 
 from exceptions import MqttGatewayException
 from handlers.command import ALL_COMMAND_HANDLERS, CommandHandlerBase
+from handlers.command_queue import DEFAULT_COALESCING_WINDOW, CommandQueue
+from metrics import COMMAND_DURATION, OUTCOME_ERROR, OUTCOME_SUCCESS
 import mqtt_topics
 from vehicle import RefreshMode
 
@@ -42,6 +45,7 @@ class VehicleCommandHandler:
         relogin_handler: ReloginHandler,
         mqtt_topic: str,
         vehicle_prefix: str,
+        coalescing_window: float = DEFAULT_COALESCING_WINDOW,
     ) -> None:
         self.vehicle_state: Final[VehicleState] = vehicle_state
         self.saic_api: Final[SaicApi] = saic_api
@@ -52,6 +56,16 @@ class VehicleCommandHandler:
             handler.topic(): handler(self.saic_api, self.vehicle_state)
             for handler in ALL_COMMAND_HANDLERS
         }
+        # The full topics of the known commands, analyzed once rather than per message
+        self.__commands_by_topic: dict[
+            str, tuple[_MqttCommandTopic, CommandHandlerBase]
+        ] = {}
+        for handler in self.__command_handlers.values():
+            analyzed_topic = self.__get_command_topics(
+                f"{self.global_mqtt_topic}/{self.vehicle_prefix}/{handler.topic()}"
+            )
+            self.__commands_by_topic[analyzed_topic.command] = (analyzed_topic, handler)
+        self.__command_queue = CommandQueue(coalescing_window=coalescing_window)
 
     @property
     def publisher(self) -> Publisher:
@@ -94,8 +108,12 @@ class VehicleCommandHandler:
     async def handle_mqtt_command(
         self, *, topic: str, payload: str, retained: bool = False
     ) -> None:
-        analyzed_topic = self.__get_command_topics(topic)
-        handler = self.__command_handlers.get(analyzed_topic.command_no_vin)
+        handler: CommandHandlerBase | None
+        if (known_command := self.__commands_by_topic.get(topic)) is not None:
+            analyzed_topic, handler = known_command
+        else:
+            analyzed_topic = self.__get_command_topics(topic)
+            handler = self.__command_handlers.get(analyzed_topic.command_no_vin)
         if not handler:
             msg = f"No handler found for command topic {analyzed_topic.command_no_vin}"
             self.__report_command_failure(
@@ -103,13 +121,45 @@ class VehicleCommandHandler:
                 result_topic=analyzed_topic.response_no_global,
                 detail=msg,
             )
-        else:
-            await self.__execute_mqtt_command_handler(
+            return
+
+        if retained and not handler.is_replayable_when_retained():
+            # A retained `/set` for an action-bearing command would re-fire the
+            # action on every gateway restart. Drop it before invoking the
+            # handler. Only handlers that explicitly opt in via
+            # ``replayable_when_retained = True`` see retained replays.
+            LOG.warning(
+                "Dropping retained replay for non-replayable command %s on %s; "
+                "this command should not have been published with retain=true",
+                handler.name(),
+                analyzed_topic.command_no_vin,
+            )
+            return
+
+        async def execute() -> None:
+            start = time.perf_counter()
+            succeeded = await self.__execute_mqtt_command_handler(
                 handler=handler,
                 payload=payload,
                 analyzed_topic=analyzed_topic,
                 retained=retained,
             )
+            COMMAND_DURATION.observe(
+                time.perf_counter() - start,
+                command=analyzed_topic.command_no_vin,
+                outcome=OUTCOME_SUCCESS if succeeded else OUTCOME_ERROR,
+            )
+
+        # Commands reach the car one at a time, only the last of a burst of values does
+        await self.__command_queue.run(
+            execute,
+            coalescing_key=(
+                analyzed_topic.command_no_vin if handler.is_coalescable() else None
+            ),
+            on_superseded=lambda: self.publisher.publish_str(
+                analyzed_topic.response_no_global, "Superseded"
+            ),
+        )
 
     async def __execute_mqtt_command_handler(
         self,
@@ -118,24 +168,13 @@ class VehicleCommandHandler:
         payload: str,
         analyzed_topic: _MqttCommandTopic,
         retained: bool,
-    ) -> None:
+    ) -> bool:
+        """Return whether the command succeeded."""
         topic = analyzed_topic.command_no_vin
         topic_no_global = analyzed_topic.command_no_global
         result_topic = analyzed_topic.response_no_global
 
-        if retained and not handler.is_replayable_when_retained():
-            # A retained `/set` for an action-bearing command would re-fire the
-            # action on every gateway restart. Drop it before invoking the
-            # handler. Only handlers that explicitly opt in via
-            # ``replayable_when_retained = True`` see retained replays.
-            LOG.warning(
-                "Dropping retained replay for non-replayable command %s on %s; "
-                "this command should not have been published with retain=true",
-                handler.name(),
-                topic,
-            )
-            return
-
+        succeeded = True
         try:
             execution_result = await handler.handle(payload, retained=retained)
             self.publisher.publish_str(result_topic, "Success")
@@ -149,6 +188,7 @@ class VehicleCommandHandler:
             self.__report_command_failure(
                 command=topic, result_topic=result_topic, detail=e.message, exc=e
             )
+            succeeded = False
         except SaicLogoutException:
             LOG.warning(
                 "API Client was logged out, attempting immediate relogin and retry"
@@ -162,7 +202,7 @@ class VehicleCommandHandler:
                     detail=f"relogin failed ({login_err})",
                     exc=login_err,
                 )
-                return
+                return False
             try:
                 execution_result = await handler.handle(payload, retained=retained)
                 self.publisher.publish_str(result_topic, "Success")
@@ -180,10 +220,12 @@ class VehicleCommandHandler:
                     detail=str(retry_err),
                     exc=retry_err,
                 )
+                succeeded = False
         except SaicApiException as se:
             self.__report_command_failure(
                 command=topic, result_topic=result_topic, detail=se.message, exc=se
             )
+            succeeded = False
         except Exception as e:
             self.__report_command_failure(
                 command=topic,
@@ -191,6 +233,8 @@ class VehicleCommandHandler:
                 detail="unexpected error",
                 exc=e,
             )
+            succeeded = False
+        return succeeded
 
     def __get_command_topics(self, topic: str) -> _MqttCommandTopic:
         global_topic_removed = topic.removeprefix(self.global_mqtt_topic).removeprefix(
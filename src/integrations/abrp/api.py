@@ -19,6 +19,8 @@ if TYPE_CHECKING:
 
 LOG = logging.getLogger(__name__)
 
+SKIPPED_MISSING_CONFIGURATION = "ABRP request skipped because of missing configuration"
+
 
 class AbrpApiException(IntegrationException):
     def __init__(self, msg: str) -> None:
@@ -153,7 +155,7 @@ class AbrpApi:
                 msg = f"HTTP error: {e}"
                 raise AbrpApiException(msg) from e
         else:
-            return False, "ABRP request skipped because of missing configuration"
+            return False, SKIPPED_MISSING_CONFIGURATION
 
     @staticmethod
     def __extract_basic_vehicle_status(
@@ -18,7 +18,8 @@ class HaCustomAvailabilityConfig:
 
     def to_dict(self) -> dict[str, Any]:
         return {
-            "availability": [r.to_dict() for r in set(self.__rules)],
+            # Deduplicated in order, a set would not give a stable payload
+            "availability": [r.to_dict() for r in dict.fromkeys(self.__rules)],
             "availability_mode": self.__mode,
         }
 
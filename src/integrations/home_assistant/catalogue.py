@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+from publisher.retained_fingerprints import fingerprint
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterator
+
+
+class HaDiscoveryMessage(NamedTuple):
+    topic: str
+    payload: str
+    payload_fingerprint: str
+
+
+class HaDiscoveryCatalogue:
+    """The serialized discovery messages of one device.
+
+    Built once and republished as is until the `capabilities` it was built
+    from change. An empty payload removes the config from Home Assistant.
+    """
+
+    def __init__(self, capabilities: Hashable) -> None:
+        self.capabilities = capabilities
+        self.__messages: list[HaDiscoveryMessage] = []
+
+    def add(self, topic: str, payload: str) -> None:
+        self.__messages.append(
+            HaDiscoveryMessage(topic, payload, fingerprint(payload) if payload else "")
+        )
+
+    def __iter__(self) -> Iterator[HaDiscoveryMessage]:
+        return iter(self.__messages)
+
+    def __len__(self) -> int:
+        return len(self.__messages)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any
+
+from integrations.home_assistant.base import _ORIGIN
+from publisher.topic_router import TopicRouter
+
+if TYPE_CHECKING:
+    from publisher.core import Publisher
+
+LOG = logging.getLogger(__name__)
+
+# Attributes shared by every component, they are set once on the document
+_SHARED_ATTRIBUTES = ("device", "o")
+
+
+class HaDeviceDiscoveryDocument:
+    """All the components of one Home Assistant device, as published by device-based discovery.
+
+    See https://www.home-assistant.io/integrations/mqtt/#device-discovery-payload
+    """
+
+    def __init__(self) -> None:
+        self.__device: dict[str, Any] = {}
+        self.__components: dict[str, dict[str, Any]] = {}
+
+    def add_component(
+        self, unique_id: str, platform: str, config: dict[str, Any]
+    ) -> None:
+        self.__device = config.get("device", self.__device)
+        self.__components[self.__component_id(unique_id, platform)] = {
+            "p": platform
+        } | {k: v for k, v in config.items() if k not in _SHARED_ATTRIBUTES}
+
+    def remove_component(self, unique_id: str, platform: str) -> None:
+        # Home Assistant removes a component whose config only holds the platform
+        self.__components[self.__component_id(unique_id, platform)] = {"p": platform}
+
+    @staticmethod
+    def __component_id(unique_id: str, platform: str) -> str:
+        # Some entities move between platforms while keeping their unique ID
+        return f"{platform}_{unique_id}"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "dev": self.__device,
+            "o": _ORIGIN,
+            "cmps": self.__components,
+        }
+
+
+def entity_config_filter(discovery_prefix: str, node_id: str) -> str:
+    return f"{discovery_prefix}/+/{node_id}/+/config"
+
+
+def device_config_topic(discovery_prefix: str, node_id: str) -> str:
+    return f"{discovery_prefix}/device/{node_id}/config"
+
+
+def clear_retained_configs(publisher: Publisher, topic_filter: str) -> None:
+    """Delete the discovery configs matching `topic_filter` that the broker retains.
+
+    Used when switching between entity and device based discovery, Home
+    Assistant would otherwise see every entity twice.
+    """
+    router: TopicRouter[str] = TopicRouter()
+    router.add(topic_filter, topic_filter)
+    for topic in publisher.retained_fingerprints.received_topics():
+        if router.match(topic) is not None:
+            LOG.info(f"Removing Home Assistant discovery config {topic}")
+            publisher.clear_topic(topic, no_prefix=True)
@@ -14,7 +14,15 @@ from integrations.home_assistant.availability import (
     HaCustomAvailabilityEntry,
 )
 from integrations.home_assistant.base import _ORIGIN, HomeAssistantDiscoveryBase
+from integrations.home_assistant.catalogue import HaDiscoveryCatalogue
+from integrations.home_assistant.device_discovery import (
+    HaDeviceDiscoveryDocument,
+    clear_retained_configs,
+    device_config_topic,
+    entity_config_filter,
+)
 from integrations.home_assistant.utils import decode_as_utf8, snake_case
+from metrics import HA_DISCOVERY_MESSAGES
 import mqtt_topics
 from publisher.mqtt_publisher import MqttPublisher
 from vehicle import RefreshMode, VehicleState
@@ -52,6 +60,23 @@ class HomeAssistantDiscovery(HomeAssistantDiscoveryBase):
             rules=[self.__system_availability, self.__vehicle_availability]
         )
         self.published = False
+        # Number of discovery messages sent by the last publication
+        self.sent_count = 0
+        node_id = f"{self.vin}_mg"
+        self.__entity_config_filter = entity_config_filter(
+            self.__discovery_prefix, node_id
+        )
+        self.__device_config_topic = device_config_topic(
+            self.__discovery_prefix, node_id
+        )
+        self.__device_discovery = configuration.ha_device_discovery
+        self.__device_document: HaDeviceDiscoveryDocument | None = None
+        # Built on first publish, see __get_catalogue
+        self.__catalogue = HaDiscoveryCatalogue(capabilities=None)
+        # Lets the publisher skip the configs that the broker still retains
+        publisher = self.__vehicle_state.publisher
+        publisher.track_retained_topics(self.__entity_config_filter)
+        publisher.track_retained_topics(self.__device_config_topic)
 
     def publish_ha_discovery_messages(self, *, force: bool = False) -> bool:
         if not self.__vehicle_state.is_complete():
@@ -66,13 +91,74 @@ class HomeAssistantDiscovery(HomeAssistantDiscoveryBase):
             )
             return False
 
-        self.__publish_ha_discovery_messages_real()
+        catalogue = self.__get_catalogue()
+        publisher = self.__vehicle_state.publisher
+        if self.__device_discovery:
+            clear_retained_configs(publisher, self.__entity_config_filter)
+        else:
+            clear_retained_configs(publisher, self.__device_config_topic)
+        LOG.debug("Publishing Home Assistant discovery messages")
+        skipped_count = 0
+        for message in catalogue:
+            if not message.payload:
+                publisher.publish_str(message.topic, "", no_prefix=True)
+            elif not publisher.publish_str_unless_retained(
+                message.topic,
+                message.payload,
+                no_prefix=True,
+                payload_fingerprint=message.payload_fingerprint,
+            ):
+                skipped_count += 1
+        publisher.retained_fingerprints.save()
+        if skipped_count:
+            LOG.debug(
+                "Skipped %d Home Assistant discovery messages the broker still retains",
+                skipped_count,
+            )
+        self.sent_count = len(catalogue) - skipped_count
+        HA_DISCOVERY_MESSAGES.inc(self.sent_count, scope="vehicle")
         self.published = True
         return True
 
-    def __publish_ha_discovery_messages_real(self) -> None:
-        LOG.debug("Publishing Home Assistant discovery messages")
+    def __get_catalogue(self) -> HaDiscoveryCatalogue:
+        capabilities = self.__capabilities()
+        if self.__catalogue.capabilities != capabilities:
+            LOG.debug(f"Building Home Assistant discovery messages for {self.vin}")
+            self.__catalogue = HaDiscoveryCatalogue(capabilities)
+            try:
+                self.__build_catalogue()
+            except Exception:
+                self.__catalogue = HaDiscoveryCatalogue(capabilities=None)
+                raise
+        return self.__catalogue
+
+    def __capabilities(self) -> tuple[bool | int, ...]:
+        # Every vehicle property that changes the discovery messages
+        vin_info = self.__vin_info
+        return (
+            vin_info.supports_target_soc,
+            vin_info.has_fossil_fuel,
+            vin_info.has_sunroof,
+            vin_info.has_level_heated_seats,
+            vin_info.has_on_off_heated_seats,
+            vin_info.min_ac_temperature,
+            vin_info.max_ac_temperature,
+        )
+
+    def __build_catalogue(self) -> None:
+        self.__device_document = (
+            HaDeviceDiscoveryDocument() if self.__device_discovery else None
+        )
+        self.__add_discovery_messages()
+        if self.__device_document is not None:
+            self.__catalogue.add(
+                self.__device_config_topic,
+                self.__vehicle_state.publisher.dict_to_anonymized_json(
+                    self.__device_document.to_dict()
+                ),
+            )
 
+    def __add_discovery_messages(self) -> None:
         # Gateway Control
         self.__publish_gateway_sensors()
 
@@ -967,11 +1053,15 @@ class HomeAssistantDiscovery(HomeAssistantDiscoveryBase):
             )
             | payload
         )
+        if self.__device_document is not None:
+            self.__device_document.add_component(unique_id, sensor_type, final_payload)
+            return f"{sensor_type}.{unique_id}"
         ha_topic = (
             f"{self.__discovery_prefix}/{sensor_type}/{vin}_mg/{unique_id}/config"
         )
-        self.__vehicle_state.publisher.publish_json(
-            ha_topic, final_payload, no_prefix=True
+        self.__catalogue.add(
+            ha_topic,
+            self.__vehicle_state.publisher.dict_to_anonymized_json(final_payload),
         )
         return f"{sensor_type}.{unique_id}"
 
@@ -981,10 +1071,13 @@ class HomeAssistantDiscovery(HomeAssistantDiscoveryBase):
     ) -> None:
         vin = self.vin
         unique_id = f"{vin}_{snake_case(sensor_name)}"
+        if self.__device_document is not None:
+            self.__device_document.remove_component(unique_id, sensor_type)
+            return
         ha_topic = (
             f"{self.__discovery_prefix}/{sensor_type}/{vin}_mg/{unique_id}/config"
         )
-        self.__vehicle_state.publisher.publish_str(ha_topic, "", no_prefix=True)
+        self.__catalogue.add(ha_topic, "")
 
     def __publish_scheduled_charging(self) -> None:
         start_time_id = self._publish_sensor(
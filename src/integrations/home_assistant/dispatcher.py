@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_MESSAGES_PER_SECOND = 50.0
+
+
+class TokenBucket:
+    """Token bucket that allows a single consumer to go into debt.
+
+    The cost of a discovery round is only known once it has been published, so
+    the consumer waits for a non-negative balance and then pays for what it
+    actually sent.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.__rate = rate
+        self.__capacity = capacity
+        self.__clock = clock
+        self.__tokens = capacity
+        self.__updated_at = clock()
+
+    def __refill(self) -> None:
+        now = self.__clock()
+        elapsed = now - self.__updated_at
+        self.__updated_at = now
+        self.__tokens = min(self.__capacity, self.__tokens + elapsed * self.__rate)
+
+    @property
+    def tokens(self) -> float:
+        self.__refill()
+        return self.__tokens
+
+    def delay(self) -> float:
+        """Seconds until the balance is no longer negative."""
+        tokens = self.tokens
+        return 0.0 if tokens >= 0 else -tokens / self.__rate
+
+    def consume(self, tokens: float) -> None:
+        self.__refill()
+        self.__tokens -= tokens
+
+
+class HaDiscoveryDispatcher:
+    """Publishes the Home Assistant discovery messages of many devices, paced by a token bucket.
+
+    Devices are published one at a time in request order. Requesting a device
+    that is still waiting for its turn does not queue it twice, so repeated
+    Home Assistant restarts do not multiply the work.
+    """
+
+    def __init__(
+        self,
+        *,
+        messages_per_second: float = DEFAULT_MESSAGES_PER_SECOND,
+        on_progress: Callable[[dict[str, Any]], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.__bucket = TokenBucket(
+            rate=messages_per_second, capacity=messages_per_second, clock=clock
+        )
+        self.__on_progress = on_progress
+        self.__pending: dict[str, Callable[[], int]] = {}
+        self.__wakeup = asyncio.Event()
+        self.__requested = 0
+        self.__deduplicated = 0
+        self.__dispatched = 0
+        self.__messages = 0
+
+    def request(self, device_id: str, publish: Callable[[], int]) -> None:
+        """Queue the discovery of a device.
+
+        `publish` sends the discovery messages of the device and returns how
+        many it sent.
+        """
+        self.__requested += 1
+        if device_id in self.__pending:
+            self.__deduplicated += 1
+        self.__pending[device_id] = publish
+        self.__wakeup.set()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self.__pending)
+
+    @property
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "pending": self.pending_count,
+            "requested": self.__requested,
+            "deduplicated": self.__deduplicated,
+            "dispatched": self.__dispatched,
+            "messages": self.__messages,
+        }
+
+    async def run(self) -> None:
+        while True:
+            await self.__wakeup.wait()
+            self.__wakeup.clear()
+            await self.__dispatch_pending()
+
+    async def __dispatch_pending(self) -> None:
+        while self.__pending:
+            if (delay := self.__bucket.delay()) > 0:
+                await asyncio.sleep(delay)
+            # Taken off the queue only now, later requests for it are merged meanwhile
+            device_id = next(iter(self.__pending))
+            publish = self.__pending.pop(device_id)
+            try:
+                sent = publish()
+            except Exception:
+                LOG.exception(f"Failed to publish the discovery of {device_id}")
+                sent = 0
+            self.__bucket.consume(sent)
+            self.__dispatched += 1
+            self.__messages += sent
+            LOG.debug(
+                f"Published {sent} discovery messages of {device_id}, {self.pending_count} devices pending"
+            )
+            if self.__on_progress is not None:
+                self.__on_progress(self.metrics)
@@ -13,7 +13,14 @@ from integrations.home_assistant.base import (
     _ORIGIN,
     HomeAssistantDiscoveryBase,
 )
+from integrations.home_assistant.device_discovery import (
+    HaDeviceDiscoveryDocument,
+    clear_retained_configs,
+    device_config_topic,
+    entity_config_filter,
+)
 from integrations.home_assistant.utils import snake_case
+from metrics import HA_DISCOVERY_MESSAGES
 import mqtt_topics
 from publisher.mqtt_publisher import MqttPublisher
 
@@ -29,6 +36,8 @@ class HomeAssistantGatewayDiscovery(HomeAssistantDiscoveryBase):
         publisher: Publisher,
         account_prefix: str,
         discovery_prefix: str,
+        *,
+        device_discovery: bool = False,
     ) -> None:
         self.__publisher = publisher
         self.__account_prefix = account_prefix
@@ -41,10 +50,34 @@ class HomeAssistantGatewayDiscovery(HomeAssistantDiscoveryBase):
             ]
         )
         self.published = False
+        # Number of discovery messages sent by the last publication
+        self.sent_count = 0
+        node_id = f"{self.__gateway_id}_gw"
+        self.__entity_config_filter = entity_config_filter(discovery_prefix, node_id)
+        self.__device_config_topic = device_config_topic(discovery_prefix, node_id)
+        self.__device_document = (
+            HaDeviceDiscoveryDocument() if device_discovery else None
+        )
+        self.__publisher.track_retained_topics(self.__entity_config_filter)
+        self.__publisher.track_retained_topics(self.__device_config_topic)
 
     def publish_ha_discovery_messages(self) -> None:
         LOG.debug("Publishing Home Assistant gateway discovery messages")
-        self.__publish_gateway_sensors()
+        self.sent_count = 0
+        if self.__device_document is None:
+            clear_retained_configs(self.__publisher, self.__device_config_topic)
+            self.__publish_gateway_sensors()
+        else:
+            clear_retained_configs(self.__publisher, self.__entity_config_filter)
+            self.__publish_gateway_sensors()
+            if self.__publisher.publish_json_unless_retained(
+                self.__device_config_topic,
+                self.__device_document.to_dict(),
+                no_prefix=True,
+            ):
+                self.sent_count += 1
+        self.__publisher.retained_fingerprints.save()
+        HA_DISCOVERY_MESSAGES.inc(self.sent_count, scope="gateway")
         self.published = True
 
     def reset(self) -> None:
@@ -161,6 +194,12 @@ class HomeAssistantGatewayDiscovery(HomeAssistantDiscoveryBase):
             )
             | payload
         )
+        if self.__device_document is not None:
+            self.__device_document.add_component(unique_id, sensor_type, final_payload)
+            return f"{sensor_type}.{unique_id}"
         ha_topic = f"{self.__discovery_prefix}/{sensor_type}/{gateway_id}_gw/{unique_id}/config"
-        self.__publisher.publish_json(ha_topic, final_payload, no_prefix=True)
+        if self.__publisher.publish_json_unless_retained(
+            ha_topic, final_payload, no_prefix=True
+        ):
+            self.sent_count += 1
         return f"{sensor_type}.{unique_id}"
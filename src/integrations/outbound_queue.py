@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import contextlib
+import contextvars
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from integrations import IntegrationException
+from metrics import INTEGRATION_SENDS
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_SEND_TIMEOUT = 30.0  # in seconds
+
+# Values of the result label of the integration sends metric
+SEND_RESULT_SENT = "sent"
+SEND_RESULT_SKIPPED = "skipped"
+SEND_RESULT_FAILED = "failed"
+SEND_RESULT_TIMEOUT = "timeout"
+
+
+class OutboundQueue[T]:
+    """Bounded send queue drained by a background worker task.
+
+    When the queue is full the oldest pending item is dropped, so a slow
+    third-party server only ever receives the newest telemetry point and never
+    blocks the producer.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        send: Callable[[T], Awaitable[tuple[bool, str]]],
+        *,
+        on_result: Callable[[bool, str], None] | None = None,
+        send_timeout: float = DEFAULT_SEND_TIMEOUT,
+        max_pending: int = 1,
+    ) -> None:
+        self.__name = name
+        self.__send = send
+        self.__on_result = on_result
+        self.__send_timeout = send_timeout
+        # The context of the producer travels with the item, for the log context of the send
+        self.__pending: deque[tuple[float, T, contextvars.Context]] = deque(
+            maxlen=max_pending
+        )
+        self.__wakeup = asyncio.Event()
+        self.__idle = asyncio.Event()
+        self.__idle.set()
+        self.__worker: asyncio.Task[None] | None = None
+        self.__in_flight = False
+        self.__sent_count = 0
+        self.__skipped_count = 0
+        self.__failed_count = 0
+        self.__coalesced_count = 0
+        self.__last_send_latency: float | None = None
+        self.__last_queue_latency: float | None = None
+
+    def put(self, item: T) -> None:
+        if len(self.__pending) == self.__pending.maxlen:
+            self.__coalesced_count += 1
+        self.__pending.append((time.perf_counter(), item, contextvars.copy_context()))
+        self.__idle.clear()
+        self.__wakeup.set()
+        if self.__worker is None or self.__worker.done():
+            self.__worker = asyncio.create_task(
+                self.__run(), name=f"{self.__name}_outbound_queue"
+            )
+
+    async def close(self) -> None:
+        worker = self.__worker
+        self.__worker = None
+        try:
+            if worker is not None and not worker.done():
+                worker.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await worker
+        finally:
+            # Nothing is going to send what is left, never let join() wait for it
+            self.__pending.clear()
+            self.__idle.set()
+
+    async def join(self) -> None:
+        """Wait until every pending item has been handled."""
+        await self.__idle.wait()
+
+    @property
+    def depth(self) -> int:
+        return len(self.__pending)
+
+    @property
+    def in_flight(self) -> bool:
+        return self.__in_flight
+
+    @property
+    def sent_count(self) -> int:
+        return self.__sent_count
+
+    @property
+    def skipped_count(self) -> int:
+        return self.__skipped_count
+
+    @property
+    def failed_count(self) -> int:
+        return self.__failed_count
+
+    @property
+    def coalesced_count(self) -> int:
+        return self.__coalesced_count
+
+    @property
+    def last_send_latency(self) -> float | None:
+        return self.__last_send_latency
+
+    @property
+    def last_queue_latency(self) -> float | None:
+        return self.__last_queue_latency
+
+    @property
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "inFlight": self.in_flight,
+            "sent": self.sent_count,
+            "skipped": self.skipped_count,
+            "failed": self.failed_count,
+            "coalesced": self.coalesced_count,
+            "lastSendLatency": self.last_send_latency,
+            "lastQueueLatency": self.last_queue_latency,
+        }
+
+    async def __run(self) -> None:
+        while True:
+            await self.__wakeup.wait()
+            self.__wakeup.clear()
+            while self.__pending:
+                enqueued_at, item, context = self.__pending.popleft()
+                self.__in_flight = True
+                try:
+                    await asyncio.create_task(
+                        self.__send_one(enqueued_at, item), context=context
+                    )
+                finally:
+                    self.__in_flight = False
+            self.__idle.set()
+
+    async def __send_one(self, enqueued_at: float, item: T) -> None:
+        start = time.perf_counter()
+        self.__last_queue_latency = round(start - enqueued_at, 3)
+        try:
+            async with asyncio.timeout(self.__send_timeout):
+                sent, response = await self.__send(item)
+            if sent:
+                self.__sent_count += 1
+                result = SEND_RESULT_SENT
+            else:
+                self.__skipped_count += 1
+                result = SEND_RESULT_SKIPPED
+        except TimeoutError:
+            self.__failed_count += 1
+            sent = False
+            response = f"Timed out after {self.__send_timeout} seconds"
+            result = SEND_RESULT_TIMEOUT
+            LOG.warning("%s send timed out", self.__name)
+        except IntegrationException as e:
+            self.__failed_count += 1
+            sent = False
+            response = str(e)
+            result = SEND_RESULT_FAILED
+            LOG.warning("%s send failed: %s", self.__name, e)
+        except Exception as e:
+            self.__failed_count += 1
+            sent = False
+            response = str(e)
+            result = SEND_RESULT_FAILED
+            LOG.exception("%s send failed unexpectedly", self.__name, exc_info=e)
+        finally:
+            self.__last_send_latency = round(time.perf_counter() - start, 3)
+        INTEGRATION_SENDS.inc(integration=self.__name, result=result)
+
+        if self.__on_result is not None:
+            try:
+                self.__on_result(sent, response)
+            except Exception as e:
+                LOG.exception("%s result handler failed", self.__name, exc_info=e)
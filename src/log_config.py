@@ -1,9 +1,23 @@
 from __future__ import annotations
 
+import atexit
+from collections import OrderedDict
+import contextlib
+from contextvars import ContextVar
+import datetime
+import json
 import logging
 import logging.config
+import logging.handlers
 import os
-from typing import Any
+import queue
+import secrets
+import time
+from typing import TYPE_CHECKING, Any, override
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import TracebackType
 
 MODULES_DEFAULT_LOG_LEVEL = {
     "asyncio": "WARNING",
@@ -16,6 +30,18 @@ MODULES_DEFAULT_LOG_LEVEL = {
 
 MODULES_REPLACE_ENV_PREFIX = {"gmqtt": "MQTT"}
 
+LOG_FORMAT_TEXT = "text"
+LOG_FORMAT_JSON = "json"
+DEFAULT_REPEATED_EXCEPTION_INTERVAL = 300.0  # in seconds
+# Bounds the memory of the repeated exception filter
+MAX_TRACKED_EXCEPTIONS = 1024
+
+# Attached to every log record, so that the lines of a vehicle or of a poll cycle can be told apart
+log_vin: ContextVar[str | None] = ContextVar("log_vin", default=None)
+log_poll_cycle: ContextVar[str | None] = ContextVar("log_poll_cycle", default=None)
+
+_listener: logging.handlers.QueueListener | None = None
+
 
 def get_default_log_level() -> str:
     return os.getenv("LOG_LEVEL", "INFO").upper()
@@ -34,6 +60,206 @@ def get_module_log_level(module_name: str) -> str | None:
     return os.getenv(f"{env_prefix}_LOG_LEVEL", default_log_level)
 
 
+def get_log_format() -> str:
+    log_format = os.getenv("LOG_FORMAT", LOG_FORMAT_TEXT).lower()
+    if log_format not in (LOG_FORMAT_TEXT, LOG_FORMAT_JSON):
+        logging.getLogger(__name__).warning(
+            "Unknown LOG_FORMAT %s, falling back to %s", log_format, LOG_FORMAT_TEXT
+        )
+        return LOG_FORMAT_TEXT
+    return log_format
+
+
+def get_repeated_exception_interval() -> float:
+    value = os.getenv("LOG_REPEATED_EXCEPTION_INTERVAL")
+    if value is None:
+        return DEFAULT_REPEATED_EXCEPTION_INTERVAL
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        logging.getLogger(__name__).warning(
+            "Invalid LOG_REPEATED_EXCEPTION_INTERVAL %s, using %s seconds",
+            value,
+            DEFAULT_REPEATED_EXCEPTION_INTERVAL,
+        )
+        return DEFAULT_REPEATED_EXCEPTION_INTERVAL
+
+
+def new_poll_cycle_id() -> str:
+    return secrets.token_hex(4)
+
+
+@contextlib.contextmanager
+def log_context(
+    *, vin: str | None = None, poll_cycle: str | None = None
+) -> Iterator[None]:
+    """Tag the log records of the current task with a VIN and a poll cycle."""
+    vin_token = log_vin.set(vin) if vin is not None else None
+    poll_cycle_token = (
+        log_poll_cycle.set(poll_cycle) if poll_cycle is not None else None
+    )
+    try:
+        yield
+    finally:
+        if poll_cycle_token is not None:
+            log_poll_cycle.reset(poll_cycle_token)
+        if vin_token is not None:
+            log_vin.reset(vin_token)
+
+
+class LogContextFilter(logging.Filter):
+    """Copy the log context of the emitting task onto the record.
+
+    It must run where the record is created, the listener thread does not see
+    the context variables of the event loop tasks.
+    """
+
+    @override
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.vin = log_vin.get()
+        record.poll_cycle = log_poll_cycle.get()
+        return True
+
+
+class RepeatedExceptionFilter(logging.Filter):
+    """Log the traceback of an exception once per interval.
+
+    Repeats of the same exception, raised from the same place and logged from
+    the same place, keep their message but lose their traceback until the
+    interval has elapsed. The next full traceback tells how many were shortened.
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_REPEATED_EXCEPTION_INTERVAL,
+        max_tracked: int = MAX_TRACKED_EXCEPTIONS,
+    ) -> None:
+        super().__init__()
+        self.__interval = interval
+        self.__max_tracked = max_tracked
+        # Key of an exception -> when its traceback was last logged, repeats since then
+        self.__seen: OrderedDict[tuple[Any, ...], tuple[float, int]] = OrderedDict()
+
+    @override
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.__interval <= 0 or not record.exc_info or record.exc_info[1] is None:
+            return True
+        key = self.__key(record, record.exc_info)
+        now = time.monotonic()
+        seen = self.__seen.get(key)
+        if seen is not None and now - seen[0] < self.__interval:
+            self.__seen[key] = (seen[0], seen[1] + 1)
+            record.msg = f"{record.getMessage()} (repeated, traceback suppressed)"
+            record.args = None
+            record.exc_info = None
+            record.exc_text = None
+            record.stack_info = None
+            return True
+
+        if seen is not None and seen[1] > 0:
+            record.msg = (
+                f"{record.getMessage()} ({seen[1]} repeats logged without"
+                f" traceback in the last {now - seen[0]:.0f} seconds)"
+            )
+            record.args = None
+        self.__seen[key] = (now, 0)
+        self.__seen.move_to_end(key)
+        while len(self.__seen) > self.__max_tracked:
+            self.__seen.popitem(last=False)
+        return True
+
+    @staticmethod
+    def __key(
+        record: logging.LogRecord,
+        exc_info: tuple[type[BaseException], BaseException, TracebackType | None]
+        | tuple[None, None, None],
+    ) -> tuple[Any, ...]:
+        exc_type, exc, tb = exc_info
+        while tb is not None and tb.tb_next is not None:
+            tb = tb.tb_next
+        raised_at = (
+            (tb.tb_frame.f_code.co_filename, tb.tb_lineno) if tb is not None else None
+        )
+        return (
+            record.name,
+            record.pathname,
+            record.lineno,
+            exc_type,
+            str(exc),
+            raised_at,
+        )
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the log context as separate fields."""
+
+    @override
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, tz=datetime.UTC
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ("vin", "poll_cycle"):
+            if (value := getattr(record, field, None)) is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Hand records over to the listener thread with their fields intact.
+
+    The default preparation merges the traceback into the message, which the
+    JSON formatter needs separately. The traceback is still rendered here,
+    while the frames it refers to are alive.
+    """
+
+    @override
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _start_queue_listener(console: logging.Handler, interval: float) -> None:
+    """Write the log records from a background thread, never from the event loop."""
+    global _listener  # noqa: PLW0603
+    if _listener is None:
+        atexit.register(_stop_queue_listener)
+    else:
+        _listener.stop()
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(records)
+    queue_handler.addFilter(LogContextFilter())
+    queue_handler.addFilter(RepeatedExceptionFilter(interval))
+    root = logging.getLogger()
+    root.removeHandler(console)
+    root.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(
+        records, console, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def _stop_queue_listener() -> None:
+    """Flush the records still queued, the listener thread does not outlive the process."""
+    if _listener is not None:
+        _listener.stop()
+
+
 def setup_logging() -> None:
     logger = logging.getLogger(__name__)
     # Read the default log level from the environment
@@ -43,15 +269,18 @@ def setup_logging() -> None:
         "version": 1,
         "disable_existing_loggers": False,
         "formatters": {
-            "standard": {
+            LOG_FORMAT_TEXT: {
                 "format": "%(asctime)s [%(levelname)s]: %(message)s - %(name)s",
             },
+            LOG_FORMAT_JSON: {
+                "()": JsonFormatter,
+            },
         },
         "handlers": {
             "console": {
                 "level": "DEBUG",
                 "class": "logging.StreamHandler",
-                "formatter": "standard",
+                "formatter": get_log_format(),
             },
         },
         # Catch-all logger with a default level
@@ -78,3 +307,6 @@ def setup_logging() -> None:
 
     # Apply the logging configuration
     logging.config.dictConfig(logging_config)
+    console = logging.getHandlerByName("console")
+    if console is not None:
+        _start_queue_listener(console, get_repeated_exception_interval())
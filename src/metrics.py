@@ -0,0 +1,433 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+LOG = logging.getLogger(__name__)
+
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# How long a client may take to send its request before the connection is dropped
+REQUEST_TIMEOUT = 10.0  # in seconds
+EVENT_LOOP_LAG_INTERVAL = 1.0  # in seconds
+
+# Sized for SAIC API calls, which take from a few hundred milliseconds up to the poll timeout
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [
+        f'{name}="{_escape_label_value(value)}"'
+        for name, value in zip(names, values, strict=True)
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+
+    def _label_values(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if labels.keys() != set(self.label_names):
+            msg = f"{self.name} expects the labels {self.label_names}, got {tuple(labels)}"
+            raise ValueError(msg)
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.metric_type}"
+        yield from self._samples()
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.__values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            msg = f"{self.name} can only increase, got {amount}"
+            raise ValueError(msg)
+        key = self._label_values(labels)
+        self.__values[key] = self.__values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self.__values.get(self._label_values(labels), 0.0)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in sorted(self.__values.items()):
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.__values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self.__values[self._label_values(labels)] = value
+
+    def value(self, **labels: str) -> float | None:
+        return self.__values.get(self._label_values(labels))
+
+    def remove(self, **labels: str) -> None:
+        self.__values.pop(self._label_values(labels), None)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in sorted(self.__values.items()):
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class _HistogramValue:
+    def __init__(self, bucket_count: int) -> None:
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        *,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.__buckets = tuple(sorted(buckets))
+        self.__values: dict[tuple[str, ...], _HistogramValue] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        histogram = self.__values.get(key)
+        if histogram is None:
+            histogram = self.__values[key] = _HistogramValue(len(self.__buckets))
+        for i, upper_bound in enumerate(self.__buckets):
+            if value <= upper_bound:
+                histogram.bucket_counts[i] += 1
+                break
+        histogram.count += 1
+        histogram.sum += value
+
+    def count(self, **labels: str) -> int:
+        histogram = self.__values.get(self._label_values(labels))
+        return histogram.count if histogram is not None else 0
+
+    def quantile(self, q: float, **labels: str) -> float | None:
+        """Estimate a quantile from the buckets, like PromQL `histogram_quantile`."""
+        histogram = self.__values.get(self._label_values(labels))
+        if histogram is None or histogram.count == 0:
+            return None
+        rank = q * histogram.count
+        cumulative = 0
+        lower_bound = 0.0
+        for upper_bound, bucket_count in zip(
+            self.__buckets, histogram.bucket_counts, strict=True
+        ):
+            if bucket_count and cumulative + bucket_count >= rank:
+                fraction = (rank - cumulative) / bucket_count
+                return lower_bound + (upper_bound - lower_bound) * fraction
+            cumulative += bucket_count
+            lower_bound = upper_bound
+        # The observations above the largest bucket cannot be located any better
+        return self.__buckets[-1]
+
+    def _samples(self) -> Iterator[str]:
+        for key, histogram in sorted(self.__values.items()):
+            cumulative = 0
+            for upper_bound, bucket_count in zip(
+                self.__buckets, histogram.bucket_counts, strict=True
+            ):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    (*self.label_names, "le"), (*key, _format_value(upper_bound))
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels((*self.label_names, "le"), (*key, "+Inf"))
+            yield f"{self.name}_bucket{labels} {histogram.count}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(histogram.sum)}"
+            yield f"{self.name}_count{labels} {histogram.count}"
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.__metrics: dict[str, _Metric] = {}
+
+    def __register[M: _Metric](self, metric: M) -> M:
+        if metric.name in self.__metrics:
+            msg = f"Metric {metric.name} is already registered"
+            raise ValueError(msg)
+        self.__metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> Counter:
+        return self.__register(Counter(name, documentation, labels))
+
+    def gauge(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> Gauge:
+        return self.__register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        *,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.__register(Histogram(name, documentation, labels, buckets=buckets))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = [line for metric in self.__metrics.values() for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+SAIC_API_CALL_DURATION = REGISTRY.histogram(
+    "saic_gateway_saic_api_call_duration_seconds",
+    "Duration of the SAIC API calls made while polling vehicles and messages.",
+    ("call", "outcome"),
+)
+COMMAND_DURATION = REGISTRY.histogram(
+    "saic_gateway_command_duration_seconds",
+    "Duration of the vehicle commands received over MQTT, including relogins and retries.",
+    ("command", "outcome"),
+)
+MQTT_PUBLISHES = REGISTRY.counter(
+    "saic_gateway_mqtt_publishes_total",
+    "Payloads handed to the MQTT transport, by topic class.",
+    ("topic_class",),
+)
+RELOGINS = REGISTRY.counter(
+    "saic_gateway_relogins_total",
+    "Logins to the SAIC API, the first one of each account included.",
+    ("outcome",),
+)
+HA_DISCOVERY_MESSAGES = REGISTRY.counter(
+    "saic_gateway_ha_discovery_messages_total",
+    "Home Assistant discovery messages sent.",
+    ("scope",),
+)
+INTEGRATION_SENDS = REGISTRY.counter(
+    "saic_gateway_integration_sends_total",
+    "Telemetry sent to third-party integrations, by result.",
+    ("integration", "result"),
+)
+LOOP_PHASE = REGISTRY.gauge(
+    "saic_gateway_vehicle_loop_phase",
+    "Current step of the polling loop of each vehicle, 1 for the active step and 0 for the others.",
+    ("vin", "phase"),
+)
+EVENT_LOOP_LAG = REGISTRY.gauge(
+    "saic_gateway_event_loop_lag_seconds",
+    "How late the last periodic event loop wakeup was.",
+)
+
+# Outcome label values shared by the histograms and counters above
+OUTCOME_SUCCESS = "success"
+OUTCOME_ERROR = "error"
+OUTCOME_TIMEOUT = "timeout"
+
+
+OUTCOME_CANCELLED = "cancelled"
+
+
+def outcome_of(error: BaseException | None) -> str:
+    if error is None:
+        return OUTCOME_SUCCESS
+    if isinstance(error, TimeoutError):
+        return OUTCOME_TIMEOUT
+    if isinstance(error, asyncio.CancelledError):
+        return OUTCOME_CANCELLED
+    return OUTCOME_ERROR
+
+
+@contextlib.contextmanager
+def time_call(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Observe how long the block took, labelled with the `outcome` it had."""
+    start = time.perf_counter()
+    error: BaseException | None = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        histogram.observe(
+            time.perf_counter() - start, outcome=outcome_of(error), **labels
+        )
+
+
+class LoopPhase:
+    """Publishes which step of its polling loop a vehicle is in.
+
+    This is what the loop task is doing, not the refresh mode based polling
+    phase that `VehicleState` publishes over MQTT.
+    """
+
+    CONFIGURING = "configuring"
+    WAITING = "waiting"
+    POLLING = "polling"
+    BACKOFF = "backoff"
+    RELOGIN = "relogin"
+    ALL = (CONFIGURING, WAITING, POLLING, BACKOFF, RELOGIN)
+
+    def __init__(self, vin: str, gauge: Gauge = LOOP_PHASE) -> None:
+        self.__vin = vin
+        self.__gauge = gauge
+        self.__phase: str | None = None
+
+    @property
+    def phase(self) -> str | None:
+        return self.__phase
+
+    def set(self, phase: str) -> None:
+        if phase == self.__phase:
+            return
+        self.__phase = phase
+        for candidate in self.ALL:
+            self.__gauge.set(
+                1.0 if candidate == phase else 0.0, vin=self.__vin, phase=candidate
+            )
+
+    def clear(self) -> None:
+        self.__phase = None
+        for candidate in self.ALL:
+            self.__gauge.remove(vin=self.__vin, phase=candidate)
+
+
+async def monitor_event_loop_lag(
+    gauge: Gauge = EVENT_LOOP_LAG, interval: float = EVENT_LOOP_LAG_INTERVAL
+) -> None:
+    """Measure how late the event loop wakes up from a sleep, forever."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started_at = loop.time()
+        await asyncio.sleep(interval)
+        gauge.set(max(loop.time() - started_at - interval, 0.0))
+
+
+class MetricsServer:
+    """Minimal HTTP server answering Prometheus scrapes on `/metrics`."""
+
+    def __init__(
+        self, *, host: str, port: int, registry: MetricsRegistry = REGISTRY
+    ) -> None:
+        self.__host = host
+        self.__port = port
+        self.__registry = registry
+        self.__server: asyncio.Server | None = None
+
+    @property
+    def port(self) -> int | None:
+        """The port actually bound, resolves port 0 once started."""
+        if self.__server is None or not self.__server.sockets:
+            return None
+        return int(self.__server.sockets[0].getsockname()[1])
+
+    async def start(self) -> None:
+        self.__server = await asyncio.start_server(
+            self.__handle_connection, self.__host, self.__port
+        )
+        LOG.info(
+            "Serving metrics on http://%s:%d%s", self.__host, self.port, METRICS_PATH
+        )
+
+    async def close(self) -> None:
+        if self.__server is None:
+            return
+        self.__server.close()
+        await self.__server.wait_closed()
+        self.__server = None
+
+    async def serve(self) -> None:
+        """Serve until cancelled."""
+        await self.start()
+        try:
+            await asyncio.Future()
+        finally:
+            await self.close()
+
+    async def __handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            async with asyncio.timeout(REQUEST_TIMEOUT):
+                request_line = await reader.readline()
+                # Headers are not needed, only drained
+                while await reader.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+            status, body = self.__respond(request_line.decode("latin-1"))
+            payload = body.encode()
+            writer.write(
+                (
+                    f"HTTP/1.1 {status}\r\n"
+                    f"Content-Type: {CONTENT_TYPE}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode()
+                + payload
+            )
+            await writer.drain()
+        except (TimeoutError, ConnectionError) as e:
+            LOG.debug("Metrics request failed: %s", e)
+        except Exception as e:
+            LOG.exception("Metrics request failed unexpectedly", exc_info=e)
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    def __respond(self, request_line: str) -> tuple[str, str]:
+        parts = request_line.split()
+        if len(parts) < 2:
+            return "400 Bad Request", "Bad request\n"
+        method, target = parts[0], parts[1]
+        if target.split("?", 1)[0] != METRICS_PATH:
+            return "404 Not Found", "Not found\n"
+        if method != "GET":
+            return "405 Method Not Allowed", "Method not allowed\n"
+        return "200 OK", self.__registry.render()
@@ -135,13 +135,20 @@ ACCOUNT_REFRESH_INTERVAL = ACCOUNT + "/refreshInterval"
 ACCOUNT_LAST_REFRESH = ACCOUNT + "/lastRefresh"
 ACCOUNT_LAST_LOGIN = ACCOUNT + "/lastLogin"
 ACCOUNT_LAST_LOGIN_ERROR = ACCOUNT + "/lastLoginError"
+ACCOUNT_CIRCUIT_BREAKER = ACCOUNT + "/circuitBreaker"
 
 INTERNAL = "_internal"
 INTERNAL_API = INTERNAL + "/api"
 INTERNAL_LWT = INTERNAL + "/lwt"
 INTERNAL_ABRP = INTERNAL + "/abrp"
+INTERNAL_ABRP_QUEUE = INTERNAL_ABRP + "/queue"
 INTERNAL_OSMAND = INTERNAL + "/osmand"
+INTERNAL_OSMAND_QUEUE = INTERNAL_OSMAND + "/queue"
 INTERNAL_CONFIGURATION_RAW = INTERNAL + "/configuration/raw"
+INTERNAL_POLL_LATENCY = INTERNAL + "/poll/latency"
+INTERNAL_PUBLISH_CACHE = INTERNAL + "/publish_cache"
+INTERNAL_HA_DISCOVERY = INTERNAL + "/ha_discovery"
+INTERNAL_API_RATE_LIMITER = INTERNAL + "/api_rate_limiter"
 
 LOCATION = "location"
 LOCATION_POSITION = LOCATION + "/position"
@@ -172,6 +179,7 @@ REFRESH_PERIOD_INACTIVE_GRACE = REFRESH_PERIOD + "/inActiveGrace"
 REFRESH_PERIOD_INACTIVE_GRACE_SET = REFRESH_PERIOD_INACTIVE_GRACE + "/" + SET_SUFFIX
 REFRESH_PERIOD_ERROR = REFRESH_PERIOD + "/error"
 REFRESH_POLLING_PHASE = REFRESH + "/pollingPhase"
+REFRESH_CIRCUIT_BREAKER = REFRESH + "/circuitBreaker"
 
 TYRES = "tyres"
 TYRES_FRONT_LEFT_PRESSURE = TYRES + "/frontLeftPressure"
@@ -1,18 +1,26 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+import contextlib
+from contextvars import ContextVar
 from datetime import datetime
+import functools
 import json
+from pathlib import Path
 import re
-from typing import TYPE_CHECKING, Any, TypeVar
+import sys
+import time
+from typing import TYPE_CHECKING, Any
 
+from metrics import MQTT_PUBLISHES
 import mqtt_topics
+from publisher.retained_fingerprints import STATE_FILE_NAME, RetainedFingerprints
 from utils import datetime_to_str
 
 if TYPE_CHECKING:
-    from configuration import Configuration
+    from collections.abc import Callable, Iterator
 
-T = TypeVar("T")
+    from configuration import Configuration
 
 type Publishable = bool | int | float | str | dict[str, Any] | datetime
 """Closed union of value types this gateway knows how to publish to MQTT.
@@ -33,6 +41,74 @@ publisher/transport boundary. Use `WirePayload | None` for wire-level helpers
 where `None` means "clear the retained message."
 """
 
+TOPIC_CACHE_MAX_SIZE = 4096
+PAYLOAD_CACHE_MAX_LENGTH = 64
+_UNCACHED_TOPIC_SUFFIXES = (
+    f"/{mqtt_topics.SET_SUFFIX}",
+    f"/{mqtt_topics.RESULT_SUFFIX}",
+)
+
+_COMPACT_SEPARATORS = (",", ":")
+_LETTERS = re.compile("[a-zA-Z]")
+_NON_ZERO_DIGITS = re.compile("[1-9]")
+_MASKED_SUFFIX = re.compile("\\(\\*\\*\\*...\\)")
+
+# Fields whose values are replaced when publishing anonymized data
+_ANONYMIZED_STRINGS = (
+    "uid",
+    "email",
+    "user_name",
+    "account",
+    "ping",
+    "token",
+    "access_token",
+    "refreshToken",
+    "refresh_token",
+    "vin",
+)
+_ANONYMIZED_NUMBERS = (
+    "seconds",
+    "bindTime",
+    "eventCreationTime",
+    "latitude",
+    "longitude",
+)
+_ANONYMIZED_EVENT_IDS = ("eventID", "event-id", "event_id", "eventId", "lastKeySeen")
+
+# Rule of an anonymized field: the value types it applies to and the replacement
+type _AnonymizationRule = tuple[type | tuple[type, ...], Callable[[Any], Any]]
+
+
+def _json_default(value: Any) -> Any:
+    """Encode the values the json module does not know about."""
+    if isinstance(value, bytes):
+        return str(value)
+    if isinstance(value, set | frozenset):
+        return list(value)
+    msg = f"Object of type {type(value).__name__} is not JSON serializable"
+    raise TypeError(msg)
+
+
+def encode_payload(payload: WirePayload | None) -> bytes:
+    """Encode a payload to the bytes gmqtt would put on the wire.
+
+    Numbers (and booleans) are encoded via `str`, strings as UTF-8 and `None`
+    as an empty payload. Short values are memoized as the same states and
+    readings are published over and over again.
+    """
+    if isinstance(payload, str) and len(payload) > PAYLOAD_CACHE_MAX_LENGTH:
+        return payload.encode("utf-8", errors="replace")
+    return _encode_scalar(payload)
+
+
+@functools.lru_cache(maxsize=1024, typed=True)
+def _encode_scalar(payload: WirePayload | None) -> bytes:
+    if payload is None:
+        return b""
+    if isinstance(payload, str):
+        return payload.encode("utf-8", errors="replace")
+    return str(payload).encode("ascii")
+
 
 class MqttCommandListener(ABC):
     @abstractmethod
@@ -72,15 +148,100 @@ class MqttCommandListener(ABC):
         """
 
 
+class PublishTransaction:
+    """Publishes collected by :meth:`Publisher.transaction`, keyed by final topic."""
+
+    def __init__(self, publisher: Publisher) -> None:
+        self.publisher = publisher
+        self.pending: dict[str, tuple[WirePayload | None, bool]] = {}
+        self.depth = 0
+        self.closed = False
+
+    def add(self, topic: str, payload: WirePayload | None, *, retain: bool) -> None:
+        # Re-insert so that the flush order follows the last write of each topic
+        self.pending.pop(topic, None)
+        self.pending[topic] = (payload, retain)
+
+
+_CURRENT_TRANSACTION: ContextVar[PublishTransaction | None] = ContextVar(
+    "publish_transaction", default=None
+)
+
+
+class LastValueCache:
+    """Remembers the last retained payload published on each topic.
+
+    A publish is skipped when it would only repeat what the broker already
+    retains. Every entry expires after `refresh_interval` seconds so that the
+    full state is still republished periodically.
+    """
+
+    def __init__(self, refresh_interval: float) -> None:
+        self.__refresh_interval = refresh_interval
+        self.__entries: dict[str, tuple[WirePayload | None, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def should_publish(self, topic: str, payload: WirePayload | None) -> bool:
+        now = time.monotonic()
+        entry = self.__entries.get(topic)
+        if entry is not None:
+            last_payload, published_at = entry
+            # Compare types too, True == 1 but "true" != "1" on the wire
+            if (
+                type(last_payload) is type(payload)
+                and last_payload == payload
+                and now - published_at < self.__refresh_interval
+            ):
+                self.hits += 1
+                return False
+        self.misses += 1
+        self.__entries[topic] = (payload, now)
+        return True
+
+    def forget(self, topic: str) -> None:
+        self.__entries.pop(topic, None)
+
+    def clear(self) -> None:
+        self.__entries.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self.__entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hit_ratio, 3),
+        }
+
+
 class Publisher(ABC):
     def __init__(self, config: Configuration) -> None:
         self.__configuration = config
         self.__command_listener: MqttCommandListener | None = None
+        self.__last_value_cache = (
+            LastValueCache(config.mqtt_publish_cache_refresh_interval)
+            if config.mqtt_publish_cache_enabled
+            else None
+        )
+        self.__retained_fingerprints = RetainedFingerprints(
+            Path(config.state_directory) / STATE_FILE_NAME
+            if config.state_directory
+            else None
+        )
         if config.mqtt_allow_dots_in_topic:
             self.__invalid_mqtt_chars = re.compile(r"[+#*$>]")
         else:
             self.__invalid_mqtt_chars = re.compile(r"[+#*$>.]")
         self.__topic_root = self.__remove_special_mqtt_characters(config.mqtt_topic)
+        self.__topic_cache: dict[tuple[str, bool], str] = {}
+        self.__topic_classes: dict[str, str] = {}
+        self.__anonymization_rules = self.__build_anonymization_rules()
 
     @abstractmethod
     async def connect(self) -> None:
@@ -90,6 +251,12 @@ class Publisher(ABC):
     def enable_commands(self) -> None:
         pass
 
+    def enable_account_commands(self, saic_user: str) -> None:  # noqa: B027
+        """Start handling the vehicle commands of one SAIC account.
+
+        Not abstract because publishers without a command channel have nothing to do.
+        """
+
     @abstractmethod
     def is_connected(self) -> bool:
         raise NotImplementedError
@@ -176,76 +343,208 @@ class Publisher(ABC):
     def clear_topic(self, key: str, no_prefix: bool = False) -> None:
         raise NotImplementedError
 
-    def get_mqtt_account_prefix(self) -> str:
-        return self.__remove_special_mqtt_characters(
-            f"{self.__topic_root}/{self.configuration.saic_user}"
+    @property
+    def last_value_cache(self) -> LastValueCache | None:
+        return self.__last_value_cache
+
+    @property
+    def retained_fingerprints(self) -> RetainedFingerprints:
+        return self.__retained_fingerprints
+
+    def track_retained_topics(self, topic_filter: str) -> None:  # noqa: B027
+        """Receive the retained payloads of the topics matching `topic_filter`.
+
+        Not abstract because publishers without a broker have nothing to track.
+        """
+
+    def publish_json_unless_retained(
+        self, key: str, data: dict[str, Any], no_prefix: bool = False
+    ) -> bool:
+        """Publish a retained JSON payload unless the broker already retains it.
+
+        Only topics passed to :meth:`track_retained_topics` can be confirmed as
+        retained. Returns whether the payload was published.
+        """
+        payload = self.dict_to_anonymized_json(data)
+        return self.publish_str_unless_retained(key, payload, no_prefix)
+
+    def publish_str_unless_retained(
+        self,
+        key: str,
+        payload: str,
+        no_prefix: bool = False,
+        *,
+        payload_fingerprint: str | None = None,
+    ) -> bool:
+        """Publish a retained payload unless the broker already retains it.
+
+        See :meth:`publish_json_unless_retained`.
+        """
+        topic = self.get_topic(key, no_prefix)
+        fingerprints = self.__retained_fingerprints
+        if fingerprints.is_retained(
+            topic, payload, payload_fingerprint=payload_fingerprint
+        ):
+            return False
+        self.publish_str(key, payload, no_prefix)
+        fingerprints.record_published(
+            topic, payload, payload_fingerprint=payload_fingerprint
         )
+        return True
+
+    def invalidate_last_value_cache(self) -> None:
+        """Make the next publish of every topic reach the broker again."""
+        if self.__last_value_cache is not None:
+            self.__last_value_cache.clear()
+
+    def _is_unchanged(
+        self, topic: str, payload: WirePayload | None, *, retain: bool
+    ) -> bool:
+        if self.__last_value_cache is None or not retain:
+            return False
+        # Clears, commands and command results are events rather than state:
+        # repeating one must reach the broker, so they bypass the cache
+        if payload is None or topic.endswith(_UNCACHED_TOPIC_SUFFIXES):
+            self.__last_value_cache.forget(topic)
+            return False
+        return not self.__last_value_cache.should_publish(topic, payload)
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[PublishTransaction]:
+        """Collect the publishes of the current task and send them in one burst.
+
+        Repeated publishes to the same topic collapse to the last value. Nested
+        transactions join the outermost one, which flushes when it ends, also
+        when the block raises. Publishes from other tasks are not affected.
+        """
+        current = _CURRENT_TRANSACTION.get()
+        if current is not None and current.publisher is self and not current.closed:
+            current.depth += 1
+            try:
+                yield current
+            finally:
+                current.depth -= 1
+            return
+
+        transaction = PublishTransaction(self)
+        token = _CURRENT_TRANSACTION.set(transaction)
+        try:
+            yield transaction
+        finally:
+            _CURRENT_TRANSACTION.reset(token)
+            transaction.closed = True
+            self.__flush(transaction)
+
+    def __flush(self, transaction: PublishTransaction) -> None:
+        pending = transaction.pending
+        transaction.pending = {}
+        # No awaits in here: the whole batch is handed to the transport back to back
+        for topic, (payload, retain) in pending.items():
+            self.__send_now(topic, payload, retain=retain)
+
+    def _publish_payload(
+        self, topic: str, payload: WirePayload | None, *, retain: bool = True
+    ) -> None:
+        """Wire-level publish shared by all publishers.
+
+        Defers to the current transaction, if any, then to the last value cache.
+        """
+        transaction = _CURRENT_TRANSACTION.get()
+        if (
+            transaction is not None
+            and transaction.publisher is self
+            and not transaction.closed
+        ):
+            transaction.add(topic, payload, retain=retain)
+            return
+        self.__send_now(topic, payload, retain=retain)
+
+    def __send_now(
+        self, topic: str, payload: WirePayload | None, *, retain: bool
+    ) -> None:
+        if self._is_unchanged(topic, payload, retain=retain):
+            return
+        MQTT_PUBLISHES.inc(topic_class=self.topic_class(topic))
+        self._send_payload(topic, payload, retain=retain)
+
+    @abstractmethod
+    def _send_payload(
+        self, topic: str, payload: WirePayload | None, *, retain: bool
+    ) -> None:
+        """Hand a payload to the transport, implemented by concrete publishers."""
+        raise NotImplementedError
+
+    def get_mqtt_account_prefix(self, saic_user: str | None = None) -> str:
+        if saic_user is None:
+            saic_user = self.configuration.saic_user
+        return self.__remove_special_mqtt_characters(f"{self.__topic_root}/{saic_user}")
 
     def get_topic(self, key: str, no_prefix: bool) -> str:
+        cache_key = (key, no_prefix)
+        if (topic := self.__topic_cache.get(cache_key)) is not None:
+            return topic
         topic = key if no_prefix else f"{self.__topic_root}/{key}"
-        return self.__remove_special_mqtt_characters(topic)
+        topic = sys.intern(self.__remove_special_mqtt_characters(topic))
+        if len(self.__topic_cache) >= TOPIC_CACHE_MAX_SIZE:
+            # The topics of a gateway are a small fixed set, evicting the oldest
+            # entry only guards against unbounded growth from unexpected keys
+            del self.__topic_cache[next(iter(self.__topic_cache))]
+        self.__topic_cache[cache_key] = topic
+        return topic
+
+    def topic_class(self, topic: str) -> str:
+        """Coarse grouping of a topic that keeps the metrics cardinality low.
+
+        The first level below the vehicle or account prefix, or the first level
+        of topics outside the gateway topic root, e.g. Home Assistant discovery.
+        """
+        if (cached := self.__topic_classes.get(topic)) is not None:
+            return cached
+        levels = topic.split("/")
+        root_levels = self.__topic_root.split("/")
+        if levels[: len(root_levels)] == root_levels:
+            levels = levels[len(root_levels) + 1 :]
+            if len(levels) > 2 and levels[0] == mqtt_topics.VEHICLES:
+                levels = levels[2:]
+        topic_class = levels[0] if levels else ""
+        if len(self.__topic_classes) >= TOPIC_CACHE_MAX_SIZE:
+            del self.__topic_classes[next(iter(self.__topic_classes))]
+        self.__topic_classes[topic] = topic_class
+        return topic_class
 
     def __remove_special_mqtt_characters(self, input_str: str) -> str:
         return self.__invalid_mqtt_chars.sub("_", input_str)
 
-    def __remove_byte_strings(self, data: dict[str, Any]) -> dict[str, Any]:
-        for key in data:  # noqa: PLC0206
-            if isinstance(data[key], bytes):
-                data[key] = str(data[key])
-            elif isinstance(data[key], dict):
-                data[key] = self.__remove_byte_strings(data[key])
-            elif isinstance(data[key], list):
-                for item in data[key]:
-                    if isinstance(item, dict):
-                        self.__remove_byte_strings(item)
-        return data
+    def __build_anonymization_rules(self) -> dict[str, _AnonymizationRule]:
+        rules: dict[str, _AnonymizationRule] = {
+            "password": (str, lambda _: "******"),
+            "deviceId": (str, self.anonymize_device_id),
+            "content": (str, lambda value: _MASKED_SUFFIX.sub("(***XXX)", value)),
+        }
+        rules.update(dict.fromkeys(_ANONYMIZED_STRINGS, (str, Publisher.anonymize_str)))
+        rules.update(
+            dict.fromkeys(_ANONYMIZED_NUMBERS, ((int, float), Publisher.anonymize_int))
+        )
+        rules.update(dict.fromkeys(_ANONYMIZED_EVENT_IDS, (str, lambda _: 9999)))
+        return rules
 
-    def __anonymize(self, data: T) -> T:
+    def __anonymized(self, data: Any) -> Any:
+        """Return an anonymized copy of the data, leaving the data untouched."""
         if isinstance(data, dict):
-            for key in data:
-                if isinstance(data[key], str):
-                    match key:
-                        case "password":
-                            data[key] = "******"
-                        case (
-                            "uid"
-                            | "email"
-                            | "user_name"
-                            | "account"
-                            | "ping"
-                            | "token"
-                            | "access_token"
-                            | "refreshToken"
-                            | "refresh_token"
-                            | "vin"
-                        ):
-                            data[key] = Publisher.anonymize_str(data[key])
-                        case "deviceId":
-                            data[key] = self.anonymize_device_id(data[key])
-                        case (
-                            "seconds"
-                            | "bindTime"
-                            | "eventCreationTime"
-                            | "latitude"
-                            | "longitude"
-                        ):
-                            data[key] = Publisher.anonymize_int(data[key])
-                        case (
-                            "eventID"
-                            | "event-id"
-                            | "event_id"
-                            | "eventId"
-                            | "lastKeySeen"
-                        ):
-                            data[key] = 9999
-                        case "content":
-                            data[key] = re.sub(
-                                "\\(\\*\\*\\*...\\)", "(***XXX)", data[key]
-                            )
-                elif isinstance(data[key], dict):
-                    data[key] = self.__anonymize(data[key])
-                elif isinstance(data[key], list | set | tuple):
-                    data[key] = [self.__anonymize(item) for item in data[key]]
+            rules = self.__anonymization_rules
+            result: dict[str, Any] = {}
+            for key, value in data.items():
+                field_value = str(value) if isinstance(value, bytes) else value
+                rule = rules.get(key)
+                if rule is not None and isinstance(field_value, rule[0]):
+                    result[key] = rule[1](field_value)
+                elif isinstance(field_value, dict | list | set | tuple):
+                    result[key] = self.__anonymized(field_value)
+                else:
+                    result[key] = field_value
+            return result
+        if isinstance(data, list | set | tuple):
+            return [self.__anonymized(item) for item in data]
         return data
 
     def keepalive(self) -> None:
@@ -253,8 +552,7 @@ class Publisher(ABC):
 
     @staticmethod
     def anonymize_str(value: str) -> str:
-        r = re.sub("[a-zA-Z]", "X", value)
-        return re.sub("[1-9]", "9", r)
+        return _NON_ZERO_DIGITS.sub("9", _LETTERS.sub("X", value))
 
     def anonymize_device_id(self, device_id: str) -> str:
         elements = device_id.split("###", maxsplit=1)
@@ -265,16 +563,34 @@ class Publisher(ABC):
         return self.anonymize_str(device_id)
 
     @staticmethod
-    def anonymize_int(value: int) -> int:
-        return int(value / 100000 * 100000)
+    def anonymize_int(value: float) -> int:
+        """Coarsen a timestamp or a coordinate.
 
-    def dict_to_anonymized_json(self, data: dict[str, Any]) -> str:
-        no_binary_strings = self.__remove_byte_strings(data)
+        Integers, such as timestamps and coordinates in millionths of a degree,
+        are rounded down to a multiple of 100000. Floats, such as coordinates
+        in degrees, are truncated to a whole number.
+        """
+        if isinstance(value, int):
+            return value // 100000 * 100000
+        return int(value)
+
+    def dict_to_anonymized_json(
+        self, data: dict[str, Any], *, indent: int | None = None
+    ) -> str:
+        """Encode the data as JSON, anonymized if so configured.
+
+        The output is compact unless `indent` is given, for readable captures.
+        The data is not modified. Without anonymization the json module walks
+        it on its own, bytes and sets are converted as they are met.
+        """
         if self.configuration.anonymized_publishing:
-            result = self.__anonymize(no_binary_strings)
-        else:
-            result = no_binary_strings
-        return json.dumps(result, indent=2)
+            data = self.__anonymized(data)
+        return json.dumps(
+            data,
+            indent=indent,
+            separators=None if indent is not None else _COMPACT_SEPARATORS,
+            default=_json_default,
+        )
 
     @property
     def configuration(self) -> Configuration:
@@ -32,35 +32,41 @@ class ConsolePublisher(Publisher):
         retain: bool = True,
     ) -> None:
         anonymized_json = self.dict_to_anonymized_json(data)
-        self.internal_publish(key, anonymized_json, retain=retain)
+        self._publish_payload(key, anonymized_json, retain=retain)
 
     @override
     def publish_str(
         self, key: str, value: str, no_prefix: bool = False, *, retain: bool = True
     ) -> None:
-        self.internal_publish(key, value, retain=retain)
+        self._publish_payload(key, value, retain=retain)
 
     @override
     def publish_int(
         self, key: str, value: int, no_prefix: bool = False, *, retain: bool = True
     ) -> None:
-        self.internal_publish(key, value, retain=retain)
+        self._publish_payload(key, value, retain=retain)
 
     @override
     def publish_bool(
         self, key: str, value: bool, no_prefix: bool = False, *, retain: bool = True
     ) -> None:
-        self.internal_publish(key, value, retain=retain)
+        self._publish_payload(key, value, retain=retain)
 
     @override
     def publish_float(
         self, key: str, value: float, no_prefix: bool = False, *, retain: bool = True
     ) -> None:
-        self.internal_publish(key, value, retain=retain)
+        self._publish_payload(key, value, retain=retain)
 
     @override
     def clear_topic(self, key: str, no_prefix: bool = False) -> None:
-        self.internal_publish(key, None)
+        self._publish_payload(key, None)
+
+    @override
+    def _send_payload(
+        self, topic: str, payload: WirePayload | None, *, retain: bool
+    ) -> None:
+        self.internal_publish(topic, payload, retain=retain)
 
     def internal_publish(
         self, key: str, value: WirePayload | None, *, retain: bool = True
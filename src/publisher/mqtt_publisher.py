@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 import logging
 import math
 import ssl
@@ -8,15 +9,21 @@ from typing import TYPE_CHECKING, Any, Final, cast, override
 import gmqtt
 
 import mqtt_topics
-from publisher.core import Publisher
+from publisher.core import Publisher, encode_payload
+from publisher.topic_router import TopicRouter
 
 if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
     from configuration import Configuration
     from integrations.openwb.charging_station import ChargingStation
     from publisher.core import WirePayload
 
 LOG = logging.getLogger(__name__)
 
+# Handles an inbound message: topic, payload, retained flag and wildcard levels
+type InboundHandler = Callable[[str, str, bool, tuple[str, ...]], Awaitable[None]]
+
 
 class MqttPublisher(Publisher):
     def __init__(self, configuration: Configuration) -> None:
@@ -25,10 +32,11 @@ class MqttPublisher(Publisher):
         self.host = self.configuration.mqtt_host
         self.port = self.configuration.mqtt_port
         self.transport_protocol = self.configuration.mqtt_transport_protocol
-        self.vin_by_charge_state_topic: dict[str, str] = {}
         self.last_charge_state_by_vin: dict[str, str] = {}
-        self.vin_by_charger_connected_topic: dict[str, str] = {}
-        self.vin_by_imported_energy_topic: dict[str, str] = {}
+        # Every subscription maps to its handler, so that dispatch does not depend on their number
+        self.__router: TopicRouter[InboundHandler] = TopicRouter()
+        self.__command_accounts: list[str] = []
+        self.__retained_topic_filters: list[str] = []
         self.first_connection = True
 
         mqtt_client = gmqtt.Client(
@@ -81,6 +89,9 @@ class MqttPublisher(Publisher):
         if rc == gmqtt.constants.CONNACK_ACCEPTED:
             LOG.info("Connected to MQTT broker")
             if not self.first_connection:
+                # The broker may have lost retained messages while we were away
+                self.invalidate_last_value_cache()
+                self.retained_fingerprints.forget_received()
                 self.enable_commands()
                 if self.command_listener is not None:
                     self.command_listener.on_mqtt_reconnected()
@@ -103,47 +114,79 @@ class MqttPublisher(Publisher):
     @override
     def enable_commands(self) -> None:
         LOG.info("Subscribing to MQTT command topics")
-        mqtt_account_prefix = self.get_mqtt_account_prefix()
-        self.client.subscribe(
-            f"{mqtt_account_prefix}/{mqtt_topics.VEHICLES}/+/+/+/{mqtt_topics.SET_SUFFIX}"
-        )
-        self.client.subscribe(
-            f"{mqtt_account_prefix}/{mqtt_topics.VEHICLES}/+/+/+/+/{mqtt_topics.SET_SUFFIX}"
-        )
-        self.client.subscribe(
-            f"{mqtt_account_prefix}/{mqtt_topics.VEHICLES}/+/{mqtt_topics.REFRESH_MODE}/{mqtt_topics.SET_SUFFIX}"
-        )
-        self.client.subscribe(
-            f"{mqtt_account_prefix}/{mqtt_topics.VEHICLES}/+/{mqtt_topics.REFRESH_PERIOD}/+/{mqtt_topics.SET_SUFFIX}"
-        )
+        for saic_user in self.__command_accounts:
+            self.__subscribe_account_commands(saic_user)
+        for topic_filter in self.__retained_topic_filters:
+            self.client.subscribe(topic_filter)
         for charging_station in self.configuration.charging_stations_by_vin.values():
+            vin = charging_station.vin
             LOG.debug(
                 f"Subscribing to MQTT topic {charging_station.charge_state_topic}"
             )
-            self.vin_by_charge_state_topic[charging_station.charge_state_topic] = (
-                charging_station.vin
+            self.__router.add(
+                charging_station.charge_state_topic,
+                functools.partial(self.__on_charge_state, vin),
             )
             self.client.subscribe(charging_station.charge_state_topic)
             if charging_station.connected_topic:
                 LOG.debug(
                     f"Subscribing to MQTT topic {charging_station.connected_topic}"
                 )
-                self.vin_by_charger_connected_topic[
-                    charging_station.connected_topic
-                ] = charging_station.vin
+                self.__router.add(
+                    charging_station.connected_topic,
+                    functools.partial(self.__on_charger_connected, vin),
+                )
                 self.client.subscribe(charging_station.connected_topic)
             if charging_station.imported_energy_topic:
                 LOG.debug(
                     f"Subscribing to MQTT topic {charging_station.imported_energy_topic}"
                 )
-                self.vin_by_imported_energy_topic[
-                    charging_station.imported_energy_topic
-                ] = charging_station.vin
+                self.__router.add(
+                    charging_station.imported_energy_topic,
+                    functools.partial(self.__on_imported_energy, vin),
+                )
                 self.client.subscribe(charging_station.imported_energy_topic)
+        self.__router.add(self.configuration.ha_lwt_topic, self.__on_global_command)
         if self.configuration.ha_discovery_enabled:
             # enable dynamic discovery pushing in case ha reconnects
             self.client.subscribe(self.configuration.ha_lwt_topic)
 
+    @override
+    def enable_account_commands(self, saic_user: str) -> None:
+        if saic_user in self.__command_accounts:
+            return
+        self.__command_accounts.append(saic_user)
+        self.__subscribe_account_commands(saic_user)
+
+    @override
+    def track_retained_topics(self, topic_filter: str) -> None:
+        if topic_filter in self.__retained_topic_filters:
+            return
+        self.__retained_topic_filters.append(topic_filter)
+        self.__router.add(topic_filter, self.__on_retained_topic)
+        LOG.debug(f"Subscribing to retained MQTT topics {topic_filter}")
+        self.client.subscribe(topic_filter)
+
+    def __subscribe_account_commands(self, saic_user: str) -> None:
+        LOG.info(f"Subscribing to MQTT command topics of account {saic_user}")
+        mqtt_account_prefix = self.get_mqtt_account_prefix(saic_user)
+        self.__router.add(
+            f"{mqtt_account_prefix}/{mqtt_topics.VEHICLES}/+/#",
+            self.__on_vehicle_command,
+        )
+        self.client.subscribe(
+            f"{mqtt_account_prefix}/{mqtt_topics.VEHICLES}/+/+/+/{mqtt_topics.SET_SUFFIX}"
+        )
+        self.client.subscribe(
+            f"{mqtt_account_prefix}/{mqtt_topics.VEHICLES}/+/+/+/+/{mqtt_topics.SET_SUFFIX}"
+        )
+        self.client.subscribe(
+            f"{mqtt_account_prefix}/{mqtt_topics.VEHICLES}/+/{mqtt_topics.REFRESH_MODE}/{mqtt_topics.SET_SUFFIX}"
+        )
+        self.client.subscribe(
+            f"{mqtt_account_prefix}/{mqtt_topics.VEHICLES}/+/{mqtt_topics.REFRESH_PERIOD}/+/{mqtt_topics.SET_SUFFIX}"
+        )
+
     async def __on_message(
         self, _client: Any, topic: str, payload: Any, _qos: Any, _properties: Any
     ) -> None:
@@ -162,50 +205,83 @@ class MqttPublisher(Publisher):
     async def __on_message_real(
         self, *, topic: str, payload: str, retained: bool
     ) -> None:
-        if topic in self.vin_by_charge_state_topic:
-            LOG.debug(f"Received message over topic {topic} with payload {payload}")
-            vin = self.vin_by_charge_state_topic[topic]
-            charging_station = self.configuration.charging_stations_by_vin[vin]
-            if self.should_force_refresh(payload, charging_station):
-                LOG.info(
-                    f"Vehicle with vin {vin} is charging. Setting refresh mode to force"
-                )
-                if self.command_listener is not None:
-                    await self.command_listener.on_charging_detected(vin)
-        elif topic in self.vin_by_charger_connected_topic:
-            LOG.debug(f"Received message over topic {topic} with payload {payload}")
-            vin = self.vin_by_charger_connected_topic[topic]
-            charging_station = self.configuration.charging_stations_by_vin[vin]
-            connected = payload == charging_station.connected_value
-            if connected:
-                LOG.debug(
-                    f"Vehicle with vin {vin} is connected to its charging station"
-                )
-            else:
-                LOG.debug(
-                    f"Vehicle with vin {vin} is disconnected from its charging station"
-                )
-            if self.command_listener is not None:
-                await self.command_listener.on_charger_connection_state_changed(
-                    vin, connected
-                )
-        elif topic in self.vin_by_imported_energy_topic:
-            await self.__handle_imported_energy(topic, payload)
-        elif topic == self.configuration.ha_lwt_topic:
-            if self.command_listener is not None:
-                await self.command_listener.on_mqtt_global_command_received(
-                    topic=topic, payload=payload
-                )
-        else:
+        route = self.__router.match(topic)
+        if route is None:
+            # Not subscribed by the gateway, try it as a vehicle command anyway
             vin = self.get_vin_from_topic(topic)
+            await self.__on_vehicle_command(topic, payload, retained, (vin,))
+            return
+        await route.value(topic, payload, retained, route.wildcards)
+
+    async def __on_retained_topic(
+        self, topic: str, payload: str, _retained: bool, _wildcards: tuple[str, ...]
+    ) -> None:
+        self.retained_fingerprints.record_received(topic, payload)
+
+    async def __on_vehicle_command(
+        self, topic: str, payload: str, retained: bool, wildcards: tuple[str, ...]
+    ) -> None:
+        if self.command_listener is not None:
+            await self.command_listener.on_mqtt_command_received(
+                vin=wildcards[0], topic=topic, payload=payload, retained=retained
+            )
+
+    async def __on_global_command(
+        self, topic: str, payload: str, _retained: bool, _wildcards: tuple[str, ...]
+    ) -> None:
+        if self.command_listener is not None:
+            await self.command_listener.on_mqtt_global_command_received(
+                topic=topic, payload=payload
+            )
+
+    async def __on_charge_state(
+        self,
+        vin: str,
+        topic: str,
+        payload: str,
+        _retained: bool,
+        _wildcards: tuple[str, ...],
+    ) -> None:
+        LOG.debug(f"Received message over topic {topic} with payload {payload}")
+        charging_station = self.configuration.charging_stations_by_vin[vin]
+        if self.should_force_refresh(payload, charging_station):
+            LOG.info(
+                f"Vehicle with vin {vin} is charging. Setting refresh mode to force"
+            )
             if self.command_listener is not None:
-                await self.command_listener.on_mqtt_command_received(
-                    vin=vin, topic=topic, payload=payload, retained=retained
-                )
+                await self.command_listener.on_charging_detected(vin)
 
-    async def __handle_imported_energy(self, topic: str, payload: str) -> None:
+    async def __on_charger_connected(
+        self,
+        vin: str,
+        topic: str,
+        payload: str,
+        _retained: bool,
+        _wildcards: tuple[str, ...],
+    ) -> None:
+        LOG.debug(f"Received message over topic {topic} with payload {payload}")
+        charging_station = self.configuration.charging_stations_by_vin[vin]
+        connected = payload == charging_station.connected_value
+        if connected:
+            LOG.debug(f"Vehicle with vin {vin} is connected to its charging station")
+        else:
+            LOG.debug(
+                f"Vehicle with vin {vin} is disconnected from its charging station"
+            )
+        if self.command_listener is not None:
+            await self.command_listener.on_charger_connection_state_changed(
+                vin, connected
+            )
+
+    async def __on_imported_energy(
+        self,
+        vin: str,
+        topic: str,
+        payload: str,
+        _retained: bool,
+        _wildcards: tuple[str, ...],
+    ) -> None:
         LOG.debug(f"Received message over topic {topic} with payload {payload}")
-        vin = self.vin_by_imported_energy_topic[topic]
         try:
             imported_energy_wh = float(payload)
         except (ValueError, TypeError):
@@ -227,10 +303,11 @@ class MqttPublisher(Publisher):
                 vin, imported_energy_wh
             )
 
-    def __publish(
-        self, topic: str, payload: WirePayload | None, *, retain: bool = True
+    @override
+    def _send_payload(
+        self, topic: str, payload: WirePayload | None, *, retain: bool
     ) -> None:
-        self.client.publish(topic, payload, retain=retain)
+        self.client.publish(topic, encode_payload(payload), retain=retain)
 
     @override
     def is_connected(self) -> bool:
@@ -246,7 +323,7 @@ class MqttPublisher(Publisher):
         retain: bool = True,
     ) -> None:
         payload = self.dict_to_anonymized_json(data)
-        self.__publish(
+        self._publish_payload(
             topic=self.get_topic(key, no_prefix), payload=payload, retain=retain
         )
 
@@ -254,7 +331,7 @@ class MqttPublisher(Publisher):
     def publish_str(
         self, key: str, value: str, no_prefix: bool = False, *, retain: bool = True
     ) -> None:
-        self.__publish(
+        self._publish_payload(
             topic=self.get_topic(key, no_prefix), payload=value, retain=retain
         )
 
@@ -262,7 +339,7 @@ class MqttPublisher(Publisher):
     def publish_int(
         self, key: str, value: int, no_prefix: bool = False, *, retain: bool = True
     ) -> None:
-        self.__publish(
+        self._publish_payload(
             topic=self.get_topic(key, no_prefix), payload=value, retain=retain
         )
 
@@ -270,7 +347,7 @@ class MqttPublisher(Publisher):
     def publish_bool(
         self, key: str, value: bool, no_prefix: bool = False, *, retain: bool = True
     ) -> None:
-        self.__publish(
+        self._publish_payload(
             topic=self.get_topic(key, no_prefix), payload=value, retain=retain
         )
 
@@ -278,13 +355,13 @@ class MqttPublisher(Publisher):
     def publish_float(
         self, key: str, value: float, no_prefix: bool = False, *, retain: bool = True
     ) -> None:
-        self.__publish(
+        self._publish_payload(
             topic=self.get_topic(key, no_prefix), payload=value, retain=retain
         )
 
     @override
     def clear_topic(self, key: str, no_prefix: bool = False) -> None:
-        self.__publish(topic=self.get_topic(key, no_prefix), payload=None)
+        self._publish_payload(topic=self.get_topic(key, no_prefix), payload=None)
 
     def get_vin_from_topic(self, topic: str) -> str:
         global_topic_removed = topic[len(self.configuration.mqtt_topic) + 1 :]
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+
+STATE_FILE_NAME = "retained_fingerprints.json"
+
+
+def fingerprint(payload: str) -> str:
+    return hashlib.sha256(payload.encode("utf-8", errors="replace")).hexdigest()
+
+
+class RetainedFingerprints:
+    """Fingerprints of the retained payloads published on tracked topics.
+
+    A payload counts as retained when it matches what the gateway last
+    published on its topic and the broker delivered that same payload back on
+    a subscription. The published fingerprints are kept in `path`, if given,
+    so that they survive a restart. Broker confirmations are only kept in
+    memory, they are delivered again whenever the topics are subscribed.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.__path = path
+        self.__published: dict[str, str] = self.__load()
+        self.__confirmed: dict[str, str] = {}
+        self.__dirty = False
+
+    def __load(self) -> dict[str, str]:
+        if self.__path is None or not self.__path.exists():
+            return {}
+        try:
+            with self.__path.open(encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            LOG.warning(
+                "Could not read retained fingerprints from %s, starting afresh",
+                self.__path,
+                exc_info=True,
+            )
+            return {}
+        if not isinstance(data, dict):
+            LOG.warning("Ignoring malformed retained fingerprints in %s", self.__path)
+            return {}
+        return {str(k): str(v) for k, v in data.items()}
+
+    def is_retained(
+        self, topic: str, payload: str, *, payload_fingerprint: str | None = None
+    ) -> bool:
+        """Whether the broker retains `payload` on `topic`.
+
+        Callers that publish the same payload repeatedly can pass its
+        precomputed `payload_fingerprint`.
+        """
+        if (published := self.__published.get(topic)) is None:
+            return False
+        if published != self.__confirmed.get(topic):
+            return False
+        return published == (payload_fingerprint or fingerprint(payload))
+
+    def record_published(
+        self, topic: str, payload: str, *, payload_fingerprint: str | None = None
+    ) -> None:
+        value = payload_fingerprint or fingerprint(payload)
+        if self.__published.get(topic) != value:
+            self.__published[topic] = value
+            self.__dirty = True
+
+    def record_received(self, topic: str, payload: str) -> None:
+        """Remember what the broker delivered on a tracked topic."""
+        if payload:
+            self.__confirmed[topic] = fingerprint(payload)
+            return
+        # An empty retained payload deletes the topic from the broker
+        self.__confirmed.pop(topic, None)
+        if self.__published.pop(topic, None) is not None:
+            self.__dirty = True
+
+    def received_topics(self) -> list[str]:
+        """Return the topics on which the broker delivered a retained payload."""
+        return list(self.__confirmed)
+
+    def forget_received(self) -> None:
+        """Forget every broker confirmation, e.g. after a reconnect."""
+        self.__confirmed.clear()
+
+    def save(self) -> None:
+        if self.__path is None or not self.__dirty:
+            return
+        tmp_path = self.__path.with_name(f".{self.__path.name}.tmp")
+        try:
+            self.__path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(self.__published, f, sort_keys=True)
+            tmp_path.replace(self.__path)
+            self.__dirty = False
+        except OSError:
+            LOG.warning(
+                "Could not save retained fingerprints to %s", self.__path, exc_info=True
+            )
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+SINGLE_LEVEL_WILDCARD = "+"
+MULTI_LEVEL_WILDCARD = "#"
+
+
+@dataclass(frozen=True, kw_only=True)
+class TopicMatch[T]:
+    value: T
+    # The topic levels matched by each `+`, then what `#` matched, if any
+    wildcards: tuple[str, ...]
+
+
+@dataclass
+class _Node[T]:
+    children: dict[str, _Node[T]] = field(default_factory=dict)
+    single_level: _Node[T] | None = None
+    # Set when a filter ends at this node, respectively with a trailing `#`
+    value: T | None = None
+    multi_level_value: T | None = None
+
+
+class TopicRouter[T]:
+    """Map MQTT topic filters to values, looked up one topic level at a time.
+
+    A lookup costs as much as the depth of the topic, however many filters are
+    registered. When several filters match, the most specific one wins: a
+    literal level beats `+`, which beats `#`.
+    """
+
+    def __init__(self) -> None:
+        self.__root: _Node[T] = _Node()
+
+    def add(self, topic_filter: str, value: T) -> None:
+        """Route the topics matching the filter to the value, replacing any previous one."""
+        node = self.__root
+        levels = topic_filter.split("/")
+        for i, level in enumerate(levels):
+            if level == MULTI_LEVEL_WILDCARD:
+                if i != len(levels) - 1:
+                    msg = f"# must be the last level of the topic filter {topic_filter}"
+                    raise ValueError(msg)
+                node.multi_level_value = value
+                return
+            if level == SINGLE_LEVEL_WILDCARD:
+                if node.single_level is None:
+                    node.single_level = _Node()
+                node = node.single_level
+            else:
+                node = node.children.setdefault(level, _Node())
+        node.value = value
+
+    def match(self, topic: str) -> TopicMatch[T] | None:
+        return self.__match(self.__root, topic.split("/"), 0, [])
+
+    def __match(
+        self, node: _Node[T], levels: list[str], depth: int, wildcards: list[str]
+    ) -> TopicMatch[T] | None:
+        if depth == len(levels):
+            if node.value is not None:
+                return TopicMatch(value=node.value, wildcards=tuple(wildcards))
+            if node.multi_level_value is not None:
+                # `a/#` also matches `a`
+                return TopicMatch(
+                    value=node.multi_level_value, wildcards=(*wildcards, "")
+                )
+            return None
+
+        level = levels[depth]
+        found = None
+        if (child := node.children.get(level)) is not None:
+            found = self.__match(child, levels, depth + 1, wildcards)
+        if found is None and node.single_level is not None:
+            wildcards.append(level)
+            found = self.__match(node.single_level, levels, depth + 1, wildcards)
+            if found is None:
+                wildcards.pop()
+        if found is None and node.multi_level_value is not None:
+            found = TopicMatch(
+                value=node.multi_level_value,
+                wildcards=(*wildcards, "/".join(levels[depth:])),
+            )
+        return found
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """Whether `topic` matches an MQTT topic filter with `+` and `#` wildcards.
+
+    Meant for one-off checks, build a :class:`TopicRouter` to test many topics.
+    """
+    router: TopicRouter[bool] = TopicRouter()
+    router.add(topic_filter, True)
+    return router.match(topic) is not None
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+from enum import IntEnum, unique
+import heapq
+import itertools
+import logging
+import time
+from typing import TYPE_CHECKING, Any, override
+
+from saic_ismart_client_ng import SaicApi
+from saic_ismart_client_ng.listener import SaicApiListener
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from saic_ismart_client_ng.model import SaicApiConfiguration
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+# How many seconds worth of requests can be sent at once after a quiet period
+BURST_SECONDS = 2.0
+
+
+@unique
+class ApiPriority(IntEnum):
+    """Priority lanes of the SAIC API calls, lower values are served first."""
+
+    COMMAND = 0
+    CHARGING_POLL = 1
+    POLL = 2
+    BACKGROUND = 3
+
+
+# Priority of the SAIC API calls made by the current task
+api_priority: contextvars.ContextVar[ApiPriority] = contextvars.ContextVar(
+    "api_priority", default=ApiPriority.BACKGROUND
+)
+
+
+@contextlib.contextmanager
+def api_priority_scope(priority: ApiPriority) -> Iterator[None]:
+    token = api_priority.set(priority)
+    try:
+        yield
+    finally:
+        api_priority.reset(token)
+
+
+class _LaneStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "waiting": self.waiting,
+            "avgWait": round(self.total_wait / self.requests, 3)
+            if self.requests
+            else 0.0,
+            "maxWait": round(self.max_wait, 3),
+        }
+
+
+class PriorityRateLimiter:
+    """Token bucket shared by all the SAIC API calls of an account.
+
+    When the bucket is empty, callers queue up and tokens are handed out by
+    priority, then in arrival order within a priority.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        burst: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.__rate = requests_per_second
+        self.__burst = (
+            burst
+            if burst is not None
+            else max(1.0, requests_per_second * BURST_SECONDS)
+        )
+        self.__clock = clock
+        self.__tokens = self.__burst
+        self.__updated_at = clock()
+        self.__waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self.__sequence = itertools.count()
+        self.__wakeup: asyncio.TimerHandle | None = None
+        self.__lanes = {priority: _LaneStats() for priority in ApiPriority}
+
+    def __refill(self) -> None:
+        now = self.__clock()
+        elapsed = now - self.__updated_at
+        self.__updated_at = now
+        self.__tokens = min(self.__burst, self.__tokens + elapsed * self.__rate)
+
+    async def acquire(self, priority: ApiPriority) -> float:
+        """Wait for a token and return how long that took, in seconds."""
+        started_at = self.__clock()
+        lane = self.__lanes[priority]
+        self.__refill()
+        if not self.__waiters and self.__tokens >= 1:
+            self.__tokens -= 1
+            lane.requests += 1
+            return 0.0
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.__waiters, (priority, next(self.__sequence), future))
+        lane.waiting += 1
+        self.__schedule_wakeup()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted but never used, hand the token back
+                self.__tokens += 1
+                self.__hand_out_tokens()
+            raise
+        finally:
+            lane.waiting -= 1
+        waited = self.__clock() - started_at
+        lane.requests += 1
+        lane.total_wait += waited
+        lane.max_wait = max(lane.max_wait, waited)
+        return waited
+
+    def __schedule_wakeup(self) -> None:
+        if self.__wakeup is not None or not self.__waiters:
+            return
+        delay = max(0.0, (1 - self.__tokens) / self.__rate)
+        self.__wakeup = asyncio.get_running_loop().call_later(delay, self.__on_wakeup)
+
+    def __on_wakeup(self) -> None:
+        self.__wakeup = None
+        self.__hand_out_tokens()
+
+    def __hand_out_tokens(self) -> None:
+        self.__refill()
+        while self.__waiters and self.__tokens >= 1:
+            _, _, future = heapq.heappop(self.__waiters)
+            if future.done():
+                # The caller gave up waiting
+                continue
+            self.__tokens -= 1
+            future.set_result(None)
+        self.__schedule_wakeup()
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            priority.name.lower(): lane.to_dict()
+            for priority, lane in self.__lanes.items()
+        }
+
+
+class _RateLimitingListener(SaicApiListener):
+    """Takes a token before every HTTP request, then hands it to `listener`.
+
+    The client calls `on_request` once per request it sends, including each
+    event-id retry of the library, right before the request goes out.
+    """
+
+    def __init__(
+        self, rate_limiter: PriorityRateLimiter, listener: SaicApiListener | None
+    ) -> None:
+        self.__rate_limiter = rate_limiter
+        self.__listener = listener
+
+    @override
+    async def on_request(
+        self, path: str, body: str | None = None, headers: dict[str, str] | None = None
+    ) -> None:
+        priority = api_priority.get()
+        waited = await self.__rate_limiter.acquire(priority)
+        if waited > 0:
+            LOG.debug(
+                "Waited %.3f seconds to call %s with priority %s",
+                waited,
+                path,
+                priority.name,
+            )
+        if self.__listener is not None:
+            await self.__listener.on_request(path, body, headers)
+
+    @override
+    async def on_response(
+        self, path: str, body: str | None = None, headers: dict[str, str] | None = None
+    ) -> None:
+        if self.__listener is not None:
+            await self.__listener.on_response(path, body, headers)
+
+
+class RateLimitedSaicApi(SaicApi):
+    """SAIC API client whose HTTP requests go through a `PriorityRateLimiter`.
+
+    Every request takes a token, the event-id retries of a call included. The
+    priority of a request is taken from `api_priority`, see `api_priority_scope`.
+    """
+
+    def __init__(
+        self,
+        configuration: SaicApiConfiguration,
+        listener: SaicApiListener | None = None,
+        *,
+        rate_limiter: PriorityRateLimiter,
+    ) -> None:
+        super().__init__(
+            configuration, listener=_RateLimitingListener(rate_limiter, listener)
+        )
+        self.rate_limiter = rate_limiter
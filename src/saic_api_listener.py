@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+from dataclasses import dataclass
 import json
 import logging
 from typing import TYPE_CHECKING, Any, override
@@ -9,6 +11,7 @@ from saic_ismart_client_ng.listener import SaicApiListener
 
 from integrations.abrp.api import AbrpApiListener
 from integrations.osmand.api import OsmAndApiListener
+from integrations.outbound_queue import OutboundQueue
 from mqtt_topics import INTERNAL_ABRP, INTERNAL_API, INTERNAL_OSMAND
 
 if TYPE_CHECKING:
@@ -16,11 +19,64 @@ if TYPE_CHECKING:
 
 LOG = logging.getLogger(__name__)
 
+# Bounds the captures waiting to be published and the requests waiting for a response
+MAX_PENDING_EXCHANGES = 32
+
+
+@dataclass(frozen=True, kw_only=True)
+class RawApiMessage:
+    topic: str
+    path: str
+    body: str | None
+    headers: dict[str, str] | None
+
+
+@dataclass(frozen=True, kw_only=True)
+class _RawApiExchange:
+    request: RawApiMessage | None = None
+    response: RawApiMessage | None = None
+    # Only published when the response reports an error
+    errors_only: bool = False
+
+
+def is_error_response(body: Any) -> bool:
+    """Tell whether a parsed response body reports a failure.
+
+    SAIC reports a non-zero `code`, ABRP a `status` other than `ok`.
+    """
+    if not isinstance(body, dict):
+        return False
+    if "code" in body:
+        return body["code"] not in (0, "0")
+    if "status" in body:
+        return str(body["status"]).lower() != "ok"
+    return False
+
 
 class MqttGatewayListenerApiListener:
+    """Publish the raw requests and responses of an API for debugging.
+
+    The listener is called inline by the API clients, so it only decides
+    whether a call is captured. Parsing, anonymizing and encoding the bodies
+    happen on a worker thread, fed by a bounded queue that drops the oldest
+    captures when the broker cannot keep up.
+    """
+
     def __init__(self, publisher: Publisher, topic_prefix: str) -> None:
         self.__publisher = publisher
         self.__topic_prefix = topic_prefix
+        config = publisher.configuration
+        self.__sample_rate = config.raw_api_data_sample_rate
+        self.__errors_only = config.raw_api_data_errors_only
+        self.__max_body_size = config.raw_api_data_max_body_size
+        self.__calls = 0
+        # Captured requests waiting for their response, by path
+        self.__requests: dict[str, RawApiMessage] = {}
+        self.__queue: OutboundQueue[_RawApiExchange] = OutboundQueue(
+            f"{topic_prefix.rsplit('/', 1)[-1]}_raw_data",
+            self.__publish_exchange,
+            max_pending=MAX_PENDING_EXCHANGES,
+        )
 
     async def publish_request(
         self,
@@ -28,23 +84,17 @@ class MqttGatewayListenerApiListener:
         body: str | None = None,
         headers: dict[str, str] | None = None,
     ) -> None:
-        parsed_url = urlparse(path)
-        query_string = parse_qs(parsed_url.query)
-        if body:
-            try:
-                body = json.loads(body)
-            except Exception as e:
-                LOG.debug("Could not parse body as JSON", exc_info=e)
-        json_message = {
-            "path": parsed_url.path,
-            "query": query_string,
-            "body": body,
-            "headers": headers,
-        }
-        topic = parsed_url.path.strip("/")
-        self.__internal_publish(
-            key=self.__topic_prefix + "/" + topic + "/request", data=json_message
-        )
+        sampled = self.__calls % self.__sample_rate == 0
+        self.__calls += 1
+        if not (sampled or self.__errors_only):
+            return
+        request = RawApiMessage(topic="request", path=path, body=body, headers=headers)
+        self.__requests.pop(path, None)
+        self.__requests[path] = request
+        while len(self.__requests) > MAX_PENDING_EXCHANGES:
+            del self.__requests[next(iter(self.__requests))]
+        if not self.__errors_only:
+            self.__queue.put(_RawApiExchange(request=request))
 
     async def publish_response(
         self,
@@ -52,30 +102,71 @@ class MqttGatewayListenerApiListener:
         body: str | None = None,
         headers: dict[str, str] | None = None,
     ) -> None:
-        parsed_url = urlparse(path)
-        query_string = parse_qs(parsed_url.query)
-        if body:
+        request = self.__requests.pop(path, None)
+        if request is None and not self.__errors_only:
+            return
+        response = RawApiMessage(
+            topic="response", path=path, body=body, headers=headers
+        )
+        if self.__errors_only:
+            self.__queue.put(
+                _RawApiExchange(request=request, response=response, errors_only=True)
+            )
+        else:
+            self.__queue.put(_RawApiExchange(response=response))
+
+    async def join(self) -> None:
+        """Wait until every captured call has been published."""
+        await self.__queue.join()
+
+    async def __publish_exchange(self, exchange: _RawApiExchange) -> tuple[bool, str]:
+        payloads = await asyncio.to_thread(self.__serialize, exchange)
+        for key, payload in payloads:
+            self.__internal_publish(key=key, payload=payload)
+        return bool(payloads), ""
+
+    def __serialize(self, exchange: _RawApiExchange) -> list[tuple[str, str]]:
+        """Encode the exchange, on a worker thread: only touch the exchange data."""
+        messages = [
+            (message, self.__to_dict(message))
+            for message in (exchange.request, exchange.response)
+            if message is not None
+        ]
+        if exchange.errors_only and not is_error_response(messages[-1][1]["body"]):
+            return []
+        return [
+            (
+                f"{self.__topic_prefix}/{data['path'].strip('/')}/{message.topic}",
+                self.__publisher.dict_to_anonymized_json(data),
+            )
+            for message, data in messages
+        ]
+
+    def __to_dict(self, message: RawApiMessage) -> dict[str, Any]:
+        parsed_url = urlparse(message.path)
+        body: Any = message.body
+        data: dict[str, Any] = {
+            "path": parsed_url.path,
+            "query": parse_qs(parsed_url.query),
+        }
+        if body and len(body) > self.__max_body_size:
+            data["bodySize"] = len(body)
+            body = body[: self.__max_body_size]
+        elif body:
             try:
                 body = json.loads(body)
             except Exception as e:
                 LOG.debug("Could not parse body as JSON", exc_info=e)
-        json_message = {
-            "path": parsed_url.path,
-            "query": query_string,
-            "body": body,
-            "headers": headers,
-        }
-        topic = parsed_url.path.strip("/")
-        self.__internal_publish(
-            key=self.__topic_prefix + "/" + topic + "/response", data=json_message
-        )
+        data["body"] = body
+        data["headers"] = message.headers
+        return data
 
-    def __internal_publish(self, *, key: str, data: dict[str, Any]) -> None:
+    def __internal_publish(self, *, key: str, payload: str) -> None:
         if self.__publisher and self.__publisher.is_connected():
-            self.__publisher.publish_json(key=key, data=data)
+            self.__publisher.publish_str(key, payload)
         else:
             LOG.info(
-                f"Not publishing API response to MQTT since publisher is not connected. {data}"
+                f"Not publishing API response to MQTT since publisher is not connected. {payload}"
             )
 
 
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+
+STATE_FILE_NAME = "state_snapshot.json"
+SNAPSHOT_VERSION = 1
+
+
+def datetime_to_snapshot(value: datetime.datetime) -> str:
+    return value.isoformat()
+
+
+def datetime_from_snapshot(value: Any) -> datetime.datetime:
+    result = datetime.datetime.fromisoformat(str(value))
+    if result.tzinfo is None:
+        return result.replace(tzinfo=datetime.UTC)
+    return result
+
+
+class StateSnapshot:
+    """Warm-start state of the gateway, kept in `path` across restarts.
+
+    The state is split in sections, each owned by the object that tracks it.
+    A tracked section is collected from its provider whenever the snapshot is
+    saved. A section loaded from disk is kept as is until its owner tracks it
+    again, so that a vehicle that is not set up yet does not lose its state.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.__path = path
+        self.__restored: dict[str, dict[str, Any]] = self.__load()
+        self.__providers: dict[str, Callable[[], dict[str, Any]]] = {}
+        self.__last_saved: str | None = None
+
+    def __load(self) -> dict[str, dict[str, Any]]:
+        if self.__path is None or not self.__path.exists():
+            return {}
+        try:
+            with self.__path.open(encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            LOG.warning(
+                "Could not read the state snapshot from %s, starting afresh",
+                self.__path,
+                exc_info=True,
+            )
+            return {}
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != SNAPSHOT_VERSION
+            or not isinstance(sections := data.get("sections"), dict)
+        ):
+            LOG.warning("Ignoring incompatible state snapshot in %s", self.__path)
+            return {}
+        return {str(k): v for k, v in sections.items() if isinstance(v, dict)}
+
+    def restore(self, key: str) -> dict[str, Any] | None:
+        """Return the section saved by a previous run, if any."""
+        return self.__restored.get(key)
+
+    def track(self, key: str, provider: Callable[[], dict[str, Any]]) -> None:
+        self.__providers[key] = provider
+
+    def untrack(self, key: str) -> None:
+        """Stop tracking a section and drop it from the snapshot."""
+        self.__providers.pop(key, None)
+        self.__restored.pop(key, None)
+
+    def save(self) -> None:
+        if self.__path is None:
+            return
+        sections = dict(self.__restored)
+        for key, provider in self.__providers.items():
+            try:
+                sections[key] = provider()
+            except Exception:
+                LOG.exception(f"Could not collect the {key} state snapshot")
+        serialized = json.dumps(
+            {"version": SNAPSHOT_VERSION, "sections": sections},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        if serialized == self.__last_saved:
+            return
+        tmp_path = self.__path.with_name(f".{self.__path.name}.tmp")
+        try:
+            self.__path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("w", encoding="utf-8") as f:
+                f.write(serialized)
+            tmp_path.replace(self.__path)
+            self.__last_saved = serialized
+        except OSError:
+            LOG.warning(
+                "Could not save the state snapshot to %s", self.__path, exc_info=True
+            )
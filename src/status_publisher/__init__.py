@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from abc import ABCMeta, abstractmethod
+import sys
 from typing import TYPE_CHECKING, Final
 
 from publisher.core import Publishable
@@ -19,6 +20,7 @@ class VehicleDataPublisher[I, O](metaclass=ABCMeta):
         self._vehicle_info: Final[VehicleInfo] = vin
         self.__publisher: Final[Publisher] = publisher
         self.__mqtt_vehicle_prefix: Final[str] = mqtt_vehicle_prefix
+        self.__topics: dict[str, str] = {}
 
     @abstractmethod
     def publish(self, data: I) -> O:
@@ -57,4 +59,8 @@ class VehicleDataPublisher[I, O](metaclass=ABCMeta):
         return True, transformed_value
 
     def __get_topic(self, sub_topic: str) -> str:
-        return f"{self.__mqtt_vehicle_prefix}/{sub_topic}"
+        # Sub-topics are module constants, so this stays as small as the schema
+        if (topic := self.__topics.get(sub_topic)) is None:
+            topic = sys.intern(f"{self.__mqtt_vehicle_prefix}/{sub_topic}")
+            self.__topics[sub_topic] = topic
+        return topic
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
 from enum import Enum, unique
 import logging
 import math
-from typing import TYPE_CHECKING, Final
+from typing import TYPE_CHECKING, Any, Final
 
 from apscheduler.triggers.cron import CronTrigger
 from saic_ismart_client_ng.api.vehicle_charging import (
@@ -15,9 +16,11 @@ from saic_ismart_client_ng.api.vehicle_charging import (
     TargetBatteryCode,
 )
 
+from circuit_breaker import BreakerState, CircuitBreaker
 from extractors import extract_electric_range, extract_soc, extract_soc_kwh
 import mqtt_topics
 from publisher.core import Publishable
+from state_snapshot import datetime_from_snapshot, datetime_to_snapshot
 from status_publisher.charge.chrg_mgmt_data_resp import (
     ChrgMgmtDataRespProcessingResult,
     ChrgMgmtDataRespPublisher,
@@ -112,8 +115,14 @@ class VehicleState:
             tzinfo=datetime.UTC
         )
         self.__last_failed_refresh: datetime.datetime | None = None
-        self.__failed_refresh_counter = 0
         self.__refresh_period_error = 30
+        # Backs off the refreshes of a failing vehicle, configured from the refresh periods on failure
+        self.__refresh_breaker = CircuitBreaker(
+            f"vehicle {vin_info.vin}",
+            base_delay=self.__refresh_period_error,
+            max_delay=self.__refresh_period_error,
+            on_state_change=self.__publish_refresh_breaker_state,
+        )
         self.last_car_shutdown: datetime.datetime = datetime.datetime.now(
             tz=datetime.UTC
         )
@@ -144,6 +153,8 @@ class VehicleState:
         self.__scheduled_battery_heating_enabled = False
         self.__scheduled_battery_heating_start: datetime.time | None = None
         self.__user_timezone: ZoneInfo | None = user_timezone
+        self.__refresh_trigger = asyncio.Event()
+        self.__refresh_trigger_loop: asyncio.AbstractEventLoop | None = None
 
     def set_refresh_period_active(self, seconds: int) -> None:
         if seconds != self.refresh_period_active:
@@ -155,6 +166,7 @@ class VehicleState:
                 f"Setting active query interval in vehicle handler for VIN {self.vin} to {human_readable_period}"
             )
             self.refresh_period_active = seconds
+            self.notify_refresh_trigger()
             # Recompute charging refresh period, if active refresh period is changed
             self.set_refresh_period_charging(self.refresh_period_charging)
 
@@ -168,6 +180,7 @@ class VehicleState:
                 f"Setting inactive query interval in vehicle handler for VIN {self.vin} to {human_readable_period}"
             )
             self.refresh_period_inactive = seconds
+            self.notify_refresh_trigger()
             # Recompute charging refresh period, if inactive refresh period is changed
             self.set_refresh_period_charging(self.refresh_period_charging)
 
@@ -188,6 +201,7 @@ class VehicleState:
                 f"Setting charging query interval in vehicle handler for VIN {self.vin} to {human_readable_period}"
             )
             self.refresh_period_charging = seconds
+            self.notify_refresh_trigger()
 
     def set_refresh_period_after_shutdown(self, seconds: int) -> None:
         if seconds != self.refresh_period_after_shutdown:
@@ -199,6 +213,7 @@ class VehicleState:
                 f"Setting after shutdown query interval in vehicle handler for VIN {self.vin} to {human_readable_period}"
             )
             self.refresh_period_after_shutdown = seconds
+            self.notify_refresh_trigger()
 
     def set_refresh_period_inactive_grace(
         self, refresh_period_inactive_grace: int
@@ -212,6 +227,7 @@ class VehicleState:
                 refresh_period_inactive_grace,
             )
             self.refresh_period_inactive_grace = refresh_period_inactive_grace
+            self.notify_refresh_trigger()
 
     def update_target_soc(self, target_soc: TargetBatteryCode) -> None:
         if self.target_soc != target_soc and target_soc is not None:
@@ -320,6 +336,7 @@ class VehicleState:
         self.publisher.publish_bool(
             self.get_topic(mqtt_topics.DRIVETRAIN_CHARGING), self.is_charging
         )
+        self.notify_refresh_trigger()
 
     def handle_vehicle_status(
         self, vehicle_status: VehicleStatusResp
@@ -375,6 +392,7 @@ class VehicleState:
             topic=mqtt_topics.REFRESH_LAST_ACTIVITY,
             value=self.last_car_activity,
         )
+        self.notify_refresh_trigger()
 
     def notify_message(self, message: MessageEntity) -> None:
         result = self.__message_publisher.publish(message)
@@ -414,6 +432,86 @@ class VehicleState:
                 )
                 return self.__should_do_periodic_refresh()
 
+    def seconds_until_refresh(self) -> float | None:
+        """Return the number of seconds until should_refresh() is expected to change its answer.
+
+        This mirrors the decision tree of should_refresh() without publishing anything.
+        None means that no refresh will become due on its own (refresh mode OFF).
+        """
+        match self.refresh_mode:
+            case RefreshMode.OFF:
+                return None
+            case RefreshMode.FORCE | RefreshMode.CHARGING_DETECTION:
+                return 0.0
+            case _:
+                now = datetime.datetime.now(tz=datetime.UTC)
+                next_refresh = self.__next_periodic_refresh(now)
+                return max((next_refresh - now).total_seconds(), 0.0)
+
+    def __next_periodic_refresh(self, now: datetime.datetime) -> datetime.datetime:
+        last_actual_poll = self.last_successful_refresh
+        if self.last_failed_refresh is not None:
+            last_actual_poll = max(last_actual_poll, self.last_failed_refresh)
+        if self.last_car_activity > last_actual_poll:
+            return now
+        if self.last_failed_refresh is not None:
+            return now + datetime.timedelta(
+                seconds=self.__refresh_breaker.seconds_until_retry() or 0.0
+            )
+        if self.is_charging and self.refresh_period_charging > 0:
+            return self.last_successful_refresh + datetime.timedelta(
+                seconds=float(self.refresh_period_charging)
+            )
+        if self.hv_battery_active:
+            return self.last_successful_refresh + datetime.timedelta(
+                seconds=float(self.refresh_period_active)
+            )
+        last_shutdown_plus_refresh = self.last_car_shutdown + datetime.timedelta(
+            seconds=float(self.refresh_period_inactive_grace)
+        )
+        if last_shutdown_plus_refresh > now:
+            # Wake up at the end of the grace period at the latest, the polling phase changes there
+            return min(
+                self.last_successful_refresh
+                + datetime.timedelta(seconds=float(self.refresh_period_after_shutdown)),
+                last_shutdown_plus_refresh,
+            )
+        return self.last_successful_refresh + datetime.timedelta(
+            seconds=float(self.refresh_period_inactive)
+        )
+
+    def notify_refresh_trigger(self) -> None:
+        """Wake up a pending wait_for_refresh_trigger() call.
+
+        Safe to call from any thread, e.g. from scheduler jobs running in a thread pool.
+        """
+        loop = self.__refresh_trigger_loop
+        if loop is None or loop.is_closed():
+            self.__refresh_trigger.set()
+            return
+        try:
+            running_loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            self.__refresh_trigger.set()
+        else:
+            loop.call_soon_threadsafe(self.__refresh_trigger.set)
+
+    async def wait_for_refresh_trigger(self, max_wait: float | None) -> bool:
+        """Wait until notify_refresh_trigger() is called or max_wait seconds have passed.
+
+        Returns True if woken up by a trigger, False on timeout.
+        """
+        self.__refresh_trigger_loop = asyncio.get_running_loop()
+        try:
+            async with asyncio.timeout(max_wait):
+                await self.__refresh_trigger.wait()
+        except TimeoutError:
+            return False
+        self.__refresh_trigger.clear()
+        return True
+
     def __should_do_periodic_refresh(self) -> bool:
         last_actual_poll = self.last_successful_refresh
         if self.last_failed_refresh is not None:
@@ -427,11 +525,12 @@ class VehicleState:
             self.__publish_polling_phase(PollingPhase.ACTIVE)
             return True
         if self.last_failed_refresh is not None:
-            threshold = datetime.datetime.now(tz=datetime.UTC) - datetime.timedelta(
-                seconds=float(self.refresh_period_error)
+            # Only a single probe is let through once the backoff has elapsed
+            result: bool = self.__refresh_breaker.before_request()
+            LOG.debug(
+                f"Gateway failed refresh previously, circuit breaker is {self.__refresh_breaker.state.value}."
+                f" Should refresh: {result}"
             )
-            result: bool = self.last_failed_refresh < threshold
-            LOG.debug(f"Gateway failed refresh previously. Should refresh: {result}")
             self.__publish_polling_phase(PollingPhase.ERROR_RECOVERY)
             return result
         if self.is_charging and self.refresh_period_charging > 0:
@@ -490,16 +589,17 @@ class VehicleState:
     def last_failed_refresh(self, value: datetime.datetime | None) -> None:
         self.__last_failed_refresh = value
         if value is None:
-            self.__failed_refresh_counter = 0
+            self.__refresh_breaker.record_success()
             self.__refresh_period_error = self.refresh_period_active
-        elif self.__refresh_period_error < self.refresh_period_inactive:
-            self.__refresh_period_error = round(
-                min(
-                    self.refresh_period_active * (2**self.__failed_refresh_counter),
-                    self.refresh_period_inactive,
-                )
-            )
-            self.__failed_refresh_counter = self.__failed_refresh_counter + 1
+        else:
+            # Back off exponentially from the active period up to the inactive one, with jitter
+            base_delay = max(self.refresh_period_active, 1)
+            self.__refresh_breaker.configure(
+                base_delay=base_delay,
+                max_delay=max(self.refresh_period_inactive, base_delay),
+            )
+            self.__refresh_breaker.record_failure()
+            self.__refresh_period_error = round(self.__refresh_breaker.retry_delay)
             self.publisher.publish_datetime(
                 self.get_topic(mqtt_topics.REFRESH_LAST_ERROR), value
             )
@@ -508,6 +608,15 @@ class VehicleState:
             self.__refresh_period_error,
         )
 
+    @property
+    def refresh_breaker_state(self) -> BreakerState:
+        return self.__refresh_breaker.state
+
+    def __publish_refresh_breaker_state(self, state: BreakerState) -> None:
+        self.publisher.publish_str(
+            self.get_topic(mqtt_topics.REFRESH_CIRCUIT_BREAKER), state.value
+        )
+
     def configure_missing(self) -> None:
         if self.refresh_period_active == -1:
             self.set_refresh_period_active(30)
@@ -527,6 +636,70 @@ class VehicleState:
                 f"initial gateway startup from an invalid state {self.refresh_mode}",
             )
 
+    def to_snapshot(self) -> dict[str, Any]:
+        return {
+            "last_successful_refresh": datetime_to_snapshot(
+                self.last_successful_refresh
+            ),
+            "last_car_activity": datetime_to_snapshot(self.last_car_activity),
+            "last_car_shutdown": datetime_to_snapshot(self.last_car_shutdown),
+            "refresh_period_active": self.refresh_period_active,
+            "refresh_period_inactive": self.refresh_period_inactive,
+            "refresh_period_after_shutdown": self.refresh_period_after_shutdown,
+            "refresh_period_inactive_grace": self.refresh_period_inactive_grace,
+            "refresh_period_charging": self.refresh_period_charging,
+            "is_charging": self.is_charging,
+            "hv_battery_active": self.hv_battery_active,
+        }
+
+    def restore_snapshot(self, snapshot: dict[str, Any]) -> None:
+        """Resume the polling cadence of a previous run.
+
+        Refresh periods received from MQTT afterwards take precedence.
+        """
+        try:
+            last_successful_refresh = datetime_from_snapshot(
+                snapshot["last_successful_refresh"]
+            )
+            last_car_activity = datetime_from_snapshot(snapshot["last_car_activity"])
+            last_car_shutdown = datetime_from_snapshot(snapshot["last_car_shutdown"])
+            refresh_periods = [
+                int(snapshot[key])
+                for key in (
+                    "refresh_period_active",
+                    "refresh_period_inactive",
+                    "refresh_period_after_shutdown",
+                    "refresh_period_inactive_grace",
+                    "refresh_period_charging",
+                )
+            ]
+            is_charging = bool(snapshot["is_charging"])
+            hv_battery_active = bool(snapshot["hv_battery_active"])
+        except (KeyError, TypeError, ValueError):
+            LOG.warning(
+                f"Ignoring malformed state snapshot of vehicle {self.vin}",
+                exc_info=True,
+            )
+            return
+        (active, inactive, after_shutdown, inactive_grace, charging) = refresh_periods
+        if active != -1:
+            self.set_refresh_period_active(active)
+        if inactive != -1:
+            self.set_refresh_period_inactive(inactive)
+        if after_shutdown != -1:
+            self.set_refresh_period_after_shutdown(after_shutdown)
+        if inactive_grace != -1:
+            self.set_refresh_period_inactive_grace(inactive_grace)
+        self.set_refresh_period_charging(charging)
+        self.last_successful_refresh = last_successful_refresh
+        self.last_car_activity = last_car_activity
+        self.last_car_shutdown = last_car_shutdown
+        self.__is_charging = is_charging
+        self.__hv_battery_active = hv_battery_active
+        LOG.info(
+            f"Restored the state of vehicle {self.vin}, last refreshed at {last_successful_refresh}"
+        )
+
     def republish_command_states(self) -> None:
         """Unconditionally publish all command entity values to MQTT.
 
@@ -740,6 +913,7 @@ class VehicleState:
                 self.previous_refresh_mode = self.refresh_mode
             self.refresh_mode = mode
             LOG.debug("Refresh mode set to %s due to %s", self.refresh_mode, cause)
+            self.notify_refresh_trigger()
 
     @property
     def is_heated_seats_running(self) -> bool:
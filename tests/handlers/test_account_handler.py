@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+from saic_ismart_client_ng.api.vehicle.schema import VehicleListResp, VinInfo
+
+from configuration import Configuration, SaicAccount
+from handlers.account import AccountHandler
+from tests.mocks import MessageCapturingConsolePublisher
+
+KNOWN_VIN = "vin_known00000000"
+
+
+def _fake_vehicle_handler(vin_info: VinInfo) -> MagicMock:
+    vh = MagicMock()
+    vh.vin_info = vin_info
+    vh.handle_vehicle = AsyncMock()
+    return vh
+
+
+class TestAccountHandlerVehicleList(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        config = Configuration()
+        config.saic_alarm_registration_concurrency = 2
+        config.ha_discovery_enabled = False
+        self.account = AccountHandler(
+            config=config,
+            account=SaicAccount(username="user@example.com", password="secret"),  # noqa: S106
+            publisher=MessageCapturingConsolePublisher(config),
+            scheduler=BlockingScheduler(),
+        )
+        patcher = patch.object(
+            self.account,
+            "_AccountHandler__create_vehicle_handler",
+            side_effect=_fake_vehicle_handler,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def __refresh_vehicle_list(self) -> None:
+        await self.account._AccountHandler__refresh_vehicle_list()  # type: ignore[attr-defined]
+
+    def __set_vins(self, *vins: str) -> None:
+        self.account.saic_api.vehicle_list = AsyncMock(  # type: ignore[method-assign]
+            return_value=VehicleListResp(vinList=[VinInfo(vin=vin) for vin in vins])
+        )
+
+    async def test_registrations_respect_the_concurrency_limit(self) -> None:
+        vins = [f"vin_{i:013d}" for i in range(6)]
+        self.__set_vins(*vins)
+        running = 0
+        max_running = 0
+
+        async def register(**_kwargs: Any) -> None:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        self.account.saic_api.set_alarm_switches = AsyncMock(side_effect=register)  # type: ignore[method-assign]
+
+        await self.__refresh_vehicle_list()
+
+        assert max_running == 2
+        assert set(self.account.vehicle_handlers) == set(vins)
+
+    async def test_new_vehicle_does_not_wait_for_other_registrations(self) -> None:
+        new_vin = "vin_new0000000000"
+        self.__set_vins(KNOWN_VIN, new_vin)
+        self.account.vehicle_handlers[KNOWN_VIN] = MagicMock()
+        release = asyncio.Event()
+        new_vehicle_set_up = asyncio.Event()
+
+        async def register(*, alarm_switches: Any, vin: str) -> None:  # noqa: ARG001
+            if vin == KNOWN_VIN:
+                await release.wait()
+            else:
+                new_vehicle_set_up.set()
+
+        self.account.saic_api.set_alarm_switches = AsyncMock(side_effect=register)  # type: ignore[method-assign]
+
+        refresh = asyncio.create_task(self.__refresh_vehicle_list())
+        await asyncio.wait_for(new_vehicle_set_up.wait(), 1)
+        await asyncio.sleep(0)
+
+        assert new_vin in self.account.vehicle_handlers
+        assert not refresh.done()
+        release.set()
+        await refresh
+
+    async def test_failed_registration_skips_only_that_vehicle(self) -> None:
+        self.__set_vins("vin_ok00000000000", "vin_ko00000000000")
+
+        async def register(*, alarm_switches: Any, vin: str) -> None:  # noqa: ARG001
+            if vin == "vin_ko00000000000":
+                raise RuntimeError("boom")
+
+        self.account.saic_api.set_alarm_switches = AsyncMock(side_effect=register)  # type: ignore[method-assign]
+
+        await self.__refresh_vehicle_list()
+
+        assert set(self.account.vehicle_handlers) == {"vin_ok00000000000"}
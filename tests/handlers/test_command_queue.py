@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+
+from handlers.command_queue import CommandQueue
+
+WINDOW = 0.05  # in seconds
+
+
+class TestCommandQueue(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.queue = CommandQueue(coalescing_window=WINDOW)
+        self.executed: list[str] = []
+        self.superseded: list[str] = []
+
+    async def __submit(
+        self, value: str, *, key: str | None = "temperature", duration: float = 0.0
+    ) -> bool:
+        async def command() -> None:
+            self.executed.append(f"start {value}")
+            await asyncio.sleep(duration)
+            self.executed.append(f"end {value}")
+
+        return await self.queue.run(
+            command,
+            coalescing_key=key,
+            on_superseded=lambda: self.superseded.append(value),
+        )
+
+    async def test_only_the_last_value_of_a_burst_runs(self) -> None:
+        results = await asyncio.gather(
+            self.__submit("20"), self.__submit("21"), self.__submit("22")
+        )
+
+        assert list(results) == [False, False, True]
+        assert self.superseded == ["20", "21"]
+        assert self.executed == ["start 22", "end 22"]
+
+    async def test_superseded_commands_are_reported_right_away(self) -> None:
+        first = asyncio.create_task(self.__submit("20"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(self.__submit("21"))
+
+        assert await first is False
+        assert not second.done()
+        assert await second is True
+
+    async def test_newer_values_do_not_postpone_the_command(self) -> None:
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        tasks = []
+        for value in range(4):
+            tasks.append(asyncio.create_task(self.__submit(str(value))))
+            await asyncio.sleep(WINDOW / 5)
+
+        await asyncio.gather(*tasks)
+
+        assert self.executed == ["start 3", "end 3"]
+        assert loop.time() - started_at < 2 * WINDOW
+
+    async def test_commands_of_a_vehicle_run_one_at_a_time(self) -> None:
+        await asyncio.gather(
+            self.__submit("lock", key=None, duration=WINDOW),
+            self.__submit("horn", key=None, duration=WINDOW),
+        )
+
+        assert self.executed == ["start lock", "end lock", "start horn", "end horn"]
+
+    async def test_values_arriving_while_the_car_is_busy_are_coalesced(self) -> None:
+        busy = asyncio.create_task(self.__submit("20", duration=2 * WINDOW))
+        await asyncio.sleep(WINDOW * 1.5)
+
+        results = await asyncio.gather(self.__submit("21"), self.__submit("22"))
+
+        assert await busy is True
+        assert list(results) == [False, True]
+        assert self.executed == ["start 20", "end 20", "start 22", "end 22"]
+
+    async def test_different_settings_are_not_coalesced(self) -> None:
+        results = await asyncio.gather(
+            self.__submit("1", key="left seat"), self.__submit("2", key="right seat")
+        )
+
+        assert list(results) == [True, True]
+        assert self.superseded == []
+
+    async def test_a_cancelled_command_is_not_superseded_later(self) -> None:
+        cancelled = asyncio.create_task(self.__submit("20"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+
+        assert await self.__submit("21") is True
+        assert self.superseded == []
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+
+import pytest
+from saic_ismart_client_ng.api.message.schema import MessageEntity
+from saic_ismart_client_ng.exceptions import SaicApiException, SaicLogoutException
+
+from handlers.message_ack import MessageAcknowledger
+
+
+def _message(message_id: int) -> MessageEntity:
+    return MessageEntity(messageId=message_id, title="Vehicle start")
+
+
+class TestMessageAcknowledger(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.saic_api = AsyncMock()
+        self.acknowledger = MessageAcknowledger(
+            self.saic_api, max_concurrency=3, max_attempts=2
+        )
+
+    async def test_acknowledgements_run_concurrently_within_the_limit(self) -> None:
+        running = 0
+        max_running = 0
+
+        async def slow_call(**_kwargs: object) -> None:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        self.saic_api.read_message = AsyncMock(side_effect=slow_call)
+        for message_id in range(10):
+            self.acknowledger.mark_read(_message(message_id))
+
+        await self.acknowledger.flush()
+
+        assert self.saic_api.read_message.await_count == 10
+        assert max_running == 3
+        assert self.acknowledger.pending_count == 0
+
+    async def test_failed_acknowledgements_are_retried_on_next_flush(self) -> None:
+        self.saic_api.delete_message = AsyncMock(
+            side_effect=[SaicApiException("boom"), None]
+        )
+        message = _message(1)
+        self.acknowledger.delete(message)
+
+        await self.acknowledger.flush()
+        assert self.acknowledger.is_pending(message)
+
+        # Submitting the same message again does not duplicate the acknowledgement
+        self.acknowledger.delete(message)
+        await self.acknowledger.flush()
+
+        assert self.saic_api.delete_message.await_count == 2
+        assert not self.acknowledger.is_pending(message)
+
+    async def test_acknowledgement_is_dropped_after_max_attempts(self) -> None:
+        self.saic_api.read_message = AsyncMock(side_effect=SaicApiException("boom"))
+        message = _message(1)
+        self.acknowledger.mark_read(message)
+
+        await self.acknowledger.flush()
+        await self.acknowledger.flush()
+        await self.acknowledger.flush()
+
+        assert self.saic_api.read_message.await_count == 2
+        assert not self.acknowledger.is_pending(message)
+
+    async def test_delete_supersedes_read(self) -> None:
+        message = _message(1)
+        self.acknowledger.mark_read(message)
+        self.acknowledger.delete(message)
+        self.acknowledger.mark_read(message)
+
+        await self.acknowledger.flush()
+
+        self.saic_api.read_message.assert_not_awaited()
+        self.saic_api.delete_message.assert_awaited_once_with(message_id=1)
+
+    async def test_logout_keeps_acknowledgements_pending(self) -> None:
+        self.saic_api.read_message = AsyncMock(
+            side_effect=SaicLogoutException("logged out", 1)
+        )
+        message = _message(1)
+        self.acknowledger.mark_read(message)
+
+        with pytest.raises(SaicLogoutException):
+            await self.acknowledger.flush()
+
+        assert self.acknowledger.is_pending(message)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import datetime
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from saic_ismart_client_ng.api.message.schema import MessageEntity, MessageResp
+
+from handlers.message import FIRST_PAGE_SIZE, MAX_MESSAGES, MessageHandler
+from vehicle import RefreshMode
+
+VIN = "vin10000000000000"
+START = datetime.datetime(2026, 1, 1, 12, 0, 0, tzinfo=datetime.UTC)
+
+
+def _message(message_id: int) -> MessageEntity:
+    message_time = START + datetime.timedelta(minutes=message_id)
+    return MessageEntity(
+        messageId=message_id,
+        messageTime=message_time.strftime("%Y-%m-%d %H:%M:%S"),
+        messageType="323",
+        readStatus=1,
+        title="Vehicle start",
+        vin=VIN,
+    )
+
+
+class TestMessageHandlerPaging(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        # Newest message first, like the SAIC API
+        self.messages: list[MessageEntity] = []
+        self.saic_api = AsyncMock()
+        self.saic_api.get_alarm_list = AsyncMock(side_effect=self.__get_alarm_list)
+        vehicle_handler = MagicMock()
+        vehicle_handler.vehicle_state.refresh_mode = RefreshMode.PERIODIC
+        gateway = MagicMock()
+        gateway.vehicle_handlers = {VIN: vehicle_handler}
+        gateway.get_vehicle_handler = MagicMock(return_value=vehicle_handler)
+        relogin_handler = MagicMock()
+        relogin_handler.relogin_in_progress = False
+        self.handler = MessageHandler(gateway, relogin_handler, self.saic_api)
+
+    async def __get_alarm_list(self, *, page_num: int, page_size: int) -> MessageResp:
+        offset = (page_num - 1) * page_size
+        return MessageResp(messages=self.messages[offset : offset + page_size])
+
+    def __add_messages(self, count: int) -> None:
+        first_id = self.messages[0].messageId if self.messages else 0
+        assert isinstance(first_id, int)
+        new = [_message(first_id + i) for i in range(count, 0, -1)]
+        self.messages = new + self.messages
+
+    def __requested_pages(self) -> list[tuple[int, int]]:
+        return [
+            (c.kwargs["page_num"], c.kwargs["page_size"])
+            for c in self.saic_api.get_alarm_list.call_args_list
+        ]
+
+    async def test_quiet_account_needs_a_single_request(self) -> None:
+        self.__add_messages(30)
+        await self.handler.check_for_new_messages()
+        self.saic_api.get_alarm_list.reset_mock()
+
+        await self.handler.check_for_new_messages()
+
+        assert self.__requested_pages() == [(1, FIRST_PAGE_SIZE)]
+
+    async def test_busy_account_catches_up_with_growing_pages(self) -> None:
+        self.__add_messages(3)
+        await self.handler.check_for_new_messages()
+        self.__add_messages(30)
+        self.saic_api.get_alarm_list.reset_mock()
+
+        await self.handler.check_for_new_messages()
+
+        # Each page starts where the previous one ended: 0-5, 5-10, 10-20, 20-40
+        assert self.__requested_pages() == [(1, 5), (2, 5), (2, 10), (2, 20)]
+        assert self.handler.last_message_id == self.messages[0].messageId
+
+    async def test_fetching_stops_at_the_message_limit(self) -> None:
+        self.__add_messages(500)
+
+        await self.handler.check_for_new_messages()
+
+        fetched = sum(size for _, size in self.__requested_pages())
+        assert MAX_MESSAGES <= fetched < 2 * MAX_MESSAGES
+        assert len(self.__requested_pages()) < 10
+
+    async def test_empty_inbox_needs_a_single_request(self) -> None:
+        await self.handler.check_for_new_messages()
+
+        assert self.__requested_pages() == [(1, FIRST_PAGE_SIZE)]
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 from typing import cast
 import unittest
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, call, patch
 
 from saic_ismart_client_ng.exceptions import SaicApiException, SaicLogoutException
 
@@ -26,6 +27,7 @@ def _build(
     *,
     saic_api: AsyncMock | None = None,
     relogin_handler: AsyncMock | None = None,
+    coalescing_window: float = 0.01,
 ) -> tuple[VehicleCommandHandler, MagicMock]:
     """Build a VehicleCommandHandler with a MagicMock publisher.
 
@@ -44,6 +46,7 @@ def _build(
             relogin_handler=relogin_handler or AsyncMock(),
             mqtt_topic=MQTT_TOPIC,
             vehicle_prefix=VEHICLE_PREFIX,
+            coalescing_window=coalescing_window,
         ),
         mock_publisher,
     )
@@ -59,6 +62,50 @@ class TestSuccessPath(unittest.IsolatedAsyncioTestCase):
         pub.publish_json.assert_not_called()
 
 
+HEATED_SEAT_SET_TOPIC = f"{MQTT_TOPIC}/{VEHICLE_PREFIX}/{mqtt_topics.CLIMATE_HEATED_SEATS_FRONT_LEFT_LEVEL_SET}"
+HEATED_SEAT_RESULT_TOPIC = (
+    f"{VEHICLE_PREFIX}/{mqtt_topics.CLIMATE_HEATED_SEATS_FRONT_LEFT_LEVEL}"
+    f"/{mqtt_topics.RESULT_SUFFIX}"
+)
+
+
+class TestCommandCoalescing(unittest.IsolatedAsyncioTestCase):
+    async def test_only_the_last_value_reaches_the_car(self) -> None:
+        saic_api = AsyncMock()
+        handler, pub = _build(saic_api=saic_api)
+        vehicle_state = cast("MagicMock", handler.vehicle_state)
+
+        await asyncio.gather(
+            *(
+                handler.handle_mqtt_command(topic=HEATED_SEAT_SET_TOPIC, payload=level)
+                for level in ("1", "2", "3")
+            )
+        )
+
+        vehicle_state.update_heated_seats_front_left_level.assert_called_once_with(3)
+        saic_api.control_heated_seats.assert_awaited_once()
+        assert pub.publish_str.call_args_list == [
+            call(HEATED_SEAT_RESULT_TOPIC, "Superseded"),
+            call(HEATED_SEAT_RESULT_TOPIC, "Superseded"),
+            call(HEATED_SEAT_RESULT_TOPIC, "Success"),
+        ]
+
+    async def test_action_commands_are_not_coalesced(self) -> None:
+        saic_api = AsyncMock()
+        handler, pub = _build(saic_api=saic_api)
+
+        await asyncio.gather(
+            handler.handle_mqtt_command(topic=CHARGING_SET_TOPIC, payload="true"),
+            handler.handle_mqtt_command(topic=CHARGING_SET_TOPIC, payload="false"),
+        )
+
+        assert saic_api.control_charging.await_count == 2
+        pub.publish_str.assert_called_with(CHARGING_RESULT_TOPIC, "Success")
+        assert call(CHARGING_RESULT_TOPIC, "Superseded") not in (
+            pub.publish_str.call_args_list
+        )
+
+
 class TestNoHandlerFound(unittest.IsolatedAsyncioTestCase):
     async def test_publishes_error_event(self) -> None:
         handler, pub = _build()
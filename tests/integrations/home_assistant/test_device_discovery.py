@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+import unittest
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+from saic_ismart_client_ng.api.vehicle.schema import (
+    VehicleModelConfiguration,
+    VinInfo,
+)
+
+from configuration import Configuration
+from integrations.home_assistant.discovery import HomeAssistantDiscovery
+from integrations.home_assistant.gateway_discovery import (
+    HomeAssistantGatewayDiscovery,
+)
+from tests.common_mocks import VIN
+from tests.mocks import MessageCapturingConsolePublisher
+from vehicle import RefreshMode, VehicleState
+from vehicle_info import VehicleInfo
+
+DEVICE_TOPIC = f"homeassistant/device/{VIN}_mg/config"
+LEGACY_TOPIC = f"homeassistant/sensor/{VIN}_mg/{VIN}_soc/config"
+
+
+def _make_discovery(
+    *, device_discovery: bool
+) -> tuple[HomeAssistantDiscovery, MessageCapturingConsolePublisher]:
+    config = Configuration()
+    config.anonymized_publishing = False
+    config.ha_discovery_prefix = "homeassistant"
+    config.ha_device_discovery = device_discovery
+    publisher = MessageCapturingConsolePublisher(config)
+    vin_info = VinInfo()
+    vin_info.vin = VIN
+    vin_info.series = "EH32 S"
+    vin_info.modelName = "MG4 Electric"
+    vin_info.modelYear = "2022"
+    vin_info.vehicleModelConfiguration = [
+        VehicleModelConfiguration("BATTERY", "BATTERY", "1"),
+        VehicleModelConfiguration("BType", "Battery", "1"),
+    ]
+    vehicle_info = VehicleInfo(vin_info, None)
+    vehicle_state = VehicleState(
+        publisher, BlockingScheduler(), f"/vehicles/{VIN}", vehicle_info
+    )
+    vehicle_state.refresh_period_active = 30
+    vehicle_state.refresh_period_inactive = 120
+    vehicle_state.refresh_period_after_shutdown = 60
+    vehicle_state.refresh_period_inactive_grace = 600
+    vehicle_state.refresh_mode = RefreshMode.PERIODIC
+    discovery = HomeAssistantDiscovery(vehicle_state, vehicle_info, config)
+    return discovery, publisher
+
+
+def _discovery_topics(publisher: MessageCapturingConsolePublisher) -> list[str]:
+    return [t for t in publisher.map if t.startswith("homeassistant/")]
+
+
+class TestVehicleDeviceDiscovery(unittest.TestCase):
+    def test_one_document_carries_every_component(self) -> None:
+        discovery, publisher = _make_discovery(device_discovery=True)
+        discovery.publish_ha_discovery_messages()
+
+        assert _discovery_topics(publisher) == [DEVICE_TOPIC]
+        document = json.loads(publisher.map[DEVICE_TOPIC])
+        assert document["dev"]["identifiers"] == [VIN]
+        assert "name" in document["o"]
+        components: dict[str, dict[str, Any]] = document["cmps"]
+        assert len(components) > 50
+        soc = components[f"sensor_{VIN}_soc"]
+        assert soc["p"] == "sensor"
+        assert soc["state_topic"].endswith("/drivetrain/soc")
+        assert "device" not in soc
+
+    def test_components_match_entity_based_configs(self) -> None:
+        device_discovery, device_publisher = _make_discovery(device_discovery=True)
+        device_discovery.publish_ha_discovery_messages()
+        entity_discovery, entity_publisher = _make_discovery(device_discovery=False)
+        entity_discovery.publish_ha_discovery_messages()
+
+        components = json.loads(device_publisher.map[DEVICE_TOPIC])["cmps"]
+        published = [c for c in components.values() if len(c) > 1]
+        removed = [c for c in components.values() if len(c) == 1]
+        entity_configs = [
+            v for t, v in entity_publisher.map.items() if t.startswith("homeassistant/")
+        ]
+        assert len(published) == len([c for c in entity_configs if c])
+        assert len(removed) == len([c for c in entity_configs if not c])
+        entity_config = json.loads(entity_publisher.map[LEGACY_TOPIC])
+        del entity_config["device"]
+        del entity_config["o"]
+        assert components[f"sensor_{VIN}_soc"] == {"p": "sensor"} | entity_config
+
+    def test_switching_to_device_discovery_removes_entity_configs(self) -> None:
+        discovery, publisher = _make_discovery(device_discovery=True)
+        publisher.retained_fingerprints.record_received(LEGACY_TOPIC, "{}")
+
+        discovery.publish_ha_discovery_messages()
+
+        assert publisher.map[LEGACY_TOPIC] is None
+        assert DEVICE_TOPIC in publisher.map
+
+
+class TestGatewayDeviceDiscovery(unittest.TestCase):
+    def test_gateway_sensors_are_published_as_one_document(self) -> None:
+        publisher = MessageCapturingConsolePublisher(Configuration())
+        discovery = HomeAssistantGatewayDiscovery(
+            publisher=publisher,
+            account_prefix="user@example.com",
+            discovery_prefix="homeassistant",
+            device_discovery=True,
+        )
+
+        discovery.publish_ha_discovery_messages()
+
+        topics = _discovery_topics(publisher)
+        assert len(topics) == 1
+        assert topics[0].startswith("homeassistant/device/")
+        document = json.loads(publisher.map[topics[0]])
+        assert {c["p"] for c in document["cmps"].values()} == {"sensor"}
+        assert len(document["cmps"]) == 6
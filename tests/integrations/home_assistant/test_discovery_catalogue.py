@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import PropertyMock, patch
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+from saic_ismart_client_ng.api.vehicle.schema import (
+    VehicleModelConfiguration,
+    VinInfo,
+)
+
+from configuration import Configuration
+from integrations.home_assistant import discovery as discovery_module
+from integrations.home_assistant.discovery import HomeAssistantDiscovery
+from integrations.home_assistant.utils import snake_case
+from tests.common_mocks import VIN
+from tests.mocks import MessageCapturingConsolePublisher
+from vehicle import RefreshMode, VehicleState
+from vehicle_info import VehicleInfo
+
+TARGET_SOC_TOPIC = f"homeassistant/number/{VIN}_mg/{VIN}_target_soc/config"
+
+
+class TestDiscoveryCatalogue(unittest.TestCase):
+    def setUp(self) -> None:
+        config = Configuration()
+        config.anonymized_publishing = False
+        self.publisher = MessageCapturingConsolePublisher(config)
+        vin_info = VinInfo()
+        vin_info.vin = VIN
+        vin_info.series = "EH32 S"
+        vin_info.modelName = "MG4 Electric"
+        vin_info.modelYear = "2022"
+        vin_info.vehicleModelConfiguration = [
+            VehicleModelConfiguration("BATTERY", "BATTERY", "1"),
+            VehicleModelConfiguration("BType", "Battery", "0"),
+        ]
+        vehicle_info = VehicleInfo(vin_info, None)
+        vehicle_state = VehicleState(
+            self.publisher, BlockingScheduler(), f"/vehicles/{VIN}", vehicle_info
+        )
+        vehicle_state.refresh_period_active = 30
+        vehicle_state.refresh_period_inactive = 120
+        vehicle_state.refresh_period_after_shutdown = 60
+        vehicle_state.refresh_period_inactive_grace = 600
+        vehicle_state.refresh_mode = RefreshMode.PERIODIC
+        self.discovery = HomeAssistantDiscovery(vehicle_state, vehicle_info, config)
+
+    def __discovery_messages(self) -> dict[str, str]:
+        return {
+            topic: payload
+            for topic, payload in self.publisher.map.items()
+            if topic.startswith("homeassistant/")
+        }
+
+    def test_republish_reuses_the_built_messages(self) -> None:
+        self.discovery.publish_ha_discovery_messages()
+        first = self.__discovery_messages()
+        self.publisher.map.clear()
+
+        with patch.object(
+            discovery_module, "snake_case", wraps=snake_case
+        ) as m_snake_case:
+            self.discovery.publish_ha_discovery_messages(force=True)
+
+        m_snake_case.assert_not_called()
+        assert self.__discovery_messages() == first
+
+    def test_capability_change_rebuilds_the_messages(self) -> None:
+        self.discovery.publish_ha_discovery_messages()
+        assert not self.publisher.map[TARGET_SOC_TOPIC]
+
+        with patch.object(
+            VehicleInfo, "supports_target_soc", new_callable=PropertyMock
+        ) as m_supports_target_soc:
+            m_supports_target_soc.return_value = True
+            self.discovery.publish_ha_discovery_messages(force=True)
+
+        assert self.publisher.map[TARGET_SOC_TOPIC]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+import unittest
+from unittest.mock import patch
+
+from integrations.home_assistant.dispatcher import HaDiscoveryDispatcher, TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_debt_is_paid_back_over_time(self) -> None:
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=10, clock=clock)
+
+        bucket.consume(30)
+
+        assert bucket.delay() == 2.0
+        clock.now = 1.5
+        assert bucket.delay() == 0.5
+        clock.now = 10.0
+        assert bucket.tokens == 10
+
+
+class TestHaDiscoveryDispatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.clock = FakeClock()
+        self.progress: list[dict[str, Any]] = []
+        self.drained = asyncio.Event()
+        self.dispatcher = HaDiscoveryDispatcher(
+            messages_per_second=10,
+            on_progress=self.__on_progress,
+            clock=self.clock,
+        )
+        self.published: list[str] = []
+
+    def __on_progress(self, metrics: dict[str, Any]) -> None:
+        self.progress.append(metrics)
+        if metrics["pending"] == 0:
+            self.drained.set()
+
+    def __job(self, device_id: str, sent: int = 10) -> Any:
+        def publish() -> int:
+            self.published.append(device_id)
+            return sent
+
+        return publish
+
+    async def __drain(self) -> None:
+        with patch.object(asyncio, "sleep", self.clock.sleep):
+            task = asyncio.create_task(self.dispatcher.run())
+            async with asyncio.timeout(1):
+                await self.drained.wait()
+            task.cancel()
+
+    async def test_repeated_requests_publish_a_device_once(self) -> None:
+        self.dispatcher.request("vin1", self.__job("vin1"))
+        self.dispatcher.request("vin2", self.__job("vin2"))
+        self.dispatcher.request("vin1", self.__job("vin1"))
+
+        await self.__drain()
+
+        assert self.published == ["vin1", "vin2"]
+        assert self.dispatcher.metrics == {
+            "pending": 0,
+            "requested": 3,
+            "deduplicated": 1,
+            "dispatched": 2,
+            "messages": 20,
+        }
+
+    async def test_devices_are_paced_by_the_messages_they_sent(self) -> None:
+        for vin in ("vin1", "vin2", "vin3", "vin4"):
+            self.dispatcher.request(vin, self.__job(vin, sent=20))
+
+        await self.__drain()
+
+        assert self.published == ["vin1", "vin2", "vin3", "vin4"]
+        # One second of burst, then each device waits for the previous one's messages
+        assert self.clock.sleeps == [1.0, 2.0, 2.0]
+
+    async def test_failed_device_does_not_stop_the_others(self) -> None:
+        def failing_job() -> int:
+            raise ValueError
+
+        self.dispatcher.request("vin1", failing_job)
+        self.dispatcher.request("vin2", self.__job("vin2"))
+
+        await self.__drain()
+
+        assert self.published == ["vin2"]
+        assert [m["dispatched"] for m in self.progress] == [1, 2]
+        assert self.progress[-1]["messages"] == 10
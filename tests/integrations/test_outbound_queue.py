@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from integrations import IntegrationException
+from integrations.outbound_queue import OutboundQueue
+
+
+@pytest.mark.asyncio
+async def test_put_does_not_wait_for_send() -> None:
+    release = asyncio.Event()
+    sent: list[int] = []
+
+    async def send(item: int) -> tuple[bool, str]:
+        await release.wait()
+        sent.append(item)
+        return True, "ok"
+
+    queue: OutboundQueue[int] = OutboundQueue("test", send)
+    queue.put(1)
+    await asyncio.sleep(0)
+    assert queue.in_flight
+    assert sent == []
+
+    release.set()
+    await queue.join()
+    assert sent == [1]
+    assert queue.sent_count == 1
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_pending_items_coalesce_to_newest() -> None:
+    release = asyncio.Event()
+    sent: list[int] = []
+
+    async def send(item: int) -> tuple[bool, str]:
+        await release.wait()
+        sent.append(item)
+        return True, "ok"
+
+    queue: OutboundQueue[int] = OutboundQueue("test", send)
+    queue.put(1)
+    await asyncio.sleep(0)
+    queue.put(2)
+    queue.put(3)
+    queue.put(4)
+    assert queue.depth == 1
+
+    release.set()
+    await queue.join()
+    assert sent == [1, 4]
+    assert queue.coalesced_count == 2
+    assert queue.metrics["coalesced"] == 2
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_unsent_items_are_counted_as_skipped() -> None:
+    async def send(_item: int) -> tuple[bool, str]:
+        return False, "not configured"
+
+    queue: OutboundQueue[int] = OutboundQueue("test", send)
+    queue.put(1)
+    await queue.join()
+
+    assert queue.sent_count == 0
+    assert queue.skipped_count == 1
+    assert queue.failed_count == 0
+    assert queue.metrics["skipped"] == 1
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_send_timeout_is_reported_as_failure() -> None:
+    results: list[tuple[bool, str]] = []
+
+    async def send(_item: int) -> tuple[bool, str]:
+        await asyncio.sleep(10)
+        return True, "ok"
+
+    queue: OutboundQueue[int] = OutboundQueue(
+        "test",
+        send,
+        on_result=lambda sent, response: results.append((sent, response)),
+        send_timeout=0.01,
+    )
+    queue.put(1)
+    await queue.join()
+
+    assert queue.failed_count == 1
+    assert queue.sent_count == 0
+    assert results[0][0] is False
+    assert queue.last_send_latency is not None
+    assert queue.last_send_latency >= 0.01
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_integration_errors_do_not_stop_the_worker() -> None:
+    results: list[tuple[bool, str]] = []
+    attempts = 0
+
+    async def send(_item: int) -> tuple[bool, str]:
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise IntegrationException("test", "server unavailable")
+        return True, "ok"
+
+    queue: OutboundQueue[int] = OutboundQueue(
+        "test",
+        send,
+        on_result=lambda sent, response: results.append((sent, response)),
+    )
+    queue.put(1)
+    await queue.join()
+    queue.put(2)
+    await queue.join()
+
+    assert results == [(False, "test: server unavailable"), (True, "ok")]
+    assert queue.failed_count == 1
+    assert queue.sent_count == 1
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_pending_send() -> None:
+    async def send(_item: int) -> tuple[bool, str]:
+        await asyncio.sleep(10)
+        return True, "ok"
+
+    queue: OutboundQueue[int] = OutboundQueue("test", send)
+    queue.put(1)
+    await asyncio.sleep(0)
+    await queue.close()
+
+    assert queue.depth == 0
+    await asyncio.wait_for(queue.join(), 1)
+
+
+@pytest.mark.asyncio
+async def test_close_drops_what_a_stopped_worker_left_behind() -> None:
+    async def send(_item: int) -> tuple[bool, str]:
+        await asyncio.sleep(10)
+        return True, "ok"
+
+    queue: OutboundQueue[int] = OutboundQueue("test", send)
+    queue.put(1)
+    await asyncio.sleep(0)
+    queue.put(2)
+    (worker,) = (
+        task for task in asyncio.all_tasks() if task.get_name() == "test_outbound_queue"
+    )
+    worker.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await worker
+
+    await queue.close()
+
+    assert queue.depth == 0
+    await asyncio.wait_for(queue.join(), 1)
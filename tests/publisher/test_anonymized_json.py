@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import copy
+import json
+from typing import Any
+
+import pytest
+
+from configuration import Configuration
+from tests.mocks import MessageCapturingConsolePublisher
+
+PAYLOAD: dict[str, Any] = {
+    "vin": "LSJA1234567890",
+    "password": "secret",
+    "deviceId": "abc123###def456",
+    "raw": b"\x01",
+    "gps": {"latitude": 45123456, "longitude": 9123456, "speed": 10},
+    "position": {"latitude": 45.123456, "longitude": -9.123456},
+    "eventCreationTime": 1700000123,
+    "messages": [
+        {"eventId": "E1", "content": "Vehicle (***123) unlocked"},
+        "plain",
+    ],
+    "tags": ("a", "b"),
+}
+
+
+def _publisher(*, anonymized: bool) -> MessageCapturingConsolePublisher:
+    config = Configuration()
+    config.anonymized_publishing = anonymized
+    return MessageCapturingConsolePublisher(config)
+
+
+@pytest.mark.parametrize("anonymized", [False, True])
+def test_the_data_is_not_modified(anonymized: bool) -> None:
+    data = copy.deepcopy(PAYLOAD)
+
+    _publisher(anonymized=anonymized).dict_to_anonymized_json(data)
+
+    assert data == PAYLOAD
+
+
+def test_plain_data_is_encoded_compactly() -> None:
+    encoded = _publisher(anonymized=False).dict_to_anonymized_json(PAYLOAD)
+
+    assert ": " not in encoded
+    assert "\n" not in encoded
+    decoded = json.loads(encoded)
+    assert decoded["raw"] == "b'\\x01'"
+    assert decoded["vin"] == "LSJA1234567890"
+    assert decoded["tags"] == ["a", "b"]
+
+
+def test_indented_data_is_encoded_readably() -> None:
+    encoded = _publisher(anonymized=False).dict_to_anonymized_json(
+        {"gps": {"speed": 10}}, indent=2
+    )
+
+    assert encoded == '{\n  "gps": {\n    "speed": 10\n  }\n}'
+
+
+def test_anonymization_rules_apply_at_any_depth() -> None:
+    decoded = json.loads(_publisher(anonymized=True).dict_to_anonymized_json(PAYLOAD))
+
+    assert decoded["vin"] == "XXXX9999999990"
+    assert decoded["password"] == "******"  # noqa: S105
+    assert decoded["deviceId"] == "XXX999###XXX999"
+    assert decoded["raw"] == "b'\\x01'"
+    assert decoded["gps"] == {"latitude": 45100000, "longitude": 9100000, "speed": 10}
+    assert decoded["position"] == {"latitude": 45, "longitude": -9}
+    assert decoded["eventCreationTime"] == 1700000000
+    assert decoded["messages"] == [
+        {"eventId": 9999, "content": "Vehicle (***XXX) unlocked"},
+        "plain",
+    ]
+
+
+def test_unsupported_values_are_rejected() -> None:
+    with pytest.raises(TypeError, match="object is not JSON serializable"):
+        _publisher(anonymized=False).dict_to_anonymized_json({"value": object()})
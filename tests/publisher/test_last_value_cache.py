@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from configuration import Configuration, TransportProtocol
+from publisher.core import LastValueCache
+from publisher.mqtt_publisher import MqttPublisher
+from tests.mocks import MessageCapturingConsolePublisher
+
+KEY = "vehicles/vin/drivetrain/soc"
+
+
+def _make_configuration(*, cache_enabled: bool) -> Configuration:
+    config = Configuration()
+    config.mqtt_topic = "saic"
+    config.saic_user = "user@example.com"
+    config.mqtt_transport_protocol = TransportProtocol.TCP
+    config.mqtt_publish_cache_enabled = cache_enabled
+    return config
+
+
+def test_cache_is_disabled_by_default() -> None:
+    publisher = MessageCapturingConsolePublisher(Configuration())
+    publisher.publish_int(KEY, 42)
+    publisher.publish_int(KEY, 42)
+
+    assert publisher.last_value_cache is None
+    assert publisher.publish_count[KEY] == 2
+
+
+def test_unchanged_retained_values_are_skipped() -> None:
+    publisher = MessageCapturingConsolePublisher(
+        _make_configuration(cache_enabled=True)
+    )
+    publisher.publish_int(KEY, 42)
+    publisher.publish_int(KEY, 42)
+    publisher.publish_int(KEY, 43)
+
+    assert publisher.publish_count[KEY] == 2
+    assert publisher.map[KEY] == 43
+    cache = publisher.last_value_cache
+    assert cache is not None
+    assert cache.hits == 1
+    assert cache.misses == 2
+    assert cache.stats["hitRatio"] == 0.333
+
+
+def test_non_retained_values_are_always_published() -> None:
+    publisher = MessageCapturingConsolePublisher(
+        _make_configuration(cache_enabled=True)
+    )
+    publisher.publish_str(KEY, "on", retain=False)
+    publisher.publish_str(KEY, "on", retain=False)
+
+    assert publisher.publish_count[KEY] == 2
+
+
+def test_repeated_command_results_are_always_published() -> None:
+    publisher = MessageCapturingConsolePublisher(
+        _make_configuration(cache_enabled=True)
+    )
+    result_key = "vehicles/vin/climate/remoteTemperature/result"
+    publisher.publish_str(result_key, "Success")
+    publisher.publish_str(result_key, "Success")
+
+    assert publisher.publish_count[result_key] == 2
+
+
+def test_repeated_clears_are_always_published() -> None:
+    publisher = MessageCapturingConsolePublisher(
+        _make_configuration(cache_enabled=True)
+    )
+    set_key = "vehicles/vin/refresh/mode/set"
+    publisher.clear_topic(set_key)
+    publisher.clear_topic(set_key)
+    publisher.clear_topic(KEY)
+    publisher.clear_topic(KEY)
+
+    assert publisher.publish_count[set_key] == 2
+    assert publisher.publish_count[KEY] == 2
+
+
+def test_a_value_is_republished_after_a_clear() -> None:
+    publisher = MessageCapturingConsolePublisher(
+        _make_configuration(cache_enabled=True)
+    )
+    publisher.publish_int(KEY, 42)
+    publisher.clear_topic(KEY)
+    publisher.publish_int(KEY, 42)
+
+    assert publisher.publish_count[KEY] == 3
+    assert publisher.map[KEY] == 42
+
+
+def test_payload_type_is_part_of_the_comparison() -> None:
+    cache = LastValueCache(refresh_interval=60)
+
+    assert cache.should_publish(KEY, 1)
+    assert cache.should_publish(KEY, True)
+    assert not cache.should_publish(KEY, True)
+
+
+def test_entries_expire_after_refresh_interval() -> None:
+    cache = LastValueCache(refresh_interval=60)
+    with patch("publisher.core.time.monotonic", return_value=1000.0):
+        assert cache.should_publish(KEY, "a")
+    with patch("publisher.core.time.monotonic", return_value=1059.0):
+        assert not cache.should_publish(KEY, "a")
+    with patch("publisher.core.time.monotonic", return_value=1061.0):
+        assert cache.should_publish(KEY, "a")
+
+
+def test_invalidate_forces_republish() -> None:
+    publisher = MessageCapturingConsolePublisher(
+        _make_configuration(cache_enabled=True)
+    )
+    publisher.publish_json(KEY, {"a": 1})
+    publisher.invalidate_last_value_cache()
+    publisher.publish_json(KEY, {"a": 1})
+
+    assert publisher.publish_count[KEY] == 2
+
+
+def test_mqtt_publisher_skips_unchanged_values_until_reconnect() -> None:
+    publisher = MqttPublisher(_make_configuration(cache_enabled=True))
+    with patch.object(publisher.client, "publish") as m_pub:
+        publisher.publish_float(KEY, 1.5)
+        publisher.publish_float(KEY, 1.5)
+        assert m_pub.call_count == 1
+
+        publisher.first_connection = False
+        with patch.object(publisher.client, "subscribe"):
+            publisher.client.on_connect(publisher.client, 0, 0, {})
+        m_pub.reset_mock()
+        publisher.publish_float(KEY, 1.5)
+        m_pub.assert_called_once_with(f"saic/{KEY}", b"1.5", retain=True)
@@ -23,7 +23,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 
 from configuration import Configuration, TransportProtocol
-from publisher.core import Publishable, Publisher
+from publisher.core import Publishable, Publisher, WirePayload
 from publisher.log_publisher import ConsolePublisher
 from publisher.mqtt_publisher import MqttPublisher
 from tests.mocks import MessageCapturingConsolePublisher
@@ -330,6 +330,12 @@ class _MinimalPublisher(Publisher):
     def clear_topic(self, key: str, no_prefix: bool = False) -> None:
         pass
 
+    @override
+    def _send_payload(
+        self, topic: str, payload: WirePayload | None, *, retain: bool
+    ) -> None:
+        pass
+
 
 @pytest.mark.parametrize(
     ("case_label", "value", "expected_method"),
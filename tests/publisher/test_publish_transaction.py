@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from configuration import Configuration, TransportProtocol
+from publisher.mqtt_publisher import MqttPublisher
+from tests.mocks import MessageCapturingConsolePublisher
+
+
+def _make_configuration() -> Configuration:
+    config = Configuration()
+    config.mqtt_topic = "saic"
+    config.saic_user = "user@example.com"
+    config.mqtt_transport_protocol = TransportProtocol.TCP
+    return config
+
+
+def test_publishes_are_held_until_the_transaction_ends() -> None:
+    publisher = MessageCapturingConsolePublisher(_make_configuration())
+
+    with publisher.transaction():
+        publisher.publish_int("a", 1)
+        publisher.publish_str("b", "x")
+        assert publisher.map == {}
+
+    assert publisher.map == {"a": 1, "b": "x"}
+
+
+def test_repeated_writes_collapse_to_the_last_value() -> None:
+    publisher = MqttPublisher(_make_configuration())
+    with patch.object(publisher.client, "publish") as m_pub:
+        with publisher.transaction():
+            publisher.publish_int("a", 1)
+            publisher.publish_int("b", 2)
+            publisher.publish_int("a", 3, retain=False)
+
+        assert [c.args for c in m_pub.call_args_list] == [
+            ("saic/b", b"2"),
+            ("saic/a", b"3"),
+        ]
+        assert m_pub.call_args_list[1].kwargs == {"retain": False}
+
+
+def test_nested_transactions_flush_with_the_outermost() -> None:
+    publisher = MessageCapturingConsolePublisher(_make_configuration())
+
+    with publisher.transaction():
+        with publisher.transaction():
+            publisher.publish_bool("a", True)
+        assert publisher.map == {}
+
+    assert publisher.map == {"a": True}
+
+
+def test_transaction_flushes_when_the_block_raises() -> None:
+    publisher = MessageCapturingConsolePublisher(_make_configuration())
+
+    def publish_then_fail() -> None:
+        with publisher.transaction():
+            publisher.publish_float("a", 1.5)
+            raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        publish_then_fail()
+
+    assert publisher.map == {"a": 1.5}
+
+
+def test_transaction_skips_values_known_to_the_last_value_cache() -> None:
+    config = _make_configuration()
+    config.mqtt_publish_cache_enabled = True
+    publisher = MessageCapturingConsolePublisher(config)
+    publisher.publish_int("a", 1)
+
+    with publisher.transaction():
+        publisher.publish_int("a", 2)
+        publisher.publish_int("a", 1)
+
+    assert publisher.publish_count["a"] == 1
+
+
+@pytest.mark.asyncio
+async def test_other_tasks_are_not_captured() -> None:
+    publisher = MessageCapturingConsolePublisher(_make_configuration())
+    released = asyncio.Event()
+
+    async def other_task() -> None:
+        publisher.publish_int("other", 1)
+        released.set()
+
+    task = asyncio.create_task(other_task())
+    with publisher.transaction():
+        publisher.publish_int("mine", 1)
+        await released.wait()
+        assert publisher.map == {"other": 1}
+    await task
+
+    assert publisher.map == {"other": 1, "mine": 1}
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import unittest
+from unittest.mock import patch
+
+from configuration import Configuration, TransportProtocol
+from publisher.mqtt_publisher import MqttPublisher
+from publisher.retained_fingerprints import STATE_FILE_NAME, RetainedFingerprints
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+DISCOVERY_FILTER = "homeassistant/+/vin_mg/+/config"
+DISCOVERY_TOPIC = "homeassistant/sensor/vin_mg/vin_soc/config"
+CONFIG = {"name": "SoC", "state_topic": "saic/vin/soc"}
+
+
+def test_payload_needs_publishing_and_broker_confirmation() -> None:
+    fingerprints = RetainedFingerprints()
+    assert not fingerprints.is_retained("topic", "payload")
+
+    fingerprints.record_published("topic", "payload")
+    assert not fingerprints.is_retained("topic", "payload")
+
+    fingerprints.record_received("topic", "payload")
+    assert fingerprints.is_retained("topic", "payload")
+    assert not fingerprints.is_retained("topic", "changed")
+
+
+def test_empty_payload_forgets_topic() -> None:
+    fingerprints = RetainedFingerprints()
+    fingerprints.record_published("topic", "payload")
+    fingerprints.record_received("topic", "payload")
+
+    fingerprints.record_received("topic", "")
+
+    fingerprints.record_received("topic", "payload")
+    assert not fingerprints.is_retained("topic", "payload")
+
+
+def test_published_fingerprints_survive_restart(tmp_path: Path) -> None:
+    path = tmp_path / "state" / STATE_FILE_NAME
+    fingerprints = RetainedFingerprints(path)
+    fingerprints.record_published("topic", "payload")
+    fingerprints.save()
+
+    restarted = RetainedFingerprints(path)
+    assert not restarted.is_retained("topic", "payload")
+    restarted.record_received("topic", "payload")
+    assert restarted.is_retained("topic", "payload")
+
+
+def test_corrupt_state_file_is_ignored(tmp_path: Path) -> None:
+    path = tmp_path / STATE_FILE_NAME
+    path.write_text("{not json", encoding="utf-8")
+
+    fingerprints = RetainedFingerprints(path)
+    fingerprints.record_received("topic", "payload")
+
+    assert not fingerprints.is_retained("topic", "payload")
+
+
+class TestMqttPublisherRetainedTopics(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        config = Configuration()
+        config.mqtt_topic = "saic"
+        config.mqtt_transport_protocol = TransportProtocol.TCP
+        self.publisher = MqttPublisher(config)
+
+    async def __broker_delivers(self, topic: str, payload: bytes) -> None:
+        await self.publisher.client.on_message("client", topic, payload, 0, {})
+
+    async def test_config_retained_by_broker_is_not_published_again(self) -> None:
+        with patch.object(self.publisher.client, "subscribe") as m_sub:
+            self.publisher.track_retained_topics(DISCOVERY_FILTER)
+        m_sub.assert_called_once_with(DISCOVERY_FILTER)
+
+        with patch.object(self.publisher.client, "publish") as m_pub:
+            assert self.publisher.publish_json_unless_retained(
+                DISCOVERY_TOPIC, CONFIG, no_prefix=True
+            )
+            # The broker echoes the retained config back to the subscription
+            await self.__broker_delivers(DISCOVERY_TOPIC, m_pub.call_args.args[1])
+
+            assert not self.publisher.publish_json_unless_retained(
+                DISCOVERY_TOPIC, CONFIG, no_prefix=True
+            )
+            assert self.publisher.publish_json_unless_retained(
+                DISCOVERY_TOPIC, CONFIG | {"name": "State of charge"}, no_prefix=True
+            )
+        assert m_pub.call_count == 2
+
+    async def test_reconnect_requires_a_new_broker_confirmation(self) -> None:
+        with patch.object(self.publisher.client, "subscribe"):
+            self.publisher.track_retained_topics(DISCOVERY_FILTER)
+        with patch.object(self.publisher.client, "publish") as m_pub:
+            self.publisher.publish_json_unless_retained(
+                DISCOVERY_TOPIC, CONFIG, no_prefix=True
+            )
+            await self.__broker_delivers(DISCOVERY_TOPIC, m_pub.call_args.args[1])
+
+            self.publisher.first_connection = False
+            with patch.object(self.publisher.client, "subscribe") as m_sub:
+                self.publisher.client.on_connect(self.publisher.client, 0, 0, {})
+            assert DISCOVERY_FILTER in [c.args[0] for c in m_sub.call_args_list]
+
+            assert self.publisher.publish_json_unless_retained(
+                DISCOVERY_TOPIC, CONFIG, no_prefix=True
+            )
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import gmqtt
+import pytest
+
+from configuration import Configuration
+from publisher.core import (
+    PAYLOAD_CACHE_MAX_LENGTH,
+    TOPIC_CACHE_MAX_SIZE,
+    encode_payload,
+)
+from tests.mocks import MessageCapturingConsolePublisher
+
+
+def _make_publisher() -> MessageCapturingConsolePublisher:
+    config = Configuration()
+    config.mqtt_topic = "saic"
+    return MessageCapturingConsolePublisher(config)
+
+
+def test_resolved_topics_are_reused() -> None:
+    publisher = _make_publisher()
+
+    sub_topic = "drivetrain/soc"
+    first = publisher.get_topic("vehicles/vin+1/drivetrain/soc", False)
+    second = publisher.get_topic(f"vehicles/vin+1/{sub_topic}", False)
+
+    assert first == "saic/vehicles/vin_1/drivetrain/soc"
+    assert first is second
+
+
+def test_no_prefix_is_part_of_the_cache_key() -> None:
+    publisher = _make_publisher()
+
+    assert publisher.get_topic("foo", False) == "saic/foo"
+    assert publisher.get_topic("foo", True) == "foo"
+
+
+def test_topic_cache_is_bounded() -> None:
+    publisher = _make_publisher()
+    for i in range(TOPIC_CACHE_MAX_SIZE + 10):
+        publisher.get_topic(f"topic/{i}", False)
+
+    cache = publisher._Publisher__topic_cache  # type: ignore[attr-defined]
+    assert len(cache) == TOPIC_CACHE_MAX_SIZE
+    assert ("topic/0", False) not in cache
+    assert publisher.get_topic("topic/0", False) == "saic/topic/0"
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        True,
+        False,
+        0,
+        1,
+        -42,
+        1.5,
+        float("nan"),
+        "",
+        "online",
+        "Zürich",
+        "x" * (PAYLOAD_CACHE_MAX_LENGTH + 1),
+        None,
+    ],
+)
+def test_encoded_payloads_match_gmqtt(payload: bool | float | str | None) -> None:
+    assert encode_payload(payload) == gmqtt.Message("topic", payload).payload  # type: ignore[no-untyped-call]
+
+
+def test_booleans_and_integers_are_encoded_differently() -> None:
+    assert encode_payload(1) == b"1"
+    assert encode_payload(True) == b"True"
+    assert encode_payload(1.0) == b"1.0"
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import pytest
+
+from publisher.topic_router import TopicRouter, topic_matches
+
+
+def test_literal_filters_match_exactly() -> None:
+    router: TopicRouter[str] = TopicRouter()
+    router.add("openWB/lp/1/boolChargeStat", "charge state")
+
+    match = router.match("openWB/lp/1/boolChargeStat")
+
+    assert match is not None
+    assert match.value == "charge state"
+    assert match.wildcards == ()
+    assert router.match("openWB/lp/2/boolChargeStat") is None
+    assert router.match("openWB/lp/1") is None
+
+
+def test_wildcards_capture_the_matched_levels() -> None:
+    router: TopicRouter[str] = TopicRouter()
+    router.add("saic/user/vehicles/+/#", "command")
+
+    match = router.match("saic/user/vehicles/VIN/climate/remoteTemperature/set")
+
+    assert match is not None
+    assert match.value == "command"
+    assert match.wildcards == ("VIN", "climate/remoteTemperature/set")
+
+
+def test_multi_level_wildcard_matches_its_parent_level() -> None:
+    router: TopicRouter[str] = TopicRouter()
+    router.add("homeassistant/#", "discovery")
+
+    match = router.match("homeassistant")
+
+    assert match is not None
+    assert match.wildcards == ("",)
+
+
+def test_the_most_specific_filter_wins() -> None:
+    router: TopicRouter[str] = TopicRouter()
+    router.add("a/#", "multi level")
+    router.add("a/+/c", "single level")
+    router.add("a/b/c", "literal")
+
+    assert [
+        m.value if (m := router.match(topic)) else None
+        for topic in ("a/b/c", "a/x/c", "a/x/d", "b/x")
+    ] == ["literal", "single level", "multi level", None]
+
+
+def test_backtracks_when_a_literal_branch_does_not_match() -> None:
+    router: TopicRouter[str] = TopicRouter()
+    router.add("a/b/c", "literal")
+    router.add("a/+/d", "single level")
+
+    match = router.match("a/b/d")
+
+    assert match is not None
+    assert match.value == "single level"
+    assert match.wildcards == ("b",)
+
+
+def test_adding_a_filter_again_replaces_its_value() -> None:
+    router: TopicRouter[str] = TopicRouter()
+    router.add("a/+", "old")
+    router.add("a/+", "new")
+
+    match = router.match("a/b")
+
+    assert match is not None
+    assert match.value == "new"
+
+
+def test_multi_level_wildcard_must_be_last() -> None:
+    router: TopicRouter[str] = TopicRouter()
+
+    with pytest.raises(ValueError, match="must be the last level"):
+        router.add("a/#/b", "invalid")
+
+
+def test_topic_matches() -> None:
+    discovery_filter = "homeassistant/+/vin_mg/+/config"
+    discovery_topic = "homeassistant/sensor/vin_mg/vin_soc/config"
+
+    assert topic_matches(discovery_filter, discovery_topic)
+    assert topic_matches("homeassistant/#", discovery_topic)
+    assert not topic_matches(discovery_filter, "homeassistant/sensor/other_mg/x/config")
+    assert not topic_matches(discovery_filter, "homeassistant/sensor/vin_mg/config")
+    assert not topic_matches("homeassistant/+", discovery_topic)
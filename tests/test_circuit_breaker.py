@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import unittest
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+from saic_ismart_client_ng.api.vehicle.schema import VinInfo
+
+from circuit_breaker import BreakerState, CircuitBreaker
+from configuration import Configuration
+import mqtt_topics
+from vehicle import VehicleState
+from vehicle_info import VehicleInfo
+
+from .common_mocks import VIN
+from .mocks import MessageCapturingConsolePublisher
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.jitter = 0.0
+        self.states: list[BreakerState] = []
+        self.breaker = CircuitBreaker(
+            "test",
+            base_delay=10,
+            max_delay=30,
+            failure_threshold=2,
+            on_state_change=self.states.append,
+            clock=self.clock,
+            rng=lambda: self.jitter,
+        )
+
+    def test_opens_after_consecutive_failures(self) -> None:
+        self.breaker.record_failure()
+        assert self.states == []
+        assert self.breaker.before_request()
+
+        self.breaker.record_failure()
+
+        assert self.breaker.state is BreakerState.OPEN
+        assert not self.breaker.before_request()
+        assert self.breaker.seconds_until_retry() == 10
+
+    def test_success_resets_the_failure_count(self) -> None:
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+
+        assert self.breaker.state is BreakerState.CLOSED
+        assert self.states == []
+
+    def test_lets_a_single_probe_through_once_the_backoff_elapsed(self) -> None:
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 10
+
+        assert self.breaker.before_request()
+        assert self.states[-1] is BreakerState.HALF_OPEN
+        assert not self.breaker.can_request()
+
+        self.breaker.record_success()
+
+        assert self.breaker.state is BreakerState.CLOSED
+        assert self.breaker.seconds_until_retry() is None
+        assert self.states == [
+            BreakerState.OPEN,
+            BreakerState.HALF_OPEN,
+            BreakerState.CLOSED,
+        ]
+
+    def test_failed_probes_back_off_exponentially_up_to_the_max(self) -> None:
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        delays = [self.breaker.retry_delay]
+        for _ in range(3):
+            self.clock.now += self.breaker.retry_delay
+            assert self.breaker.before_request()
+            self.breaker.record_failure()
+            delays.append(self.breaker.retry_delay)
+
+        assert delays == [10, 20, 30, 30]
+
+    def test_jitter_shortens_the_backoff_by_up_to_half(self) -> None:
+        self.jitter = 1.0
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        assert self.breaker.retry_delay == 5
+
+    def test_probe_that_never_reports_back_is_replaced(self) -> None:
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 10
+        assert self.breaker.before_request()
+
+        self.clock.now = 15
+        assert not self.breaker.before_request()
+        self.clock.now = 20
+        assert self.breaker.before_request()
+
+    def test_released_probe_is_let_through_again_right_away(self) -> None:
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 10
+        assert self.breaker.before_request()
+        assert not self.breaker.can_request()
+
+        self.breaker.release()
+
+        assert self.breaker.state is BreakerState.HALF_OPEN
+        assert self.breaker.before_request()
+
+
+class TestVehicleRefreshBreaker(unittest.TestCase):
+    def setUp(self) -> None:
+        config = Configuration()
+        config.anonymized_publishing = False
+        self.publisher = MessageCapturingConsolePublisher(config)
+        vin_info = VinInfo()
+        vin_info.vin = VIN
+        self.vehicle_state = VehicleState(
+            self.publisher,
+            BlockingScheduler(),
+            f"/vehicles/{VIN}",
+            VehicleInfo(vin_info, None),
+        )
+        self.vehicle_state.configure_missing()
+        self.breaker_topic = self.vehicle_state.get_topic(
+            mqtt_topics.REFRESH_CIRCUIT_BREAKER
+        )
+
+    def test_failed_refresh_is_retried_after_a_jittered_backoff(self) -> None:
+        self.vehicle_state.mark_failed_refresh()
+
+        assert self.vehicle_state.refresh_breaker_state is BreakerState.OPEN
+        assert self.publisher.map[self.breaker_topic] == "open"
+        assert 15 <= self.vehicle_state.refresh_period_error <= 30
+        assert not self.vehicle_state.should_refresh()
+        seconds = self.vehicle_state.seconds_until_refresh()
+        assert seconds is not None
+        assert 0 < seconds <= 30
+
+    def test_successful_refresh_closes_the_breaker(self) -> None:
+        self.vehicle_state.mark_failed_refresh()
+
+        self.vehicle_state.mark_successful_refresh()
+
+        assert self.vehicle_state.refresh_breaker_state is BreakerState.CLOSED
+        assert self.publisher.map[self.breaker_topic] == "closed"
+        assert self.vehicle_state.refresh_period_error == 30
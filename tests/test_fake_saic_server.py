@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import unittest
+
+import pytest
+from saic_ismart_client_ng import SaicApi
+from saic_ismart_client_ng.exceptions import SaicApiException, SaicLogoutException
+from saic_ismart_client_ng.model import SaicApiConfiguration
+
+from fake_saic.fleet import (
+    FAKE_PASSWORD,
+    VEHICLE_START_MESSAGE_TYPE,
+    Fleet,
+    account_username,
+    vehicle_vin,
+)
+from fake_saic.server import FakeSaicServer, ServerBehaviour
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestFakeSaicServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.clock = FakeClock()
+        self.fleet = Fleet(accounts=2, vehicles_per_account=2, clock=self.clock)
+        self.server: FakeSaicServer | None = None
+
+    async def asyncTearDown(self) -> None:
+        if self.server is not None:
+            await self.server.close()
+
+    async def __start(
+        self, behaviour: ServerBehaviour | None = None, password: str = FAKE_PASSWORD
+    ) -> SaicApi:
+        self.server = FakeSaicServer(
+            self.fleet, base_path="/api.app/v1/", behaviour=behaviour
+        )
+        await self.server.start()
+        return SaicApi(
+            SaicApiConfiguration(
+                username=account_username(1),
+                password=password,
+                base_uri=self.server.base_uri,
+                sms_delivery_delay=0,
+            )
+        )
+
+    async def test_serves_the_vehicles_of_the_account(self) -> None:
+        api = await self.__start()
+        await api.login()
+
+        vehicles = await api.vehicle_list()
+
+        assert [v.vin for v in vehicles.vinList] == [
+            vehicle_vin(1, 0),
+            vehicle_vin(1, 1),
+        ]
+
+    async def test_vehicle_status_is_served_after_the_event_id_rounds(self) -> None:
+        api = await self.__start(ServerBehaviour(event_id_retries=2))
+        await api.login()
+
+        status = await api.get_vehicle_status(vehicle_vin(1, 0))
+        charge = await api.get_vehicle_charging_management_data(vehicle_vin(1, 0))
+
+        vehicle = self.fleet.accounts[account_username(1)].vehicles[vehicle_vin(1, 0)]
+        assert status.basicVehicleStatus is not None
+        assert status.basicVehicleStatus.extendedData1 == round(vehicle.soc)
+        assert charge.chrgMgmtData is not None
+        assert charge.chrgMgmtData.bmsPackSOCDsp == round(vehicle.soc * 10)
+        assert self.server is not None
+        assert self.server.stats.requests["/vehicle/status"] == 3
+
+    async def test_commands_change_the_vehicle_state(self) -> None:
+        api = await self.__start(ServerBehaviour(event_id_retries=0))
+        await api.login()
+
+        await api.unlock_vehicle(vehicle_vin(1, 1))
+        status = await api.get_vehicle_status(vehicle_vin(1, 1))
+
+        assert status.basicVehicleStatus is not None
+        assert status.basicVehicleStatus.lockStatus == 0
+
+    async def test_trips_raise_vehicle_start_alarms(self) -> None:
+        api = await self.__start(ServerBehaviour(event_id_retries=0))
+        await api.login()
+        self.clock.now = 30 * 24 * 60 * 60
+
+        await api.get_vehicle_status(vehicle_vin(1, 0))
+        alarms = await api.get_alarm_list(page_num=1, page_size=1)
+
+        assert alarms is not None
+        assert alarms.totalNumber
+        assert [m.messageType for m in alarms.messages] == [VEHICLE_START_MESSAGE_TYPE]
+
+    async def test_rejects_wrong_credentials(self) -> None:
+        api = await self.__start(password="wrong")  # noqa: S106
+
+        with pytest.raises(SaicApiException, match="Invalid username or password"):
+            await api.login()
+
+    async def test_injects_logouts(self) -> None:
+        api = await self.__start(ServerBehaviour(logout_rate=1.0))
+        await api.login()
+
+        with pytest.raises(SaicLogoutException):
+            await api.vehicle_list()
+
+        assert self.server is not None
+        assert self.server.stats.injected_logouts == 1
+
+    async def test_injects_errors(self) -> None:
+        api = await self.__start(ServerBehaviour(error_rate=1.0))
+        await api.login()
+
+        with pytest.raises(SaicApiException, match="Injected failure"):
+            await api.vehicle_list()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from configuration import Configuration, SaicAccount
+from exceptions import MqttGatewayException
+from mqtt_gateway import MqttGateway
+
+from .mocks import MessageCapturingConsolePublisher
+
+VIN_A = "vin_a000000000000"
+VIN_B = "vin_b000000000000"
+
+
+def _make_gateway(config: Configuration) -> MqttGateway:
+    with patch(
+        "mqtt_gateway.MqttGateway._MqttGateway__select_publisher",
+        return_value=MessageCapturingConsolePublisher(config),
+    ):
+        return MqttGateway(config)
+
+
+def _make_config() -> Configuration:
+    config = Configuration()
+    config.saic_user = "first@example.com"
+    config.saic_password = "secret"  # noqa: S105
+    config.saic_accounts = [
+        SaicAccount(username="second@example.com", password="secret2"),  # noqa: S106
+        SaicAccount(username="first@example.com", password="duplicate"),  # noqa: S106
+    ]
+    return config
+
+
+class TestGatewayAccounts(unittest.IsolatedAsyncioTestCase):
+    def test_one_account_handler_per_account(self) -> None:
+        gateway = _make_gateway(_make_config())
+
+        assert [a.username for a in gateway.accounts] == [
+            "first@example.com",
+            "second@example.com",
+        ]
+        first, second = gateway.accounts
+        assert first.saic_api is not second.saic_api
+        assert first.publisher is gateway.publisher
+        assert second.publisher is gateway.publisher
+
+    def test_no_account_configured(self) -> None:
+        with pytest.raises(MqttGatewayException, match="Please configure"):
+            _make_gateway(Configuration())
+
+    async def test_commands_are_routed_to_the_owning_account(self) -> None:
+        gateway = _make_gateway(_make_config())
+        first, second = gateway.accounts
+        vh_a = MagicMock()
+        vh_a.handle_mqtt_command = AsyncMock()
+        vh_b = MagicMock()
+        vh_b.handle_mqtt_command = AsyncMock()
+        first.vehicle_handlers[VIN_A] = vh_a
+        second.vehicle_handlers[VIN_B] = vh_b
+
+        await gateway.on_mqtt_command_received(
+            vin=VIN_B, topic="refresh/mode/set", payload="force"
+        )
+
+        vh_b.handle_mqtt_command.assert_awaited_once_with(
+            topic="refresh/mode/set", payload="force", retained=False
+        )
+        vh_a.handle_mqtt_command.assert_not_awaited()
+        assert gateway.vehicle_handlers == {VIN_A: vh_a, VIN_B: vh_b}
+        assert gateway.get_vehicle_handler("unknown") is None
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from typing import TYPE_CHECKING
 import unittest
 from unittest.mock import AsyncMock, patch
 from zoneinfo import ZoneInfo
@@ -13,6 +14,9 @@ import mqtt_topics
 
 from .mocks import MessageCapturingConsolePublisher
 
+if TYPE_CHECKING:
+    from handlers.account import AccountHandler
+
 
 def _make_gateway(config: Configuration) -> MqttGateway:
     with patch(
@@ -30,13 +34,17 @@ def _make_config(*, forced_tz: ZoneInfo | None) -> Configuration:
     return config
 
 
+def _account(gateway: MqttGateway) -> AccountHandler:
+    return gateway.accounts[0]
+
+
 # Name-mangled access helpers — mypy does not see private dunder names.
 async def _refresh(gateway: MqttGateway) -> None:
-    await gateway._MqttGateway__refresh_user_timezone()  # type: ignore[attr-defined]
+    await _account(gateway)._AccountHandler__refresh_user_timezone()  # type: ignore[attr-defined]
 
 
 def _user_tz(gateway: MqttGateway) -> ZoneInfo | None:
-    tz: ZoneInfo | None = gateway._MqttGateway__user_timezone  # type: ignore[attr-defined]
+    tz: ZoneInfo | None = _account(gateway)._AccountHandler__user_timezone  # type: ignore[attr-defined]
     return tz
 
 
@@ -48,7 +56,7 @@ class TestGatewayTimezoneRefresh(unittest.IsolatedAsyncioTestCase):
         assert isinstance(publisher, MessageCapturingConsolePublisher)
 
         with patch.object(
-            gateway.saic_api,
+            _account(gateway).saic_api,
             "get_user_timezone",
             new=AsyncMock(return_value=UserTimezoneResp(timezone="GMT+10:00")),
         ):
@@ -70,11 +78,11 @@ class TestGatewayTimezoneRefresh(unittest.IsolatedAsyncioTestCase):
 
         with (
             patch.object(
-                gateway.saic_api,
+                _account(gateway).saic_api,
                 "get_user_timezone",
                 new=AsyncMock(return_value=UserTimezoneResp(timezone="GMT+11:00")),
             ),
-            self.assertLogs("mqtt_gateway", level=logging.WARNING) as cm,
+            self.assertLogs("handlers.account", level=logging.WARNING) as cm,
         ):
             await _refresh(gateway)
 
@@ -95,7 +103,7 @@ class TestGatewayTimezoneRefresh(unittest.IsolatedAsyncioTestCase):
         assert isinstance(publisher, MessageCapturingConsolePublisher)
 
         with patch.object(
-            gateway.saic_api,
+            _account(gateway).saic_api,
             "get_user_timezone",
             new=AsyncMock(side_effect=RuntimeError("boom")),
         ):
@@ -121,10 +129,10 @@ class TestGatewayTimezoneRefresh(unittest.IsolatedAsyncioTestCase):
         config = _make_config(forced_tz=forced)
         gateway = _make_gateway(config)
 
-        logger = logging.getLogger("mqtt_gateway")
+        logger = logging.getLogger("handlers.account")
         with (
             patch.object(
-                gateway.saic_api,
+                _account(gateway).saic_api,
                 "get_user_timezone",
                 new=AsyncMock(return_value=UserTimezoneResp(timezone="GMT+10:00")),
             ),
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import queue
+import unittest
+from unittest.mock import patch
+
+from integrations.outbound_queue import OutboundQueue
+from log_config import (
+    JsonFormatter,
+    LogContextFilter,
+    RepeatedExceptionFilter,
+    StructuredQueueHandler,
+    log_context,
+)
+
+
+class TestLogPipeline(unittest.TestCase):
+    def setUp(self) -> None:
+        self.queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        self.handler = StructuredQueueHandler(self.queue)
+        self.handler.addFilter(LogContextFilter())
+        self.handler.addFilter(RepeatedExceptionFilter(interval=60))
+        self.logger = logging.getLogger("tests.log_config")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+        self.__records: list[logging.LogRecord] = []
+
+    def tearDown(self) -> None:
+        self.logger.removeHandler(self.handler)
+
+    @property
+    def records(self) -> list[logging.LogRecord]:
+        while not self.queue.empty():
+            self.__records.append(self.queue.get_nowait())
+        return self.__records
+
+    def __fail(self, reason: str) -> None:
+        try:
+            raise ConnectionError(reason)
+        except ConnectionError:
+            self.logger.exception("Poll of %s failed", "VIN")
+
+    def test_repeated_exceptions_are_logged_without_traceback(self) -> None:
+        for _ in range(3):
+            self.__fail("SAIC API unavailable")
+
+        assert [r.exc_text is not None for r in self.records] == [True, False, False]
+        assert "ConnectionError: SAIC API unavailable" in str(self.records[0].exc_text)
+        assert self.records[1].getMessage() == (
+            "Poll of VIN failed (repeated, traceback suppressed)"
+        )
+
+    def test_different_exceptions_keep_their_traceback(self) -> None:
+        self.__fail("SAIC API unavailable")
+        self.__fail("Token expired")
+
+        assert all(r.exc_text is not None for r in self.records)
+
+    def test_the_next_traceback_counts_the_suppressed_repeats(self) -> None:
+        with patch("log_config.time.monotonic") as monotonic:
+            for now in (0, 10, 20, 61):
+                monotonic.return_value = now
+                self.__fail("SAIC API unavailable")
+
+        assert [r.exc_text is not None for r in self.records] == [
+            True,
+            False,
+            False,
+            True,
+        ]
+        assert self.records[-1].getMessage() == (
+            "Poll of VIN failed (2 repeats logged without traceback"
+            " in the last 61 seconds)"
+        )
+
+    def test_json_lines_carry_the_log_context(self) -> None:
+        with log_context(vin="VIN", poll_cycle="cafe"):
+            self.__fail("SAIC API unavailable")
+        self.logger.info("Outside of a poll")
+
+        first, second = (json.loads(JsonFormatter().format(r)) for r in self.records)
+        assert first["vin"] == "VIN"
+        assert first["poll_cycle"] == "cafe"
+        assert first["message"] == "Poll of VIN failed"
+        assert "ConnectionError" in first["exception"]
+        assert "vin" not in second
+        assert "exception" not in second
+
+
+class TestOutboundQueueLogContext(unittest.IsolatedAsyncioTestCase):
+    async def test_sends_run_in_the_log_context_of_the_producer(self) -> None:
+        seen: list[str | None] = []
+
+        async def send(_item: int) -> tuple[bool, str]:
+            record = logging.makeLogRecord({})
+            LogContextFilter().filter(record)
+            seen.append(getattr(record, "vin", None))
+            return True, ""
+
+        outbound_queue: OutboundQueue[int] = OutboundQueue("test", send)
+        with log_context(vin="VIN"):
+            outbound_queue.put(1)
+        await asyncio.wait_for(outbound_queue.join(), 1)
+        await outbound_queue.close()
+
+        assert seen == ["VIN"]
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+
+import pytest
+
+from configuration import Configuration
+from metrics import (
+    LoopPhase,
+    MetricsRegistry,
+    MetricsServer,
+    time_call,
+)
+
+from .mocks import MessageCapturingConsolePublisher
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry()
+
+    def test_counters_are_rendered_per_label_set(self) -> None:
+        counter = self.registry.counter("test_total", "Test counter.", ("kind",))
+        counter.inc(kind="a")
+        counter.inc(2, kind="b")
+        counter.inc(kind="a")
+
+        assert self.registry.render() == (
+            "# HELP test_total Test counter.\n"
+            "# TYPE test_total counter\n"
+            'test_total{kind="a"} 2.0\n'
+            'test_total{kind="b"} 2.0\n'
+        )
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        histogram = self.registry.histogram(
+            "test_seconds", "Test histogram.", buckets=(1.0, 5.0)
+        )
+        histogram.observe(0.5)
+        histogram.observe(3.0)
+        histogram.observe(10.0)
+
+        assert self.registry.render().splitlines()[2:] == [
+            'test_seconds_bucket{le="1.0"} 1',
+            'test_seconds_bucket{le="5.0"} 2',
+            'test_seconds_bucket{le="+Inf"} 3',
+            "test_seconds_sum 13.5",
+            "test_seconds_count 3",
+        ]
+
+    def test_histogram_quantiles_interpolate_within_a_bucket(self) -> None:
+        histogram = self.registry.histogram(
+            "test_seconds", "Test histogram.", buckets=(1.0, 5.0)
+        )
+        assert histogram.quantile(0.5) is None
+
+        for value in (0.5, 2.0, 3.0, 4.0, 10.0):
+            histogram.observe(value)
+
+        assert histogram.quantile(0.1) == 0.5
+        assert histogram.quantile(0.5) == 3.0
+        assert histogram.quantile(0.99) == 5.0
+
+    def test_label_values_are_escaped(self) -> None:
+        gauge = self.registry.gauge("test_gauge", "Test gauge.", ("name",))
+        gauge.set(1, name='a "quoted"\\name')
+
+        assert 'test_gauge{name="a \\"quoted\\"\\\\name"} 1.0' in self.registry.render()
+
+    def test_unknown_labels_are_rejected(self) -> None:
+        counter = self.registry.counter("test_total", "Test counter.", ("kind",))
+
+        with pytest.raises(ValueError, match="expects the labels"):
+            counter.inc(other="a")
+
+    def test_time_call_records_the_outcome(self) -> None:
+        histogram = self.registry.histogram(
+            "test_seconds", "Test histogram.", ("call", "outcome")
+        )
+        with time_call(histogram, call="ok"):
+            pass
+        with pytest.raises(TimeoutError), time_call(histogram, call="slow"):
+            raise TimeoutError
+
+        assert histogram.count(call="ok", outcome="success") == 1
+        assert histogram.count(call="slow", outcome="timeout") == 1
+
+    def test_loop_phase_flags_only_the_current_phase(self) -> None:
+        gauge = self.registry.gauge("test_phase", "Test phase.", ("vin", "phase"))
+        phase = LoopPhase("vin", gauge)
+
+        phase.set(LoopPhase.POLLING)
+        phase.set(LoopPhase.WAITING)
+
+        assert gauge.value(vin="vin", phase=LoopPhase.WAITING) == 1
+        assert gauge.value(vin="vin", phase=LoopPhase.POLLING) == 0
+
+        phase.clear()
+
+        assert gauge.value(vin="vin", phase=LoopPhase.WAITING) is None
+
+
+class TestMetricsServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = MetricsRegistry()
+        self.registry.counter("test_total", "Test counter.").inc()
+        self.server = MetricsServer(host="127.0.0.1", port=0, registry=self.registry)
+        await self.server.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.server.close()
+
+    async def __get(self, path: str) -> tuple[str, str]:
+        port = self.server.port
+        assert port is not None
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = (await reader.read()).decode()
+        writer.close()
+        await writer.wait_closed()
+        head, body = response.split("\r\n\r\n", 1)
+        return head.splitlines()[0], body
+
+    async def test_serves_the_metrics(self) -> None:
+        status, body = await self.__get("/metrics")
+
+        assert status == "HTTP/1.1 200 OK"
+        assert "test_total 1.0" in body
+
+    async def test_other_paths_are_not_found(self) -> None:
+        status, _ = await self.__get("/")
+
+        assert status == "HTTP/1.1 404 Not Found"
+
+
+class TestPublisherTopicClass(unittest.TestCase):
+    def test_groups_topics_by_their_first_level_below_the_prefix(self) -> None:
+        config = Configuration()
+        config.mqtt_topic = "saic"
+        publisher = MessageCapturingConsolePublisher(config)
+
+        assert (
+            publisher.topic_class("saic/user@example.com/vehicles/VIN/drivetrain/soc")
+            == "drivetrain"
+        )
+        assert publisher.topic_class("saic/user@example.com/_internal/lwt") == (
+            "_internal"
+        )
+        assert (
+            publisher.topic_class("homeassistant/sensor/VIN_mg/soc/config")
+            == "homeassistant"
+        )
@@ -5,6 +5,7 @@ import unittest
 from unittest.mock import patch
 
 from configuration import Configuration, TransportProtocol
+from integrations.openwb.charging_station import ChargingStation
 from publisher.core import MqttCommandListener
 from publisher.mqtt_publisher import MqttPublisher
 
@@ -42,6 +43,9 @@ class TestMqttPublisher(unittest.IsolatedAsyncioTestCase, MqttCommandListener):
         self.received_vin = ""
         self.received_payload = ""
         self.received_retained = False
+        self.charging_detected_vin = ""
+        self.charger_connected: tuple[str, bool] | None = None
+        self.imported_energy: tuple[str, float] | None = None
         self.vehicle_base_topic = (
             f"{self.mqtt_client.configuration.mqtt_topic}/{USER}/vehicles/{VIN}"
         )
@@ -88,57 +92,89 @@ class TestMqttPublisher(unittest.IsolatedAsyncioTestCase, MqttCommandListener):
         assert self.mqtt_client.get_vin_from_topic(topic) == VIN
 
     async def on_charging_detected(self, vin: str) -> None:
-        pass
+        self.charging_detected_vin = vin
 
     async def on_charging_station_energy_imported(
         self, vin: str, imported_energy_wh: float
     ) -> None:
-        pass
+        self.imported_energy = (vin, imported_energy_wh)
 
     async def on_charger_connection_state_changed(
         self, vin: str, connected: bool
     ) -> None:
-        pass
+        self.charger_connected = (vin, connected)
+
+    async def test_charging_station_topics_are_routed_to_their_vehicle(self) -> None:
+        for i, vin in enumerate((VIN, "vin20000000000000")):
+            self.mqtt_client.configuration.charging_stations_by_vin[vin] = (
+                ChargingStation(
+                    vin=vin,
+                    charge_state_topic=f"openWB/lp/{i}/boolChargeStat",
+                    charging_value="1",
+                    connected_topic=f"openWB/lp/{i}/boolPlugStat",
+                    connected_value="1",
+                    imported_energy_topic=f"openWB/lp/{i}/kWhCounter",
+                )
+            )
+        with patch.object(self.mqtt_client.client, "subscribe"):
+            self.mqtt_client.enable_commands()
+
+        await self.send_message("openWB/lp/0/boolChargeStat", b"1")
+        await self.send_message("openWB/lp/0/boolPlugStat", b"1")
+        await self.send_message("openWB/lp/0/kWhCounter", b"1234.5")
+
+        assert self.charging_detected_vin == VIN
+        assert self.charger_connected == (VIN, True)
+        assert self.imported_energy == (VIN, 1234.5)
+        assert self.received_vin == ""
+
+    async def test_commands_of_a_subscribed_account_are_routed_by_vin(self) -> None:
+        with patch.object(self.mqtt_client.client, "subscribe"):
+            self.mqtt_client.enable_account_commands(USER)
+        await self.send_message(f"{self.vehicle_base_topic}/doors/locked/set", b"true")
+
+        assert self.received_vin == VIN
+        assert self.received_payload == LOCK_STATE
 
     def test_publish_str_default_is_retained(self) -> None:
         with patch.object(self.mqtt_client.client, "publish") as m_pub:
             self.mqtt_client.publish_str("foo", "bar")
-            m_pub.assert_called_once_with("saic/foo", "bar", retain=True)
+            m_pub.assert_called_once_with("saic/foo", b"bar", retain=True)
 
     def test_publish_str_forwards_retain_false(self) -> None:
         with patch.object(self.mqtt_client.client, "publish") as m_pub:
             self.mqtt_client.publish_str("foo", "bar", retain=False)
-            m_pub.assert_called_once_with("saic/foo", "bar", retain=False)
+            m_pub.assert_called_once_with("saic/foo", b"bar", retain=False)
 
     def test_publish_int_default_is_retained(self) -> None:
         with patch.object(self.mqtt_client.client, "publish") as m_pub:
             self.mqtt_client.publish_int("foo", 42)
-            m_pub.assert_called_once_with("saic/foo", 42, retain=True)
+            m_pub.assert_called_once_with("saic/foo", b"42", retain=True)
 
     def test_publish_int_forwards_retain_false(self) -> None:
         with patch.object(self.mqtt_client.client, "publish") as m_pub:
             self.mqtt_client.publish_int("foo", 42, retain=False)
-            m_pub.assert_called_once_with("saic/foo", 42, retain=False)
+            m_pub.assert_called_once_with("saic/foo", b"42", retain=False)
 
     def test_publish_bool_default_is_retained(self) -> None:
         with patch.object(self.mqtt_client.client, "publish") as m_pub:
             self.mqtt_client.publish_bool("foo", True)
-            m_pub.assert_called_once_with("saic/foo", True, retain=True)
+            m_pub.assert_called_once_with("saic/foo", b"True", retain=True)
 
     def test_publish_bool_forwards_retain_false(self) -> None:
         with patch.object(self.mqtt_client.client, "publish") as m_pub:
             self.mqtt_client.publish_bool("foo", True, retain=False)
-            m_pub.assert_called_once_with("saic/foo", True, retain=False)
+            m_pub.assert_called_once_with("saic/foo", b"True", retain=False)
 
     def test_publish_float_default_is_retained(self) -> None:
         with patch.object(self.mqtt_client.client, "publish") as m_pub:
             self.mqtt_client.publish_float("foo", 1.5)
-            m_pub.assert_called_once_with("saic/foo", 1.5, retain=True)
+            m_pub.assert_called_once_with("saic/foo", b"1.5", retain=True)
 
     def test_publish_float_forwards_retain_false(self) -> None:
         with patch.object(self.mqtt_client.client, "publish") as m_pub:
             self.mqtt_client.publish_float("foo", 1.5, retain=False)
-            m_pub.assert_called_once_with("saic/foo", 1.5, retain=False)
+            m_pub.assert_called_once_with("saic/foo", b"1.5", retain=False)
 
     def test_publish_json_default_is_retained(self) -> None:
         with patch.object(self.mqtt_client.client, "publish") as m_pub:
@@ -159,4 +195,24 @@ class TestMqttPublisher(unittest.IsolatedAsyncioTestCase, MqttCommandListener):
     def test_clear_topic_publishes_none_retained(self) -> None:
         with patch.object(self.mqtt_client.client, "publish") as m_pub:
             self.mqtt_client.clear_topic("foo")
-            m_pub.assert_called_once_with("saic/foo", None, retain=True)
+            m_pub.assert_called_once_with("saic/foo", b"", retain=True)
+
+    def test_enable_account_commands_subscribes_account_prefix(self) -> None:
+        with patch.object(self.mqtt_client.client, "subscribe") as m_sub:
+            self.mqtt_client.enable_account_commands("first@home.da")
+            self.mqtt_client.enable_account_commands("second@home.da")
+            self.mqtt_client.enable_account_commands("first@home.da")
+        topics = [c.args[0] for c in m_sub.call_args_list]
+        assert len(topics) == 8
+        for user in ("first@home.da", "second@home.da"):
+            prefix = self.mqtt_client.get_mqtt_account_prefix(user)
+            assert f"{prefix}/vehicles/+/refresh/mode/set" in topics
+
+    def test_enable_commands_resubscribes_known_accounts(self) -> None:
+        with patch.object(self.mqtt_client.client, "subscribe"):
+            self.mqtt_client.enable_account_commands(USER)
+        with patch.object(self.mqtt_client.client, "subscribe") as m_sub:
+            self.mqtt_client.enable_commands()
+        topics = [c.args[0] for c in m_sub.call_args_list]
+        prefix = self.mqtt_client.get_mqtt_account_prefix(USER)
+        assert f"{prefix}/vehicles/+/refresh/mode/set" in topics
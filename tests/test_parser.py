@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import argparse
+import json
+from typing import TYPE_CHECKING
 from zoneinfo import ZoneInfo
 
 import pytest
@@ -8,6 +10,9 @@ import pytest
 from configuration.argparse_extensions import check_timezone
 from configuration.parser import process_command_line, setup_parser
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
 
 def test_setup_parser_should_generate_a_valid_parser() -> None:
     parser = setup_parser()
@@ -61,3 +66,66 @@ def test_process_command_line_defaults_forced_timezone_to_none(
     )
     config = process_command_line()
     assert config.saic_user_timezone is None
+
+
+def test_process_command_line_reads_saic_accounts_file(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    accounts_file = tmp_path / "saic-accounts.json"
+    accounts_file.write_text(
+        json.dumps(
+            [
+                {"username": "second@example.com", "password": "secret2"},
+                {
+                    "username": "3912345678",
+                    "password": "secret3",
+                    "phoneCountryCode": "+39",
+                },
+            ]
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "prog",
+            "--saic-user",
+            "user@example.com",
+            "--saic-password",
+            "secret",
+            "--saic-accounts-json",
+            str(accounts_file),
+        ],
+    )
+    config = process_command_line()
+    assert [a.username for a in config.accounts] == [
+        "user@example.com",
+        "second@example.com",
+        "3912345678",
+    ]
+    assert config.accounts[1].phone_country_code is None
+    assert config.accounts[2].phone_country_code == "+39"
+
+
+def test_process_command_line_accepts_only_saic_accounts_file(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    accounts_file = tmp_path / "saic-accounts.json"
+    accounts_file.write_text(
+        json.dumps([{"username": "user@example.com", "password": "secret"}]),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(
+        "sys.argv", ["prog", "--saic-accounts-json", str(accounts_file)]
+    )
+    config = process_command_line()
+    assert config.saic_user is None
+    assert [a.username for a in config.accounts] == ["user@example.com"]
+
+
+def test_process_command_line_requires_an_account(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr("sys.argv", ["prog"])
+    with pytest.raises(SystemExit, match="SAIC username and password"):
+        process_command_line()
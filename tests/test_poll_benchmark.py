@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import unittest
+
+from poll_benchmark import STAGES, build_parser, measure, percentile
+
+
+class TestPollBenchmark(unittest.IsolatedAsyncioTestCase):
+    async def test_every_stage_is_measured(self) -> None:
+        args = build_parser().parse_args(["--polls=4", "--memory-polls=1"])
+
+        result = await measure(2, args)
+
+        assert result["polls"] == 4
+        assert result["messages_per_poll"] > 0
+        assert result["memory"]["peak_kib_per_poll"] > 0
+        for stage in STAGES:
+            assert result["stages"][stage]["count"] >= 4, stage
+            assert result["stages"][stage]["p99_ms"] is not None, stage
+
+
+def test_percentiles_use_the_nearest_rank() -> None:
+    samples = [float(i) for i in range(1, 101)]
+
+    assert percentile(samples, 0.5) == 50.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile([3.0], 0.99) == 3.0
+    assert percentile([], 0.5) is None
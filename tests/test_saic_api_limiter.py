@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+from typing import override
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from saic_ismart_client_ng.listener import SaicApiListener
+from saic_ismart_client_ng.model import SaicApiConfiguration
+
+from fake_saic.fleet import FAKE_PASSWORD, Fleet, account_username, vehicle_vin
+from fake_saic.server import FakeSaicServer, ServerBehaviour
+from saic_api_limiter import (
+    ApiPriority,
+    PriorityRateLimiter,
+    RateLimitedSaicApi,
+    api_priority,
+    api_priority_scope,
+)
+
+
+class TestPriorityRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        # One token every 10 ms, none left once the first caller is served
+        self.limiter = PriorityRateLimiter(requests_per_second=100, burst=1)
+        await self.limiter.acquire(ApiPriority.BACKGROUND)
+        self.served: list[ApiPriority] = []
+
+    async def __call(self, priority: ApiPriority) -> None:
+        await self.limiter.acquire(priority)
+        self.served.append(priority)
+
+    async def test_queued_calls_are_served_by_priority(self) -> None:
+        await asyncio.gather(
+            self.__call(ApiPriority.BACKGROUND),
+            self.__call(ApiPriority.POLL),
+            self.__call(ApiPriority.COMMAND),
+            self.__call(ApiPriority.CHARGING_POLL),
+        )
+
+        assert self.served == [
+            ApiPriority.COMMAND,
+            ApiPriority.CHARGING_POLL,
+            ApiPriority.POLL,
+            ApiPriority.BACKGROUND,
+        ]
+
+    async def test_stats_report_the_wait_per_lane(self) -> None:
+        await self.__call(ApiPriority.COMMAND)
+
+        stats = self.limiter.stats
+        assert stats["command"]["requests"] == 1
+        assert stats["command"]["waiting"] == 0
+        assert stats["command"]["maxWait"] > 0
+        assert stats["background"]["requests"] == 1
+        assert stats["background"]["maxWait"] == 0
+
+    async def test_cancelled_call_does_not_hold_up_the_others(self) -> None:
+        cancelled = asyncio.create_task(self.__call(ApiPriority.COMMAND))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        async with asyncio.timeout(1):
+            await self.__call(ApiPriority.POLL)
+
+        assert self.served == [ApiPriority.POLL]
+        assert self.limiter.stats["command"]["waiting"] == 0
+
+
+class _RecordingListener(SaicApiListener):
+    def __init__(self) -> None:
+        self.requests: list[str] = []
+
+    @override
+    async def on_request(
+        self, path: str, body: str | None = None, headers: dict[str, str] | None = None
+    ) -> None:
+        self.requests.append(path.split("?", maxsplit=1)[0])
+
+
+class TestRateLimitedSaicApi(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.fleet = Fleet(accounts=1, vehicles_per_account=1)
+        self.server = FakeSaicServer(
+            self.fleet,
+            base_path="/api.app/v1/",
+            behaviour=ServerBehaviour(event_id_retries=2),
+        )
+        await self.server.start()
+        self.limiter = PriorityRateLimiter()
+        self.listener = _RecordingListener()
+        self.saic_api = RateLimitedSaicApi(
+            SaicApiConfiguration(
+                username=account_username(0),
+                password=FAKE_PASSWORD,
+                base_uri=self.server.base_uri,
+                sms_delivery_delay=0,
+            ),
+            listener=self.listener,
+            rate_limiter=self.limiter,
+        )
+
+    async def asyncTearDown(self) -> None:
+        await self.server.close()
+
+    async def test_every_request_waits_for_the_limiter_with_the_current_priority(
+        self,
+    ) -> None:
+        acquire = AsyncMock(wraps=self.limiter.acquire)
+        with patch.object(self.limiter, "acquire", acquire):
+            await self.saic_api.login()
+            with api_priority_scope(ApiPriority.POLL):
+                await self.saic_api.get_vehicle_status(vehicle_vin(0, 0))
+
+        # The two event-id retries of the status call take a token each
+        assert self.server.stats.requests["/vehicle/status"] == 3
+        assert [c.args for c in acquire.await_args_list] == [
+            (ApiPriority.BACKGROUND,),
+            (ApiPriority.POLL,),
+            (ApiPriority.POLL,),
+            (ApiPriority.POLL,),
+        ]
+        assert api_priority.get() == ApiPriority.BACKGROUND
+
+    async def test_requests_are_still_passed_to_the_listener(self) -> None:
+        await self.saic_api.login()
+        await self.saic_api.get_vehicle_status(vehicle_vin(0, 0))
+
+        assert len(self.listener.requests) == 4
+        assert self.listener.requests[1:] == ["/vehicle/status"] * 3
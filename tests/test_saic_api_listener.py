@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import unittest
+
+from configuration import Configuration
+from saic_api_listener import MqttGatewaySaicApiListener, is_error_response
+
+from .mocks import MessageCapturingConsolePublisher
+
+STATUS_PATH = "/vehicle/status?vin=hash"
+STATUS_TOPIC = "_internal/api/vehicle/status"
+OK = json.dumps({"code": 0, "message": "success", "data": {"speed": 0}})
+FAILED = json.dumps({"code": 4, "message": "vehicle is asleep"})
+
+
+class TestRawApiDataCapture(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.configuration = Configuration()
+
+    def __listener(self) -> MqttGatewaySaicApiListener:
+        self.publisher = MessageCapturingConsolePublisher(self.configuration)
+        return MqttGatewaySaicApiListener(self.publisher)
+
+    async def __call(self, listener: MqttGatewaySaicApiListener, response: str) -> None:
+        await listener.on_request(STATUS_PATH, None, {"tenant-id": "459771"})
+        await listener.on_response(STATUS_PATH, response, None)
+
+    async def test_publishes_compact_request_and_response(self) -> None:
+        listener = self.__listener()
+
+        await self.__call(listener, OK)
+        await listener.join()
+
+        response = self.publisher.map[f"{STATUS_TOPIC}/response"]
+        assert "\n" not in response
+        assert json.loads(response) == {
+            "path": "/vehicle/status",
+            "query": {"vin": ["hash"]},
+            "body": {"code": 0, "message": "success", "data": {"speed": 0}},
+            "headers": None,
+        }
+        assert json.loads(self.publisher.map[f"{STATUS_TOPIC}/request"])["headers"] == {
+            "tenant-id": "459771"
+        }
+
+    async def test_samples_one_in_every_n_calls(self) -> None:
+        self.configuration.raw_api_data_sample_rate = 3
+        listener = self.__listener()
+
+        for _ in range(7):
+            await self.__call(listener, OK)
+            await listener.join()
+
+        assert self.publisher.publish_count == {
+            f"{STATUS_TOPIC}/request": 3,
+            f"{STATUS_TOPIC}/response": 3,
+        }
+
+    async def test_errors_only_publishes_failed_calls_with_their_request(
+        self,
+    ) -> None:
+        self.configuration.raw_api_data_errors_only = True
+        listener = self.__listener()
+
+        await self.__call(listener, OK)
+        await listener.join()
+        assert self.publisher.map == {}
+
+        await self.__call(listener, FAILED)
+        await listener.join()
+        assert json.loads(self.publisher.map[f"{STATUS_TOPIC}/response"])["body"] == {
+            "code": 4,
+            "message": "vehicle is asleep",
+        }
+        assert f"{STATUS_TOPIC}/request" in self.publisher.map
+
+    async def test_large_bodies_are_truncated(self) -> None:
+        self.configuration.raw_api_data_max_body_size = 10
+        listener = self.__listener()
+
+        await self.__call(listener, OK)
+        await listener.join()
+
+        response = json.loads(self.publisher.map[f"{STATUS_TOPIC}/response"])
+        assert response["body"] == OK[:10]
+        assert response["bodySize"] == len(OK)
+
+
+def test_error_responses_are_recognized() -> None:
+    assert is_error_response({"code": 4}) is True
+    assert is_error_response({"code": 0}) is False
+    assert is_error_response({"status": "error"}) is True
+    assert is_error_response({"status": "ok"}) is False
+    assert is_error_response("OK") is False
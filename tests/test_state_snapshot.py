@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import datetime
+import json
+from pathlib import Path
+import tempfile
+from typing import Any
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+from saic_ismart_client_ng.api.message.schema import MessageEntity
+from saic_ismart_client_ng.api.vehicle.schema import VinInfo
+
+from configuration import Configuration
+from handlers.message import MessageHandler
+from handlers.message_ack import MessageAcknowledger
+from state_snapshot import STATE_FILE_NAME, StateSnapshot
+from vehicle import VehicleState
+from vehicle_info import VehicleInfo
+
+from .common_mocks import VIN
+from .mocks import MessageCapturingConsolePublisher
+
+LAST_REFRESH = datetime.datetime(2026, 3, 1, 12, 30, tzinfo=datetime.UTC)
+
+
+def _make_vehicle_state() -> VehicleState:
+    config = Configuration()
+    config.anonymized_publishing = False
+    vin_info = VinInfo()
+    vin_info.vin = VIN
+    return VehicleState(
+        MessageCapturingConsolePublisher(config),
+        BlockingScheduler(),
+        f"/vehicles/{VIN}",
+        VehicleInfo(vin_info, None),
+    )
+
+
+class TestStateSnapshot(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = Path(tmp_dir.name) / STATE_FILE_NAME
+
+    def test_tracked_sections_survive_a_restart(self) -> None:
+        snapshot = StateSnapshot(self.path)
+        state: dict[str, Any] = {"value": 1}
+        snapshot.track("section", lambda: state)
+        snapshot.save()
+
+        assert StateSnapshot(self.path).restore("section") == {"value": 1}
+
+    def test_untracked_sections_are_kept_until_dropped(self) -> None:
+        snapshot = StateSnapshot(self.path)
+        snapshot.track("kept", lambda: {"value": 1})
+        snapshot.track("dropped", lambda: {"value": 2})
+        snapshot.save()
+
+        restarted = StateSnapshot(self.path)
+        restarted.untrack("dropped")
+        restarted.save()
+
+        reloaded = StateSnapshot(self.path)
+        assert reloaded.restore("kept") == {"value": 1}
+        assert reloaded.restore("dropped") is None
+
+    def test_unchanged_snapshot_is_not_written_again(self) -> None:
+        snapshot = StateSnapshot(self.path)
+        snapshot.track("section", lambda: {"value": 1})
+        snapshot.save()
+        self.path.unlink()
+
+        snapshot.save()
+
+        assert not self.path.exists()
+
+    def test_unreadable_snapshot_is_ignored(self) -> None:
+        self.path.write_text("{not json", encoding="utf-8")
+        assert StateSnapshot(self.path).restore("section") is None
+
+        self.path.write_text(json.dumps({"version": 0, "sections": {}}))
+        assert StateSnapshot(self.path).restore("section") is None
+
+
+class TestVehicleStateSnapshot(unittest.TestCase):
+    def test_restored_vehicle_resumes_its_polling_cadence(self) -> None:
+        vehicle_state = _make_vehicle_state()
+        vehicle_state.configure_missing()
+        vehicle_state.set_refresh_period_inactive(7200)
+        vehicle_state.last_successful_refresh = LAST_REFRESH
+        vehicle_state.last_car_shutdown = LAST_REFRESH
+        vehicle_state.is_charging = True
+        vehicle_state.hv_battery_active = False
+        snapshot = json.loads(json.dumps(vehicle_state.to_snapshot()))
+
+        restored = _make_vehicle_state()
+        restored.restore_snapshot(snapshot)
+
+        assert restored.is_complete()
+        assert restored.refresh_period_inactive == 7200
+        assert restored.last_successful_refresh == LAST_REFRESH
+        assert restored.last_car_shutdown == LAST_REFRESH
+        assert restored.is_charging
+        assert not restored.hv_battery_active
+        assert restored.to_snapshot() == snapshot
+
+    def test_malformed_snapshot_is_ignored(self) -> None:
+        vehicle_state = _make_vehicle_state()
+
+        vehicle_state.restore_snapshot({"last_successful_refresh": "yesterday"})
+
+        assert not vehicle_state.is_complete()
+        assert vehicle_state.last_successful_refresh == datetime.datetime.min.replace(
+            tzinfo=datetime.UTC
+        )
+
+
+class TestMessageHandlerSnapshot(unittest.TestCase):
+    def test_restored_handler_resumes_from_the_last_message(self) -> None:
+        handler = MessageHandler(MagicMock(), MagicMock(), MagicMock())
+        handler.last_message_ts = LAST_REFRESH
+        handler.last_message_id = "message-42"
+        snapshot = json.loads(json.dumps(handler.to_snapshot()))
+
+        restored = MessageHandler(MagicMock(), MagicMock(), MagicMock())
+        restored.restore_snapshot(snapshot)
+
+        assert restored.last_message_ts == LAST_REFRESH
+        assert restored.last_message_id == "message-42"
+
+
+class TestMessageAcknowledgerSnapshot(unittest.IsolatedAsyncioTestCase):
+    async def test_restored_acknowledgements_are_sent_by_the_next_flush(self) -> None:
+        acknowledger = MessageAcknowledger(MagicMock())
+        acknowledger.mark_read(MessageEntity(messageId=1, title="Vehicle start"))
+        acknowledger.delete(MessageEntity(messageId="2", title="Vehicle start"))
+        snapshot = json.loads(json.dumps(acknowledger.to_snapshot()))
+
+        saic_api = AsyncMock()
+        restored = MessageAcknowledger(saic_api)
+        restored.restore_snapshot(snapshot)
+        assert restored.pending_count == 2
+        await restored.flush()
+
+        saic_api.read_message.assert_awaited_once_with(message_id=1)
+        saic_api.delete_message.assert_awaited_once_with(message_id="2")
+        assert restored.pending_count == 0
+
+    def test_malformed_snapshot_is_ignored(self) -> None:
+        acknowledger = MessageAcknowledger(MagicMock())
+        acknowledger.restore_snapshot({"pending": [{"action": "archive"}]})
+
+        assert acknowledger.pending_count == 0
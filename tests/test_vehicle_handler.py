@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import json
 from typing import Any
 import unittest
 from unittest.mock import patch
@@ -11,13 +13,15 @@ from saic_ismart_client_ng.api.vehicle.schema import (
     VehicleModelConfiguration,
     VinInfo,
 )
+from saic_ismart_client_ng.exceptions import SaicApiException, SaicLogoutException
 from saic_ismart_client_ng.model import SaicApiConfiguration
 
+from circuit_breaker import BreakerState, CircuitBreaker
 from configuration import Configuration
 from handlers.relogin import ReloginHandler
 from handlers.vehicle import VehicleHandler
 import mqtt_topics
-from vehicle import VehicleState
+from vehicle import RefreshMode, VehicleState
 from vehicle_info import VehicleInfo
 
 from .common_mocks import (
@@ -99,16 +103,22 @@ class TestVehicleHandler(unittest.IsolatedAsyncioTestCase):
         self.vehicle_state = VehicleState(
             self.publisher, scheduler, account_prefix, vehicle_info
         )
-        mock_relogin_handler = ReloginHandler(
+        self.relogin_handler = ReloginHandler(
             relogin_relay=30, api=self.saicapi, scheduler=scheduler
         )
+        # The account breaker only moves on when a test advances its clock
+        self.now = 0.0
+        self.account_breaker = CircuitBreaker(
+            "account", base_delay=60, max_delay=60, jitter=0, clock=lambda: self.now
+        )
         self.vehicle_handler = VehicleHandler(
             config,
-            mock_relogin_handler,
+            self.relogin_handler,
             self.saicapi,
             self.publisher,
             vehicle_info,
             self.vehicle_state,
+            account_breaker=self.account_breaker,
         )
 
     async def test_update_vehicle_status(self) -> None:
@@ -441,6 +451,358 @@ class TestVehicleHandler(unittest.IsolatedAsyncioTestCase):
         # Fallback: DRIVETRAIN_SOC_BMS (96.3%) * 64.0 kWh ≈ 61.6 kWh
         assert self.publisher.map[soc_kwh_topic] == pytest.approx(61.6, abs=0.1)
 
+    async def test_forced_refresh_starts_without_waiting_for_deadline(self) -> None:
+        self.vehicle_state.configure_missing()
+        self.vehicle_state.set_refresh_mode(RefreshMode.OFF, "test")
+        polled = asyncio.Event()
+
+        async def fake_get_vehicle_status(_vin: str) -> Any:
+            polled.set()
+            msg = "test"
+            raise SaicApiException(msg)
+
+        with patch.object(
+            self.saicapi,
+            "get_vehicle_status",
+            side_effect=fake_get_vehicle_status,
+        ):
+            task = asyncio.create_task(self.vehicle_handler.handle_vehicle())
+            try:
+                await asyncio.sleep(0.05)
+                assert not polled.is_set()
+                self.vehicle_state.set_refresh_mode(RefreshMode.FORCE, "test")
+                await asyncio.wait_for(polled.wait(), 0.5)
+            finally:
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+
+    async def test_poll_is_skipped_while_the_account_breaker_is_open(self) -> None:
+        self.vehicle_state.configure_missing()
+        self.account_breaker.record_failure()
+        polled = asyncio.Event()
+
+        async def fake_get_vehicle_status(_vin: str) -> Any:
+            polled.set()
+            return get_mock_vehicle_status_resp()
+
+        with patch.object(
+            self.saicapi, "get_vehicle_status", side_effect=fake_get_vehicle_status
+        ):
+            task = asyncio.create_task(self.vehicle_handler.handle_vehicle())
+            try:
+                self.vehicle_state.set_refresh_mode(RefreshMode.FORCE, "test")
+                await asyncio.sleep(0.05)
+            finally:
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+
+        assert not polled.is_set()
+        assert self.account_breaker.state is BreakerState.OPEN
+        assert self.vehicle_state.refresh_mode == RefreshMode.FORCE
+
+    async def test_forced_refresh_survives_an_account_outage(self) -> None:
+        self.vehicle_state.configure_missing()
+        self.account_breaker.configure(base_delay=0.1, max_delay=0.1)
+        self.account_breaker.record_failure()
+        polled = asyncio.Event()
+
+        async def fake_get_vehicle_status(_vin: str) -> Any:
+            polled.set()
+            return get_mock_vehicle_status_resp()
+
+        with (
+            patch.object(
+                self.saicapi, "get_vehicle_status", side_effect=fake_get_vehicle_status
+            ),
+            patch.object(
+                self.saicapi,
+                "get_vehicle_charging_management_data",
+                return_value=get_mock_charge_management_data_resp(),
+            ),
+            patch.object(
+                self.saicapi, "get_vehicle_battery_heating_schedule", return_value=None
+            ),
+        ):
+            task = asyncio.create_task(self.vehicle_handler.handle_vehicle())
+            try:
+                self.vehicle_state.set_refresh_mode(RefreshMode.FORCE, "test")
+                await asyncio.sleep(0.05)
+                assert not polled.is_set()
+                # The forced refresh is still pending once the account recovers
+                self.now = 1.0
+                await asyncio.wait_for(polled.wait(), 1)
+                await asyncio.sleep(0.05)
+            finally:
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+
+        assert self.account_breaker.state is BreakerState.CLOSED
+        assert self.vehicle_state.last_failed_refresh is None
+
+    async def test_the_account_probe_is_released_after_a_logout(self) -> None:
+        self.vehicle_state.configure_missing()
+        self.account_breaker.record_failure()
+        self.now = 60.0
+        logged_out = asyncio.Event()
+
+        async def fake_get_vehicle_status(_vin: str) -> Any:
+            msg = "logged out"
+            raise SaicLogoutException(msg, 401)
+
+        async def fake_force_login() -> None:
+            logged_out.set()
+
+        with (
+            patch.object(
+                self.saicapi, "get_vehicle_status", side_effect=fake_get_vehicle_status
+            ),
+            patch.object(
+                self.relogin_handler, "force_login", side_effect=fake_force_login
+            ),
+            patch.object(self.relogin_handler, "relogin", side_effect=logged_out.set),
+        ):
+            task = asyncio.create_task(self.vehicle_handler.handle_vehicle())
+            try:
+                self.vehicle_state.set_refresh_mode(RefreshMode.FORCE, "test")
+                await asyncio.wait_for(logged_out.wait(), 1)
+                await asyncio.sleep(0)
+            finally:
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+
+        # A logout says nothing about the API, the next poll probes right away
+        assert self.account_breaker.state is BreakerState.HALF_OPEN
+        assert self.account_breaker.can_request()
+
+    async def test_poll_cycle_fetches_concurrently(self) -> None:
+        async def slow_vehicle_status(_vin: str) -> Any:
+            await asyncio.sleep(0.2)
+            return get_mock_vehicle_status_resp()
+
+        async def slow_charge_status(_vin: str) -> Any:
+            await asyncio.sleep(0.2)
+            return get_mock_charge_management_data_resp()
+
+        async def slow_battery_heating_schedule(_vin: str) -> Any:
+            await asyncio.sleep(0.2)
+
+        latencies = await self.__run_single_poll_cycle(
+            slow_vehicle_status, slow_charge_status, slow_battery_heating_schedule
+        )
+
+        assert set(latencies.keys()) == {
+            "vehicleStatus",
+            "chargeStatus",
+            "batteryHeatingSchedule",
+            "total",
+        }
+        assert latencies["total"] < 0.5
+        self.assert_mqtt_topic(
+            TestVehicleHandler.get_topic(mqtt_topics.DRIVETRAIN_SOC_KWH),
+            DRIVETRAIN_SOC_KWH,
+        )
+
+    async def test_poll_publishes_the_same_state_as_the_single_updates(self) -> None:
+        with (
+            patch.object(
+                SaicApi,
+                "get_vehicle_status",
+                return_value=get_mock_vehicle_status_resp(),
+            ),
+            patch.object(
+                SaicApi,
+                "get_vehicle_charging_management_data",
+                return_value=get_mock_charge_management_data_resp(),
+            ),
+            patch.object(
+                SaicApi, "get_vehicle_battery_heating_schedule", return_value=None
+            ),
+        ):
+            await self.vehicle_handler.update_vehicle_status()
+            await self.vehicle_handler.update_charge_status()
+            single_updates = dict(self.publisher.map)
+
+            # A fresh handler, so that no value is held back as unchanged
+            self.setUp()
+            await self.vehicle_handler.poll()
+            await self.vehicle_handler.abrp_queue.join()
+
+        polled = {
+            topic: value
+            for topic, value in self.publisher.map.items()
+            if topic in single_updates
+        }
+        assert polled.keys() == single_updates.keys()
+        for topic, value in single_updates.items():
+            if topic.endswith(("lastVehicleState", "lastChargeState")):
+                continue
+            self.assert_mqtt_topic(topic, value)
+        self.assert_mqtt_topic(
+            TestVehicleHandler.get_topic(mqtt_topics.DRIVETRAIN_SOC_KWH),
+            DRIVETRAIN_SOC_KWH,
+        )
+
+    async def test_abrp_is_not_fed_without_a_user_token(self) -> None:
+        await self.__poll_once()
+
+        assert self.vehicle_handler.abrp_queue.metrics["skipped"] == 0
+        self.assert_mqtt_topic(
+            TestVehicleHandler.get_topic(mqtt_topics.INTERNAL_ABRP),
+            "ABRP request skipped because of missing configuration",
+        )
+        assert (
+            TestVehicleHandler.get_topic(mqtt_topics.INTERNAL_ABRP_QUEUE)
+            not in self.publisher.map
+        )
+
+    async def test_abrp_is_fed_with_a_user_token(self) -> None:
+        self.vehicle_handler.abrp_api.abrp_user_token = "token"  # noqa: S105
+        with patch.object(
+            self.vehicle_handler.abrp_api,
+            "update_abrp",
+            return_value=(True, "ok"),
+        ):
+            await self.__poll_once()
+
+        assert self.vehicle_handler.abrp_queue.sent_count == 1
+        self.assert_mqtt_topic(
+            TestVehicleHandler.get_topic(mqtt_topics.INTERNAL_ABRP), "ok"
+        )
+
+    async def test_vehicle_status_is_published_before_the_charge_status(self) -> None:
+        charge_status_requested = asyncio.Event()
+        release_charge_status = asyncio.Event()
+
+        async def slow_charge_status(_vin: str) -> Any:
+            charge_status_requested.set()
+            await release_charge_status.wait()
+            return get_mock_charge_management_data_resp()
+
+        with (
+            patch.object(
+                self.saicapi,
+                "get_vehicle_status",
+                return_value=get_mock_vehicle_status_resp(),
+            ),
+            patch.object(
+                self.saicapi,
+                "get_vehicle_charging_management_data",
+                side_effect=slow_charge_status,
+            ),
+            patch.object(
+                self.saicapi, "get_vehicle_battery_heating_schedule", return_value=None
+            ),
+        ):
+            poll = asyncio.create_task(self.vehicle_handler.poll())
+            await charge_status_requested.wait()
+            await asyncio.sleep(0)
+
+            running_topic = TestVehicleHandler.get_topic(mqtt_topics.DRIVETRAIN_RUNNING)
+            charging_topic = TestVehicleHandler.get_topic(
+                mqtt_topics.DRIVETRAIN_CHARGING
+            )
+            assert running_topic in self.publisher.map
+            assert charging_topic not in self.publisher.map
+
+            release_charge_status.set()
+            await poll
+
+        self.assert_mqtt_topic(charging_topic, DRIVETRAIN_CHARGING)
+
+    async def test_poll_cycle_survives_battery_heating_schedule_timeout(self) -> None:
+        self.vehicle_handler.configuration.saic_poll_call_timeout = 0.1
+
+        async def vehicle_status(_vin: str) -> Any:
+            return get_mock_vehicle_status_resp()
+
+        async def charge_status(_vin: str) -> Any:
+            return get_mock_charge_management_data_resp()
+
+        async def hanging_battery_heating_schedule(_vin: str) -> Any:
+            await asyncio.sleep(10)
+
+        latencies = await self.__run_single_poll_cycle(
+            vehicle_status, charge_status, hanging_battery_heating_schedule
+        )
+
+        assert latencies["batteryHeatingSchedule"] >= 0.1
+        assert self.vehicle_state.last_failed_refresh is None
+        self.assert_mqtt_topic(
+            TestVehicleHandler.get_topic(mqtt_topics.DRIVETRAIN_SOC_KWH),
+            DRIVETRAIN_SOC_KWH,
+        )
+
+    async def __poll_once(self) -> None:
+        with (
+            patch.object(
+                self.saicapi,
+                "get_vehicle_status",
+                return_value=get_mock_vehicle_status_resp(),
+            ),
+            patch.object(
+                self.saicapi,
+                "get_vehicle_charging_management_data",
+                return_value=get_mock_charge_management_data_resp(),
+            ),
+            patch.object(
+                self.saicapi, "get_vehicle_battery_heating_schedule", return_value=None
+            ),
+        ):
+            await self.vehicle_handler.poll()
+            await self.vehicle_handler.abrp_queue.join()
+
+    async def __run_single_poll_cycle(
+        self,
+        vehicle_status: Any,
+        charge_status: Any,
+        battery_heating_schedule: Any,
+    ) -> dict[str, float]:
+        self.vehicle_state.configure_missing()
+        self.vehicle_state.set_refresh_mode(RefreshMode.OFF, "test")
+        latency_topic = (
+            f"{self.vehicle_handler.vehicle_prefix}/{mqtt_topics.INTERNAL_POLL_LATENCY}"
+        )
+        latency_published = asyncio.Event()
+        internal_publish = self.publisher.internal_publish
+
+        def capture_latency(key: str, value: Any, *, retain: bool = True) -> None:
+            internal_publish(key, value, retain=retain)
+            if key == latency_topic:
+                latency_published.set()
+
+        with (
+            patch.object(
+                self.publisher, "internal_publish", side_effect=capture_latency
+            ),
+            patch.object(
+                self.saicapi, "get_vehicle_status", side_effect=vehicle_status
+            ),
+            patch.object(
+                self.saicapi,
+                "get_vehicle_charging_management_data",
+                side_effect=charge_status,
+            ),
+            patch.object(
+                self.saicapi,
+                "get_vehicle_battery_heating_schedule",
+                side_effect=battery_heating_schedule,
+            ),
+        ):
+            task = asyncio.create_task(self.vehicle_handler.handle_vehicle())
+            try:
+                self.vehicle_state.set_refresh_mode(RefreshMode.FORCE, "test")
+                await asyncio.wait_for(latency_published.wait(), 2)
+            finally:
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+        result: dict[str, float] = json.loads(self.publisher.map[latency_topic])
+        return result
+
     def assert_mqtt_topic(self, topic: str, value: Any) -> None:
         mqtt_map = self.publisher.map
         if topic in mqtt_map:
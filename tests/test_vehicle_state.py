@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
 import json
 from typing import Any
@@ -557,6 +558,81 @@ class TestVehicleState(unittest.IsolatedAsyncioTestCase):
         assert self.publisher.map[phase_topic] == PollingPhase.OFF.value
         assert self.publisher.publish_count[phase_topic] == 3
 
+    def test_seconds_until_refresh_is_none_when_off(self) -> None:
+        self.vehicle_state.configure_missing()
+        self.vehicle_state.set_refresh_mode(RefreshMode.OFF, "test")
+        assert self.vehicle_state.seconds_until_refresh() is None
+
+    def test_seconds_until_refresh_is_zero_when_forced(self) -> None:
+        self.vehicle_state.configure_missing()
+        self.vehicle_state.set_refresh_mode(RefreshMode.FORCE, "test")
+        assert self.vehicle_state.seconds_until_refresh() == 0.0
+
+    def test_seconds_until_refresh_follows_inactive_period(self) -> None:
+        self.vehicle_state.configure_missing()
+        self.vehicle_state.hv_battery_active = False
+        self.vehicle_state.last_car_shutdown = datetime.datetime.min.replace(
+            tzinfo=datetime.UTC
+        )
+        self.vehicle_state.last_car_activity = datetime.datetime.min.replace(
+            tzinfo=datetime.UTC
+        )
+        self.vehicle_state.last_successful_refresh = datetime.datetime.now(
+            tz=datetime.UTC
+        )
+        seconds = self.vehicle_state.seconds_until_refresh()
+        assert seconds is not None
+        assert 86390 < seconds <= 86400
+        assert self.vehicle_state.should_refresh() is False
+
+    def test_seconds_until_refresh_wakes_up_at_end_of_grace_period(self) -> None:
+        self.vehicle_state.configure_missing()
+        self.vehicle_state.set_refresh_period_after_shutdown(3600)
+        self.vehicle_state.hv_battery_active = False
+        now = datetime.datetime.now(tz=datetime.UTC)
+        self.vehicle_state.last_car_shutdown = now
+        self.vehicle_state.last_car_activity = datetime.datetime.min.replace(
+            tzinfo=datetime.UTC
+        )
+        self.vehicle_state.last_successful_refresh = now
+        seconds = self.vehicle_state.seconds_until_refresh()
+        assert seconds is not None
+        # The grace period (600s) ends before the after-shutdown period (3600s)
+        assert 590 < seconds <= 600
+
+    def test_seconds_until_refresh_is_zero_after_car_activity(self) -> None:
+        self.vehicle_state.configure_missing()
+        self.vehicle_state.last_successful_refresh = datetime.datetime.now(
+            tz=datetime.UTC
+        )
+        self.vehicle_state.notify_car_activity()
+        assert self.vehicle_state.seconds_until_refresh() == 0.0
+        assert self.vehicle_state.should_refresh() is True
+
+    async def test_wait_for_refresh_trigger_times_out(self) -> None:
+        woken_up = await self.vehicle_state.wait_for_refresh_trigger(0.01)
+        assert woken_up is False
+
+    async def test_wait_for_refresh_trigger_wakes_up_on_refresh_mode_change(
+        self,
+    ) -> None:
+        self.vehicle_state.configure_missing()
+        waiter = asyncio.create_task(self.vehicle_state.wait_for_refresh_trigger(10))
+        await asyncio.sleep(0)
+        self.vehicle_state.set_refresh_mode(RefreshMode.FORCE, "test")
+        assert await asyncio.wait_for(waiter, 1) is True
+
+    async def test_wait_for_refresh_trigger_wakes_up_from_another_thread(
+        self,
+    ) -> None:
+        self.vehicle_state.configure_missing()
+        waiter = asyncio.create_task(self.vehicle_state.wait_for_refresh_trigger(10))
+        await asyncio.sleep(0)
+        await asyncio.to_thread(
+            self.vehicle_state.set_refresh_mode, RefreshMode.FORCE, "test"
+        )
+        assert await asyncio.wait_for(waiter, 1) is True
+
     @staticmethod
     def get_topic(sub_topic: str) -> str:
         return f"/vehicles/{VIN}/{sub_topic}"
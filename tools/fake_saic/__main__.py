@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+
+from fake_saic.fleet import (
+    DEFAULT_PARKED_TIME,
+    DEFAULT_TRIP_TIME,
+    FAKE_PASSWORD,
+    Fleet,
+    account_username,
+)
+from fake_saic.server import FakeSaicServer, ServerBehaviour
+
+LOG = logging.getLogger("fake_saic")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m fake_saic",
+        description="Serve a simulated fleet over an offline stand-in of the SAIC API.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    parser.add_argument(
+        "--base-path",
+        default="/",
+        help="Path prefix of the API, e.g. /api.app/v1/ like the real one",
+    )
+    parser.add_argument("--accounts", type=int, default=1)
+    parser.add_argument("--vehicles-per-account", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=1.0,
+        help="How much faster than real time the vehicles drive and charge",
+    )
+    parser.add_argument(
+        "--parked-time",
+        type=float,
+        default=DEFAULT_PARKED_TIME,
+        help="Mean time a vehicle stays parked, in simulated seconds",
+    )
+    parser.add_argument(
+        "--trip-time",
+        type=float,
+        default=DEFAULT_TRIP_TIME,
+        help="Mean duration of a trip, in simulated seconds",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Mean response time, in seconds"
+    )
+    parser.add_argument(
+        "--latency-jitter",
+        type=float,
+        default=0.0,
+        help="Uniform jitter around the mean response time, in seconds",
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of calls that fail"
+    )
+    parser.add_argument(
+        "--logout-rate",
+        type=float,
+        default=0.0,
+        help="Share of calls that invalidate the session token",
+    )
+    parser.add_argument(
+        "--hang-rate",
+        type=float,
+        default=0.0,
+        help="Share of calls that stall past the client timeout",
+    )
+    parser.add_argument(
+        "--hang-time",
+        type=float,
+        default=120.0,
+        help="How long a stalled call stalls, in seconds",
+    )
+    parser.add_argument(
+        "--event-id-retries",
+        type=int,
+        default=1,
+        help="Polls of an event id answered without data before the data comes",
+    )
+    parser.add_argument(
+        "--token-lifetime",
+        type=int,
+        default=24 * 60 * 60,
+        help="Lifetime of a session token, in seconds",
+    )
+    parser.add_argument("--log-level", default="INFO")
+    return parser
+
+
+async def serve(args: argparse.Namespace) -> None:
+    fleet = Fleet(
+        accounts=args.accounts,
+        vehicles_per_account=args.vehicles_per_account,
+        seed=args.seed,
+        time_scale=args.time_scale,
+        parked_time=args.parked_time,
+        trip_time=args.trip_time,
+    )
+    server = FakeSaicServer(
+        fleet,
+        host=args.host,
+        port=args.port,
+        base_path=args.base_path,
+        seed=args.seed,
+        behaviour=ServerBehaviour(
+            latency=args.latency,
+            latency_jitter=args.latency_jitter,
+            error_rate=args.error_rate,
+            logout_rate=args.logout_rate,
+            hang_rate=args.hang_rate,
+            hang_time=args.hang_time,
+            event_id_retries=args.event_id_retries,
+            token_lifetime=args.token_lifetime,
+        ),
+    )
+    await server.start()
+    LOG.info(
+        "Serving %d account(s) from %s to %s with password %r",
+        args.accounts,
+        account_username(0),
+        account_username(args.accounts - 1),
+        FAKE_PASSWORD,
+    )
+    # The load generator waits for this line to learn the port
+    print(f"READY {server.base_uri}", flush=True)
+    try:
+        await asyncio.Future()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    arguments = build_parser().parse_args()
+    logging.basicConfig(
+        level=arguments.log_level.upper(),
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    asyncio.run(serve(arguments))
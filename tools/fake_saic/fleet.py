@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from enum import Enum
+import hashlib
+import itertools
+import math
+import random
+import time
+from typing import TYPE_CHECKING, Any
+
+from saic_ismart_client_ng.api.message.schema import MessageEntity
+from saic_ismart_client_ng.api.schema import GpsPosition, GpsStatus
+from saic_ismart_client_ng.api.vehicle.schema import (
+    BasicVehicleStatus,
+    VehicleModelConfiguration,
+    VehicleStatusResp,
+    VinInfo,
+)
+from saic_ismart_client_ng.api.vehicle_charging.schema import (
+    ChrgMgmtData,
+    ChrgMgmtDataResp,
+    RvsChargeStatus,
+    ScheduledBatteryHeatingResp,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+FAKE_PASSWORD = "fake-password"  # noqa: S105
+FAKE_SERIES = "EH32 S"
+FAKE_BATTERY_CAPACITY = 64.0  # in kWh, the gateway default for the EH32 series
+
+# Defaults of the simulation, in simulated seconds unless stated otherwise
+DEFAULT_PARKED_TIME = 4 * 60 * 60
+DEFAULT_TRIP_TIME = 30 * 60
+DRIVING_SPEED = 50.0  # in km/h
+CONSUMPTION = 0.18  # in kWh/km
+CHARGING_POWER = 7.4  # in kW
+CHARGE_BELOW_SOC = 30.0
+CHARGE_TARGET_SOC = 90.0
+# The alarm list of an account keeps only the most recent messages
+MAX_MESSAGES = 200
+
+VEHICLE_START_MESSAGE_TYPE = "323"
+
+
+def account_username(account_index: int) -> str:
+    return f"user{account_index:04d}@example.com"
+
+
+def vehicle_vin(account_index: int, vehicle_index: int) -> str:
+    return f"FAKE{account_index:04d}{vehicle_index:09d}"
+
+
+def vin_hash(vin: str) -> str:
+    """How the SAIC API client sends a VIN."""
+    return hashlib.sha256(vin.encode()).hexdigest()
+
+
+def to_json_data(value: Any) -> Any:
+    """Turn an API dataclass into JSON data, leaving out the unset fields."""
+    if hasattr(value, "__dataclass_fields__"):
+        value = asdict(value)
+    if isinstance(value, dict):
+        return {k: to_json_data(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [to_json_data(v) for v in value]
+    return value
+
+
+class VehicleMode(Enum):
+    PARKED = "parked"
+    DRIVING = "driving"
+    CHARGING = "charging"
+
+
+class FakeVehicle:
+    """State machine of a simulated car: parked, driving or charging.
+
+    The state only moves forward when it is read, so an idle fleet costs
+    nothing. Simulated time runs `time_scale` times faster than real time.
+    """
+
+    def __init__(
+        self,
+        vin: str,
+        *,
+        rng: random.Random,
+        on_trip_started: Callable[[FakeVehicle], None],
+        clock: Callable[[], float],
+        time_scale: float = 1.0,
+        parked_time: float = DEFAULT_PARKED_TIME,
+        trip_time: float = DEFAULT_TRIP_TIME,
+    ) -> None:
+        self.vin = vin
+        self.vin_hash = vin_hash(vin)
+        self.__rng = rng
+        self.__on_trip_started = on_trip_started
+        self.__clock = clock
+        self.__time_scale = time_scale
+        self.__parked_time = parked_time
+        self.__trip_time = trip_time
+        self.__started_at = clock()
+        self.__sim_time = 0.0
+        self.mode = VehicleMode.PARKED
+        self.__mode_until = rng.expovariate(1 / parked_time)
+        self.soc = rng.uniform(20.0, 95.0)
+        self.mileage = rng.uniform(1_000.0, 60_000.0)  # in km
+        self.latitude = rng.uniform(45.0, 52.0)
+        self.longitude = rng.uniform(2.0, 12.0)
+        self.heading = rng.randrange(360)
+        self.locked = True
+        self.climate_on = False
+
+    @property
+    def speed(self) -> float:
+        return DRIVING_SPEED if self.mode is VehicleMode.DRIVING else 0.0
+
+    @property
+    def charging_power(self) -> float:
+        return CHARGING_POWER if self.mode is VehicleMode.CHARGING else 0.0
+
+    def vin_info(self) -> VinInfo:
+        return VinInfo(
+            vin=self.vin,
+            brandName="MG",
+            modelName="MG4 ELECTRIC",
+            modelYear="2023",
+            series=FAKE_SERIES,
+            colorName="Fake Grey",
+            isActivate=True,
+            vehicleModelConfiguration=[
+                VehicleModelConfiguration(itemCode="BType", itemValue="1"),
+                VehicleModelConfiguration(itemCode="HeatedSeat", itemValue="1"),
+                VehicleModelConfiguration(itemCode="S35", itemValue="0"),
+            ],
+        )
+
+    def advance(self) -> None:
+        now = (self.__clock() - self.__started_at) * self.__time_scale
+        while now >= self.__mode_until:
+            self.__progress(self.__mode_until - self.__sim_time)
+            self.__sim_time = self.__mode_until
+            self.__next_mode()
+        self.__progress(now - self.__sim_time)
+        self.__sim_time = now
+
+    def __progress(self, seconds: float) -> None:
+        hours = seconds / 3600
+        if self.mode is VehicleMode.DRIVING:
+            distance = DRIVING_SPEED * hours
+            self.mileage += distance
+            self.soc = max(
+                0.0, self.soc - distance * CONSUMPTION / FAKE_BATTERY_CAPACITY * 100
+            )
+            # 1 degree of latitude is about 111 km
+            self.latitude += distance / 111 * math.cos(math.radians(self.heading))
+            self.longitude += distance / 111 * math.sin(math.radians(self.heading))
+        elif self.mode is VehicleMode.CHARGING:
+            self.soc = min(
+                100.0, self.soc + CHARGING_POWER * hours / FAKE_BATTERY_CAPACITY * 100
+            )
+
+    def __next_mode(self) -> None:
+        if self.mode is not VehicleMode.PARKED:
+            self.__set_mode(
+                VehicleMode.PARKED, self.__rng.expovariate(1 / self.__parked_time)
+            )
+        elif self.soc < CHARGE_BELOW_SOC:
+            self.__start_charging()
+        else:
+            self.__start_trip()
+
+    def __set_mode(self, mode: VehicleMode, duration: float) -> None:
+        self.mode = mode
+        self.__mode_until = self.__sim_time + duration
+
+    def __start_trip(self) -> None:
+        self.heading = self.__rng.randrange(360)
+        self.locked = False
+        # Never drive the battery flat
+        max_trip = (
+            max(self.soc - 5.0, 0.0)
+            / 100
+            * FAKE_BATTERY_CAPACITY
+            / CONSUMPTION
+            / DRIVING_SPEED
+            * 3600
+        )
+        self.__set_mode(
+            VehicleMode.DRIVING,
+            min(self.__rng.expovariate(1 / self.__trip_time), max_trip),
+        )
+        self.__on_trip_started(self)
+
+    def __start_charging(self) -> None:
+        target = max(CHARGE_TARGET_SOC, self.soc)
+        self.__set_mode(
+            VehicleMode.CHARGING,
+            (target - self.soc) / 100 * FAKE_BATTERY_CAPACITY / CHARGING_POWER * 3600,
+        )
+
+    def start_charging(self) -> None:
+        self.advance()
+        if self.mode is VehicleMode.PARKED:
+            self.__start_charging()
+
+    def stop_charging(self) -> None:
+        self.advance()
+        if self.mode is VehicleMode.CHARGING:
+            self.__set_mode(
+                VehicleMode.PARKED, self.__rng.expovariate(1 / self.__parked_time)
+            )
+
+    def vehicle_status(self) -> VehicleStatusResp:
+        self.advance()
+        now = int(time.time())
+        driving = self.mode is VehicleMode.DRIVING
+        return VehicleStatusResp(
+            statusTime=now,
+            basicVehicleStatus=BasicVehicleStatus(
+                engineStatus=1 if driving else 0,
+                powerMode=2 if driving else 0,
+                handBrake=0 if driving else 1,
+                extendedData1=round(self.soc),
+                extendedData2=1 if self.mode is VehicleMode.CHARGING else 0,
+                batteryVoltage=125,
+                mileage=round(self.mileage * 10),
+                fuelRangeElec=round(
+                    self.soc / 100 * FAKE_BATTERY_CAPACITY / CONSUMPTION * 10
+                ),
+                interiorTemperature=21 if self.climate_on else 15,
+                exteriorTemperature=12,
+                remoteClimateStatus=2 if self.climate_on else 0,
+                lockStatus=1 if self.locked else 0,
+                driverDoor=0,
+                passengerDoor=0,
+                rearLeftDoor=0,
+                rearRightDoor=0,
+                bootStatus=0,
+                bonnetStatus=0,
+                driverWindow=0,
+                passengerWindow=0,
+                rearLeftWindow=0,
+                rearRightWindow=0,
+                sunroofStatus=0,
+                frontLeftTyrePressure=70,
+                frontRightTyrePressure=70,
+                rearLeftTyrePressure=70,
+                rearRightTyrePressure=70,
+            ),
+            gpsPosition=GpsPosition(
+                gpsStatus=GpsStatus.FIX_3d.value,
+                timeStamp=now,
+                wayPoint=GpsPosition.WayPoint(
+                    position=GpsPosition.WayPoint.Position(
+                        latitude=round(self.latitude * 1_000_000),
+                        longitude=round(self.longitude * 1_000_000),
+                        altitude=100,
+                    ),
+                    heading=self.heading,
+                    hdop=1,
+                    satellites=8,
+                    speed=round(self.speed * 10),
+                ),
+            ),
+        )
+
+    def charge_management_data(self) -> ChrgMgmtDataResp:
+        self.advance()
+        charging = self.mode is VehicleMode.CHARGING
+        voltage = 400.0
+        # Negative while charging, see ChrgMgmtData.decoded_current
+        current = -CHARGING_POWER * 1000 / voltage if charging else 0.0
+        return ChrgMgmtDataResp(
+            chrgMgmtData=ChrgMgmtData(
+                bmsPackCrntV=0,
+                bmsPackCrnt=round((current + 1000.0) * 20),
+                bmsPackVol=round(voltage * 4),
+                bmsPackSOCDsp=round(self.soc * 10),
+                bmsChrgSts=1 if charging else 0,
+                bmsOnBdChrgTrgtSOCDspCmd=7,
+                bmsEstdElecRng=round(
+                    self.soc / 100 * FAKE_BATTERY_CAPACITY / CONSUMPTION
+                ),
+                ccuEleccLckCtrlDspCmd=1 if charging else 0,
+                bmsPTCHeatReqDspCmd=0,
+            ),
+            rvsChargeStatus=RvsChargeStatus(
+                chargingGunState=1 if charging else 0,
+                chargingType=1 if charging else 0,
+                mileage=round(self.mileage * 10),
+                realtimePower=round(self.charging_power * 10),
+                totalBatteryCapacity=round(FAKE_BATTERY_CAPACITY * 10),
+                fuelRangeElec=round(
+                    self.soc / 100 * FAKE_BATTERY_CAPACITY / CONSUMPTION * 10
+                ),
+                workingVoltage=round(voltage * 10) if charging else 0,
+                workingCurrent=round(-current * 10) if charging else 0,
+            ),
+        )
+
+    @staticmethod
+    def battery_heating_schedule() -> ScheduledBatteryHeatingResp:
+        return ScheduledBatteryHeatingResp(startTime=0, status=0)
+
+
+class FakeAccount:
+    def __init__(self, username: str) -> None:
+        self.username = username
+        self.vehicles: dict[str, FakeVehicle] = {}
+        self.messages: list[MessageEntity] = []
+        self.__message_ids = itertools.count(1)
+
+    def add_message(self, vehicle: FakeVehicle, message_type: str, title: str) -> None:
+        self.messages.insert(
+            0,
+            MessageEntity(
+                messageId=next(self.__message_ids),
+                messageType=message_type,
+                title=title,
+                content=f"{title} ({vehicle.vin})",
+                messageTime=time.strftime("%Y-%m-%d %H:%M:%S"),
+                readStatus=0,
+                sender="fake-saic",
+                vin=vehicle.vin,
+            ),
+        )
+        del self.messages[MAX_MESSAGES:]
+
+    def on_trip_started(self, vehicle: FakeVehicle) -> None:
+        self.add_message(vehicle, VEHICLE_START_MESSAGE_TYPE, "Vehicle start")
+
+    def update_message(self, message_id: str | int | None, action: str | None) -> None:
+        for message in self.messages:
+            if str(message.messageId) != str(message_id):
+                continue
+            if action == "DELETE":
+                self.messages.remove(message)
+            else:
+                message.readStatus = 1
+            return
+
+
+class Fleet:
+    """The accounts and vehicles served by the fake SAIC API.
+
+    Account `i` is `account_username(i)` with the password `FAKE_PASSWORD` and
+    owns the vehicles `vehicle_vin(i, 0)` to `vehicle_vin(i, n - 1)`.
+    """
+
+    def __init__(
+        self,
+        *,
+        accounts: int,
+        vehicles_per_account: int,
+        seed: int = 0,
+        time_scale: float = 1.0,
+        parked_time: float = DEFAULT_PARKED_TIME,
+        trip_time: float = DEFAULT_TRIP_TIME,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.password_hash = hashlib.sha1(FAKE_PASSWORD.encode()).hexdigest()  # noqa: S324
+        self.accounts: dict[str, FakeAccount] = {}
+        self.vehicles_by_hash: dict[str, FakeVehicle] = {}
+        for account_index in range(accounts):
+            account = FakeAccount(account_username(account_index))
+            self.accounts[account.username] = account
+            for vehicle_index in range(vehicles_per_account):
+                vin = vehicle_vin(account_index, vehicle_index)
+                vehicle = FakeVehicle(
+                    vin,
+                    rng=random.Random(f"{seed}-{vin}"),  # noqa: S311
+                    on_trip_started=account.on_trip_started,
+                    clock=clock,
+                    time_scale=time_scale,
+                    parked_time=parked_time,
+                    trip_time=trip_time,
+                )
+                account.vehicles[vin] = vehicle
+                self.vehicles_by_hash[vehicle.vin_hash] = vehicle
+
+    def vehicle(
+        self, account: FakeAccount, vin_or_hash: str | None
+    ) -> FakeVehicle | None:
+        if vin_or_hash is None:
+            return None
+        vehicle = self.vehicles_by_hash.get(vin_or_hash) or account.vehicles.get(
+            vin_or_hash
+        )
+        if vehicle is None or vehicle.vin not in account.vehicles:
+            return None
+        return vehicle
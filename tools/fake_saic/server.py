@@ -0,0 +1,517 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+from collections import Counter, OrderedDict
+import contextlib
+from dataclasses import dataclass, field
+import itertools
+import json
+import logging
+import random
+import secrets
+import time
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qsl
+
+import httpx
+from saic_ismart_client_ng.api.message.schema import MessageResp
+from saic_ismart_client_ng.api.schema import LoginResp
+from saic_ismart_client_ng.api.vehicle.schema import (
+    RvcParamsId,
+    RvcReqType,
+    VehicleControlResp,
+    VehicleListResp,
+)
+from saic_ismart_client_ng.api.vehicle_charging.schema import ChargingControlResp
+from saic_ismart_client_ng.net.crypto import decrypt_request, encrypt_response
+
+from fake_saic.fleet import to_json_data
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from fake_saic.fleet import FakeAccount, FakeVehicle, Fleet
+
+LOG = logging.getLogger(__name__)
+
+STATS_PATH = "/_fake/stats"
+# Header reads are bounded so that a stuck client cannot pin a connection
+REQUEST_TIMEOUT = 60.0  # in seconds
+# Event ids the client never came back for are forgotten past this many
+MAX_PENDING_EVENTS = 10_000
+
+# Return codes of the SAIC API, see AbstractSaicApi.__deserialize in the client
+CODE_SUCCESS = 0
+CODE_INVALID_REQUEST = 2
+CODE_LOGOUT = 401
+CODE_SERVER_ERROR = 500
+
+
+@dataclass(kw_only=True, frozen=True)
+class ServerBehaviour:
+    """How the fake API misbehaves, the rates are per request."""
+
+    latency: float = 0.0  # in seconds
+    latency_jitter: float = 0.0  # in seconds
+    error_rate: float = 0.0
+    logout_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_time: float = 120.0  # in seconds
+    # How often a call with an event id answers "not ready yet" before the data
+    event_id_retries: int = 1
+    token_lifetime: int = 24 * 60 * 60  # in seconds
+
+
+@dataclass
+class ServerStats:
+    requests: Counter[str] = field(default_factory=Counter)
+    logins: int = 0
+    injected_errors: int = 0
+    injected_logouts: int = 0
+    injected_hangs: int = 0
+    open_connections: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": dict(self.requests),
+            "total_requests": self.requests.total(),
+            "logins": self.logins,
+            "injected_errors": self.injected_errors,
+            "injected_logouts": self.injected_logouts,
+            "injected_hangs": self.injected_hangs,
+            "open_connections": self.open_connections,
+        }
+
+
+class ApiError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+@dataclass(kw_only=True)
+class FakeRequest:
+    method: str
+    route: str
+    query: dict[str, str]
+    headers: httpx.Headers
+    body: bytes
+    account: FakeAccount | None = None
+
+    def json(self) -> dict[str, Any]:
+        data = json.loads(self.body) if self.body else {}
+        if not isinstance(data, dict):
+            raise ApiError(CODE_INVALID_REQUEST, "Expected a JSON object")
+        return data
+
+    def form(self) -> dict[str, str]:
+        return dict(parse_qsl(self.body.decode()))
+
+
+@dataclass(kw_only=True)
+class _Reply:
+    data: Any = None
+    code: int = CODE_SUCCESS
+    message: str = "success"
+    event_id: str | None = None
+
+    def as_json(self) -> str:
+        body: dict[str, Any] = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            body["data"] = to_json_data(self.data)
+        return json.dumps(body)
+
+
+@dataclass(kw_only=True, frozen=True)
+class _Route:
+    handler: Callable[[FakeRequest], Any]
+    authenticated: bool = True
+    with_event_id: bool = False
+
+
+class FakeSaicServer:
+    """Offline stand-in for the SAIC API, speaking its encrypted HTTP protocol.
+
+    Point the gateway `--saic-rest-uri` at `http://<host>:<port><base_path>`
+    and log in with the accounts of the fleet.
+    """
+
+    def __init__(
+        self,
+        fleet: Fleet,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        base_path: str = "/",
+        tenant_id: str = "459771",
+        behaviour: ServerBehaviour | None = None,
+        seed: int = 0,
+    ) -> None:
+        self.__fleet = fleet
+        self.__host = host
+        self.__port = port
+        self.__base_path = (
+            "/" + base_path.strip("/") + "/" if base_path.strip("/") else "/"
+        )
+        self.__tenant_id = tenant_id
+        self.__behaviour = behaviour or ServerBehaviour()
+        self.__rng = random.Random(seed)  # noqa: S311
+        self.__server: asyncio.Server | None = None
+        # Keep-alive connections, closed with the server
+        self.__connections: set[asyncio.StreamWriter] = set()
+        self.__tokens: dict[str, tuple[FakeAccount, float]] = {}
+        self.__pending_events: OrderedDict[str, int] = OrderedDict()
+        self.__event_ids = itertools.count(1)
+        self.stats = ServerStats()
+        self.__routes: dict[tuple[str, str], _Route] = {
+            ("POST", "/oauth/token"): _Route(handler=self.__login, authenticated=False),
+            ("GET", "/vehicle/list"): _Route(handler=self.__vehicle_list),
+            ("GET", "/user/timezone"): _Route(
+                handler=lambda _: {"timezone": "GMT+01:00"}
+            ),
+            ("GET", "/vehicle/alarmSwitch"): _Route(handler=lambda _: {}),
+            ("PUT", "/vehicle/alarmSwitch"): _Route(handler=lambda _: None),
+            ("GET", "/vehicle/status"): _Route(
+                handler=self.__vehicle_status, with_event_id=True
+            ),
+            ("GET", "/vehicle/charging/mgmtData"): _Route(
+                handler=self.__charge_management_data, with_event_id=True
+            ),
+            ("GET", "/charging/batteryHeating"): _Route(
+                handler=self.__battery_heating_schedule
+            ),
+            ("PUT", "/charging/batteryHeating"): _Route(handler=lambda _: {}),
+            ("GET", "/message/list"): _Route(handler=self.__message_list),
+            ("GET", "/message/unreadCount"): _Route(handler=self.__unread_count),
+            ("PUT", "/message/status"): _Route(handler=self.__message_status),
+            ("POST", "/vehicle/control"): _Route(
+                handler=self.__vehicle_control, with_event_id=True
+            ),
+            ("POST", "/vehicle/charging/control"): _Route(
+                handler=self.__charging_control, with_event_id=True
+            ),
+            ("POST", "/vehicle/charging/setting"): _Route(
+                handler=self.__accept_vehicle_command, with_event_id=True
+            ),
+            ("POST", "/vehicle/charging/reservation"): _Route(
+                handler=self.__accept_vehicle_command, with_event_id=True
+            ),
+            ("POST", "/vehicle/charging/ptcHeat"): _Route(
+                handler=self.__accept_vehicle_command, with_event_id=True
+            ),
+        }
+
+    @property
+    def port(self) -> int | None:
+        """The port actually bound, resolves port 0 once started."""
+        if self.__server is None or not self.__server.sockets:
+            return None
+        return int(self.__server.sockets[0].getsockname()[1])
+
+    @property
+    def base_uri(self) -> str:
+        return f"http://{self.__host}:{self.port}{self.__base_path}"
+
+    async def start(self) -> None:
+        self.__server = await asyncio.start_server(
+            self.__handle_connection, self.__host, self.__port
+        )
+        LOG.info("Fake SAIC API listening on %s", self.base_uri)
+
+    async def close(self) -> None:
+        if self.__server is None:
+            return
+        self.__server.close()
+        for writer in self.__connections:
+            writer.close()
+        await self.__server.wait_closed()
+        self.__server = None
+
+    async def serve(self) -> None:
+        """Serve until cancelled."""
+        await self.start()
+        try:
+            await asyncio.Future()
+        finally:
+            await self.close()
+
+    async def __handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.__connections.add(writer)
+        self.stats.open_connections += 1
+        try:
+            while await self.__handle_request(reader, writer):
+                pass
+        except (TimeoutError, ConnectionError, asyncio.IncompleteReadError) as e:
+            LOG.debug("Connection dropped: %s", e)
+        except Exception as e:
+            LOG.exception("Request failed unexpectedly", exc_info=e)
+        finally:
+            self.__connections.discard(writer)
+            self.stats.open_connections -= 1
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def __handle_request(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> bool:
+        """Answer one request, returns whether the connection stays open."""
+        async with asyncio.timeout(REQUEST_TIMEOUT):
+            request_line = (await reader.readline()).decode("latin-1")
+            if not request_line.strip():
+                return False
+            headers = httpx.Headers()
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip()] = value.strip()
+            body = await reader.readexactly(int(headers.get("Content-Length", "0")))
+
+        parts = request_line.split()
+        if len(parts) < 3:
+            self.__write(writer, "400 Bad Request", httpx.Headers(), b"Bad request\n")
+            return False
+        status, response_headers, payload = await self.__respond(
+            parts[0], parts[1], headers, body
+        )
+        keep_alive = str(headers.get("Connection", "")).lower() != "close"
+        if not keep_alive:
+            response_headers["Connection"] = "close"
+        self.__write(writer, status, response_headers, payload)
+        await writer.drain()
+        return keep_alive
+
+    @staticmethod
+    def __write(
+        writer: asyncio.StreamWriter,
+        status: str,
+        headers: httpx.Headers,
+        payload: bytes,
+    ) -> None:
+        head = "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        writer.write(
+            (
+                f"HTTP/1.1 {status}\r\n{head}Content-Length: {len(payload)}\r\n\r\n"
+            ).encode("latin-1")
+            + payload
+        )
+
+    async def __respond(
+        self, method: str, target: str, headers: httpx.Headers, body: bytes
+    ) -> tuple[str, httpx.Headers, bytes]:
+        path, _, query = target.partition("?")
+        if path == STATS_PATH:
+            return (
+                "200 OK",
+                httpx.Headers({"Content-Type": "application/json"}),
+                json.dumps(self.stats.as_dict()).encode(),
+            )
+        if not path.startswith(self.__base_path):
+            return "404 Not Found", httpx.Headers(), b"Not found\n"
+        # The path the client signs and encrypts the call with
+        request_path = target.removeprefix(self.__base_path.removesuffix("/"))
+        route_path = path.removeprefix(self.__base_path.removesuffix("/"))
+        route = self.__routes.get((method, route_path))
+        if route is None:
+            return "404 Not Found", httpx.Headers(), b"Not found\n"
+
+        self.stats.requests[route_path] += 1
+        await self.__simulate_latency()
+        request = FakeRequest(
+            method=method,
+            route=route_path,
+            query=dict(parse_qsl(query)),
+            headers=headers,
+            body=decrypt_request(
+                original_request_url=request_path,
+                original_request_headers=headers,
+                original_request_content=body.decode(),
+                base_uri="/",
+            ),
+        )
+        reply = await self.__dispatch(route, request)
+
+        response_headers = httpx.Headers({"Content-Type": "application/json"})
+        if reply.event_id is not None:
+            response_headers["event-id"] = reply.event_id
+        # encrypt_response updates the headers in place
+        content, _ = encrypt_response(
+            original_request_url=request_path,
+            original_response_headers=response_headers,
+            original_response_content=reply.as_json(),
+            response_timestamp_ms=int(time.time() * 1000),
+            base_uri="/",
+            tenant_id=self.__tenant_id,
+            user_token=headers.get("blade-auth", ""),
+        )
+        payload = content.encode() if isinstance(content, str) else content
+        return "200 OK", response_headers, payload
+
+    async def __simulate_latency(self) -> None:
+        behaviour = self.__behaviour
+        delay = behaviour.latency + self.__rng.uniform(
+            -behaviour.latency_jitter, behaviour.latency_jitter
+        )
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def __dispatch(self, route: _Route, request: FakeRequest) -> _Reply:
+        try:
+            if route.authenticated:
+                request.account = self.__authenticate(request)
+                await self.__inject_faults(request)
+            if route.with_event_id and (reply := self.__await_event(request)):
+                return reply
+            return _Reply(data=route.handler(request))
+        except ApiError as e:
+            return _Reply(code=e.code, message=e.message)
+
+    def __authenticate(self, request: FakeRequest) -> FakeAccount:
+        token = request.headers.get("blade-auth", "")
+        account, expires_at = self.__tokens.get(token, (None, 0.0))
+        if account is None or expires_at < time.monotonic():
+            self.__tokens.pop(token, None)
+            raise ApiError(CODE_LOGOUT, "Unauthorized")
+        return account
+
+    async def __inject_faults(self, request: FakeRequest) -> None:
+        behaviour = self.__behaviour
+        draw = self.__rng.random()
+        if draw < behaviour.hang_rate:
+            self.stats.injected_hangs += 1
+            await asyncio.sleep(behaviour.hang_time)
+            return
+        draw -= behaviour.hang_rate
+        if draw < behaviour.logout_rate:
+            self.stats.injected_logouts += 1
+            self.__tokens.pop(request.headers.get("blade-auth", ""), None)
+            raise ApiError(CODE_LOGOUT, "Injected logout")
+        draw -= behaviour.logout_rate
+        if draw < behaviour.error_rate:
+            self.stats.injected_errors += 1
+            raise ApiError(CODE_SERVER_ERROR, "Injected failure")
+
+    def __await_event(self, request: FakeRequest) -> _Reply | None:
+        """Answer "not ready yet" the configured number of times per event."""
+        event_id = request.headers.get("event-id", "0")
+        remaining = self.__pending_events.pop(event_id, None)
+        if remaining is None:
+            remaining = self.__behaviour.event_id_retries
+            event_id = str(next(self.__event_ids))
+        if remaining <= 0:
+            return None
+        self.__pending_events[event_id] = remaining - 1
+        while len(self.__pending_events) > MAX_PENDING_EVENTS:
+            self.__pending_events.popitem(last=False)
+        return _Reply(event_id=event_id)
+
+    def __vehicle(self, request: FakeRequest, vin_hash: str | None) -> FakeVehicle:
+        assert request.account is not None
+        vehicle = self.__fleet.vehicle(request.account, vin_hash)
+        if vehicle is None:
+            raise ApiError(CODE_INVALID_REQUEST, "Unknown vehicle")
+        return vehicle
+
+    def __login(self, request: FakeRequest) -> LoginResp:
+        form = request.form()
+        account = self.__fleet.accounts.get(form.get("username", ""))
+        if account is None or form.get("password") != self.__fleet.password_hash:
+            raise ApiError(CODE_INVALID_REQUEST, "Invalid username or password")
+        token = secrets.token_hex(16)
+        lifetime = self.__behaviour.token_lifetime
+        self.__tokens[token] = (account, time.monotonic() + lifetime)
+        self.stats.logins += 1
+        return LoginResp(
+            access_token=token,
+            account=account.username,
+            expires_in=lifetime,
+            tenant_id=self.__tenant_id,
+            token_type="bearer",  # noqa: S106
+            user_name=account.username,
+        )
+
+    @staticmethod
+    def __vehicle_list(request: FakeRequest) -> VehicleListResp:
+        assert request.account is not None
+        return VehicleListResp(
+            vinList=[v.vin_info() for v in request.account.vehicles.values()]
+        )
+
+    def __vehicle_status(self, request: FakeRequest) -> Any:
+        return self.__vehicle(request, request.query.get("vin")).vehicle_status()
+
+    def __charge_management_data(self, request: FakeRequest) -> Any:
+        vehicle = self.__vehicle(request, request.query.get("vin"))
+        return vehicle.charge_management_data()
+
+    def __battery_heating_schedule(self, request: FakeRequest) -> Any:
+        vehicle = self.__vehicle(request, request.query.get("vin"))
+        return vehicle.battery_heating_schedule()
+
+    @staticmethod
+    def __message_list(request: FakeRequest) -> MessageResp:
+        assert request.account is not None
+        messages = request.account.messages
+        if request.query.get("messageGroup") != "ALARM":
+            messages = []
+        page_num = max(int(request.query.get("pageNum", "1")), 1)
+        page_size = max(int(request.query.get("pageSize", "20")), 1)
+        page = messages[(page_num - 1) * page_size : page_num * page_size]
+        return MessageResp(
+            messages=page,
+            alarmNumber=sum(1 for m in messages if m.readStatus == 0),
+            recordsNumber=len(page),
+            totalNumber=len(messages),
+        )
+
+    @staticmethod
+    def __unread_count(request: FakeRequest) -> MessageResp:
+        assert request.account is not None
+        unread = sum(1 for m in request.account.messages if m.readStatus == 0)
+        return MessageResp(alarmNumber=unread, commandNumber=0, newsNumber=0)
+
+    @staticmethod
+    def __message_status(request: FakeRequest) -> None:
+        assert request.account is not None
+        body = request.json()
+        request.account.update_message(body.get("messageId"), body.get("actionType"))
+
+    def __vehicle_control(self, request: FakeRequest) -> VehicleControlResp:
+        body = request.json()
+        vehicle = self.__vehicle(request, body.get("vin"))
+        request_type = str(body.get("rvcReqType"))
+        if request_type == RvcReqType.CLOSE_LOCKS.value:
+            vehicle.locked = True
+        elif request_type == RvcReqType.OPEN_LOCKS.value:
+            vehicle.locked = False
+        elif request_type == RvcReqType.CLIMATE.value:
+            fan_speed = next(
+                (
+                    base64.b64decode(p.get("paramValue", ""))
+                    for p in body.get("rvcParams") or []
+                    if p.get("paramId") == RvcParamsId.FAN_SPEED.value
+                ),
+                b"\x00",
+            )
+            vehicle.climate_on = fan_speed != b"\x00"
+        return VehicleControlResp(
+            basicVehicleStatus=vehicle.vehicle_status().basicVehicleStatus,
+            rvcReqType=request_type,
+        )
+
+    def __charging_control(self, request: FakeRequest) -> ChargingControlResp:
+        body = request.json()
+        vehicle = self.__vehicle(request, body.get("vin"))
+        if body.get("chrgCtrlReq") == 1:
+            vehicle.start_charging()
+        elif body.get("chrgCtrlReq") == 2:
+            vehicle.stop_charging()
+        data = vehicle.charge_management_data().chrgMgmtData
+        return ChargingControlResp(bmsChrgSts=data.bmsChrgSts if data else None)
+
+    def __accept_vehicle_command(self, request: FakeRequest) -> dict[str, Any]:
+        self.__vehicle(request, request.json().get("vin"))
+        return {}
@@ -0,0 +1,354 @@
+"""Measure the gateway under a simulated fleet served by the fake SAIC API.
+
+Run from the repository root, e.g.:
+
+    PYTHONPATH=src python tools/load_generator.py --accounts 10 \
+        --vehicles-per-account 5 --duration 600 --latency 0.3
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+from dataclasses import asdict, dataclass
+import json
+import logging
+import os
+from pathlib import Path
+import resource
+import sys
+import time
+from typing import TYPE_CHECKING
+
+import httpx
+
+from configuration import Configuration, SaicAccount
+from fake_saic.fleet import FAKE_PASSWORD, account_username
+from fake_saic.server import STATS_PATH
+from handlers.vehicle import POLL_LATENCY_CHARGE_STATUS, POLL_LATENCY_VEHICLE_STATUS
+from log_config import setup_logging
+from metrics import (
+    OUTCOME_ERROR,
+    OUTCOME_SUCCESS,
+    OUTCOME_TIMEOUT,
+    SAIC_API_CALL_DURATION,
+)
+from mqtt_gateway import MqttGateway
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+LOG = logging.getLogger("load_generator")
+
+TOOLS_DIR = Path(__file__).resolve().parent
+LOOP_LAG_PROBE_INTERVAL = 0.1  # in seconds
+FAKE_SERVER_START_TIMEOUT = 30.0  # in seconds
+
+
+@dataclass(kw_only=True, frozen=True)
+class Sample:
+    elapsed: float  # in seconds
+    cpu_percent: float  # of one core
+    rss_mb: float
+    max_loop_lag: float  # in seconds, since the previous sample
+    polls: int  # successful vehicle status calls so far
+    failed_polls: int
+    poll_p50: float | None  # in seconds, since the start
+    poll_p95: float | None
+    charge_poll_p95: float | None
+    api_requests: int | None  # served by the fake SAIC API so far
+
+    def __str__(self) -> str:
+        return (
+            f"t={self.elapsed:6.0f}s cpu={self.cpu_percent:5.1f}%"
+            f" rss={self.rss_mb:6.1f}MB lag={self.max_loop_lag * 1000:6.1f}ms"
+            f" polls={self.polls} failed={self.failed_polls}"
+            f" p50={_format_seconds(self.poll_p50)} p95={_format_seconds(self.poll_p95)}"
+            f" charge_p95={_format_seconds(self.charge_poll_p95)}"
+            f" api_requests={self.api_requests}"
+        )
+
+
+def _format_seconds(value: float | None) -> str:
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def current_rss_mb() -> float:
+    try:
+        resident_pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Peak rather than current usage, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LoopLagProbe:
+    """Keep the worst event loop lag seen since it was last taken."""
+
+    def __init__(self, interval: float = LOOP_LAG_PROBE_INTERVAL) -> None:
+        self.__interval = interval
+        self.__max_lag = 0.0
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started_at = loop.time()
+            await asyncio.sleep(self.__interval)
+            lag = loop.time() - started_at - self.__interval
+            self.__max_lag = max(self.__max_lag, lag)
+
+    def take(self) -> float:
+        lag, self.__max_lag = self.__max_lag, 0.0
+        return lag
+
+
+@contextlib.asynccontextmanager
+async def fake_saic_server(args: argparse.Namespace) -> AsyncIterator[str]:
+    """Run the fake SAIC API in its own process, so it does not skew the CPU usage."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (str(TOOLS_DIR), os.environ.get("PYTHONPATH")) if p
+    )
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "fake_saic",
+        "--port=0",
+        f"--accounts={args.accounts}",
+        f"--vehicles-per-account={args.vehicles_per_account}",
+        f"--seed={args.seed}",
+        f"--time-scale={args.time_scale}",
+        f"--latency={args.latency}",
+        f"--latency-jitter={args.latency_jitter}",
+        f"--error-rate={args.error_rate}",
+        f"--logout-rate={args.logout_rate}",
+        f"--hang-rate={args.hang_rate}",
+        f"--event-id-retries={args.event_id_retries}",
+        "--log-level=WARNING",
+        stdout=asyncio.subprocess.PIPE,
+        env=env,
+    )
+    try:
+        assert process.stdout is not None
+        async with asyncio.timeout(FAKE_SERVER_START_TIMEOUT):
+            while not (line := await process.stdout.readline()).startswith(b"READY "):
+                if not line:
+                    msg = "The fake SAIC API exited before it was ready"
+                    raise RuntimeError(msg)
+        yield line.decode().split()[1]
+    finally:
+        if process.returncode is None:
+            process.terminate()
+        await process.wait()
+
+
+def build_configuration(args: argparse.Namespace, saic_uri: str) -> Configuration:
+    config = Configuration()
+    config.saic_rest_uri = saic_uri
+    config.saic_accounts = [
+        SaicAccount(username=account_username(i), password=FAKE_PASSWORD)
+        for i in range(args.accounts)
+    ]
+    config.saic_read_timeout = args.read_timeout
+    if args.mqtt_host:
+        config.mqtt_host = args.mqtt_host
+        config.mqtt_port = args.mqtt_port
+        config.mqtt_client_id = f"saic-load-generator-{os.getpid()}"
+    config.ha_discovery_enabled = args.ha_discovery
+    return config
+
+
+async def pin_refresh_period(gateway: MqttGateway, seconds: int) -> None:
+    """Poll every vehicle at the same pace, whether it is driving or parked."""
+    while True:
+        for handler in gateway.vehicle_handlers.values():
+            state = handler.vehicle_state
+            state.set_refresh_period_active(seconds)
+            state.set_refresh_period_after_shutdown(seconds)
+            state.set_refresh_period_inactive(seconds)
+        await asyncio.sleep(1.0)
+
+
+class Sampler:
+    def __init__(self, probe: LoopLagProbe, saic_uri: str) -> None:
+        self.__probe = probe
+        self.__stats_uri = saic_uri.split("/", 3)[:3]
+        self.__started_at = time.monotonic()
+        self.__last_at = self.__started_at
+        self.__last_cpu = time.process_time()
+
+    async def sample(self, client: httpx.AsyncClient) -> Sample:
+        now, cpu = time.monotonic(), time.process_time()
+        cpu_percent = (cpu - self.__last_cpu) / max(now - self.__last_at, 1e-9) * 100
+        self.__last_at, self.__last_cpu = now, cpu
+        return Sample(
+            elapsed=now - self.__started_at,
+            cpu_percent=cpu_percent,
+            rss_mb=current_rss_mb(),
+            max_loop_lag=self.__probe.take(),
+            polls=SAIC_API_CALL_DURATION.count(
+                call=POLL_LATENCY_VEHICLE_STATUS, outcome=OUTCOME_SUCCESS
+            ),
+            failed_polls=sum(
+                SAIC_API_CALL_DURATION.count(
+                    call=POLL_LATENCY_VEHICLE_STATUS, outcome=outcome
+                )
+                for outcome in (OUTCOME_ERROR, OUTCOME_TIMEOUT)
+            ),
+            poll_p50=SAIC_API_CALL_DURATION.quantile(
+                0.5, call=POLL_LATENCY_VEHICLE_STATUS, outcome=OUTCOME_SUCCESS
+            ),
+            poll_p95=SAIC_API_CALL_DURATION.quantile(
+                0.95, call=POLL_LATENCY_VEHICLE_STATUS, outcome=OUTCOME_SUCCESS
+            ),
+            charge_poll_p95=SAIC_API_CALL_DURATION.quantile(
+                0.95, call=POLL_LATENCY_CHARGE_STATUS, outcome=OUTCOME_SUCCESS
+            ),
+            api_requests=await self.__api_requests(client),
+        )
+
+    async def __api_requests(self, client: httpx.AsyncClient) -> int | None:
+        try:
+            response = await client.get("/".join(self.__stats_uri) + STATS_PATH)
+            return int(response.json()["total_requests"])
+        except (httpx.HTTPError, ValueError, KeyError):
+            # Not served by the fake SAIC API
+            return None
+
+
+async def measure(args: argparse.Namespace, saic_uri: str) -> list[Sample]:
+    gateway = MqttGateway(build_configuration(args, saic_uri))
+    probe = LoopLagProbe()
+    sampler = Sampler(probe, saic_uri)
+    samples: list[Sample] = []
+    async with asyncio.TaskGroup() as tg, httpx.AsyncClient() as client:
+        gateway_task = tg.create_task(gateway.run(), name="gateway")
+        tasks = [gateway_task, tg.create_task(probe.run(), name="loop_lag_probe")]
+        if args.refresh_period:
+            tasks.append(
+                tg.create_task(
+                    pin_refresh_period(gateway, args.refresh_period),
+                    name="pin_refresh_period",
+                )
+            )
+        deadline = time.monotonic() + args.duration
+        while (remaining := deadline - time.monotonic()) > 0:
+            await asyncio.sleep(min(args.report_interval, remaining))
+            sample = await sampler.sample(client)
+            samples.append(sample)
+            print(sample, flush=True)
+        for task in tasks:
+            task.cancel()
+    return samples
+
+
+def summarize(samples: list[Sample]) -> dict[str, float | int | None]:
+    if not samples:
+        return {}
+    last = samples[-1]
+    return {
+        "duration": last.elapsed,
+        "mean_cpu_percent": sum(s.cpu_percent for s in samples) / len(samples),
+        "max_rss_mb": max(s.rss_mb for s in samples),
+        "max_loop_lag": max(s.max_loop_lag for s in samples),
+        "polls": last.polls,
+        "polls_per_second": last.polls / last.elapsed if last.elapsed else None,
+        "failed_polls": last.failed_polls,
+        "poll_p50": last.poll_p50,
+        "poll_p95": last.poll_p95,
+        "charge_poll_p95": last.charge_poll_p95,
+        "api_requests": last.api_requests,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with contextlib.AsyncExitStack() as stack:
+        saic_uri = args.saic_uri or await stack.enter_async_context(
+            fake_saic_server(args)
+        )
+        LOG.info(
+            "Load testing %d account(s) with %d vehicle(s) each against %s",
+            args.accounts,
+            args.vehicles_per_account,
+            saic_uri,
+        )
+        samples = await measure(args, saic_uri)
+
+    summary = summarize(samples)
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        await asyncio.to_thread(
+            Path(args.output).write_text,
+            json.dumps(
+                {
+                    "arguments": vars(args),
+                    "summary": summary,
+                    "samples": [asdict(s) for s in samples],
+                },
+                indent=2,
+            ),
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Run the gateway against a simulated fleet and report its CPU, memory and poll latency.",
+    )
+    parser.add_argument("--accounts", type=int, default=1)
+    parser.add_argument("--vehicles-per-account", type=int, default=1)
+    parser.add_argument(
+        "--duration", type=float, default=300.0, help="In seconds, default 300"
+    )
+    parser.add_argument(
+        "--report-interval", type=float, default=10.0, help="In seconds, default 10"
+    )
+    parser.add_argument("--output", help="Write the samples to this JSON file")
+    parser.add_argument(
+        "--saic-uri",
+        help="Use an already running fake SAIC API instead of starting one."
+        " It must serve at least --accounts accounts.",
+    )
+    parser.add_argument(
+        "--mqtt-host", help="Publish to this broker instead of the log publisher"
+    )
+    parser.add_argument("--mqtt-port", type=int, default=1883)
+    parser.add_argument(
+        "--no-ha-discovery",
+        dest="ha_discovery",
+        action="store_false",
+        help="Disable the Home Assistant discovery",
+    )
+    parser.add_argument(
+        "--refresh-period",
+        type=int,
+        help="Poll every vehicle this often, in seconds, whatever its state."
+        " By default parked vehicles are polled once a day.",
+    )
+    parser.add_argument(
+        "--read-timeout", type=float, default=10.0, help="SAIC API read timeout"
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Log every message published by the log publisher",
+    )
+    fake = parser.add_argument_group("fake SAIC API, see python -m fake_saic --help")
+    fake.add_argument("--seed", type=int, default=0)
+    fake.add_argument("--time-scale", type=float, default=1.0)
+    fake.add_argument("--latency", type=float, default=0.0)
+    fake.add_argument("--latency-jitter", type=float, default=0.0)
+    fake.add_argument("--error-rate", type=float, default=0.0)
+    fake.add_argument("--logout-rate", type=float, default=0.0)
+    fake.add_argument("--hang-rate", type=float, default=0.0)
+    fake.add_argument("--event-id-retries", type=int, default=1)
+    return parser
+
+
+if __name__ == "__main__":
+    arguments = build_parser().parse_args()
+    setup_logging()
+    if not arguments.verbose:
+        # The log publisher logs every message at DEBUG
+        logging.getLogger("publisher.log_publisher").setLevel(logging.WARNING)
+    asyncio.run(main(arguments))
@@ -0,0 +1,517 @@
+"""Benchmark the poll-to-publish pipeline of the gateway, without any network.
+
+Each poll runs `VehicleHandler.poll` against an in-memory fake SAIC API, then
+the vehicle state publishers, an in-memory publisher, the OpenWB integration
+and the ABRP and OsmAnd payload builders, whose HTTP calls are answered by a
+mock transport. Run from the repository root, e.g.:
+
+    PYTHONPATH=src python tools/poll_benchmark.py --output benchmark.json
+    PYTHONPATH=src python tools/poll_benchmark.py --baseline benchmark.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import defaultdict
+import contextlib
+import json
+import logging
+import math
+from pathlib import Path
+import platform
+import sys
+import time
+import tracemalloc
+from typing import TYPE_CHECKING, Any, override
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import httpx
+from saic_ismart_client_ng import SaicApi
+from saic_ismart_client_ng.model import SaicApiConfiguration
+
+from configuration import Configuration
+from fake_saic.fleet import FAKE_PASSWORD, Fleet, account_username
+from handlers.relogin import ReloginHandler
+from handlers.vehicle import VehicleHandler
+from integrations.abrp.api import AbrpApi
+from integrations.openwb import OpenWBIntegration
+from integrations.openwb.charging_station import ChargingStation
+from integrations.osmand.api import OsmAndApi
+from publisher.log_publisher import ConsolePublisher
+from vehicle import VehicleState
+from vehicle_info import VehicleInfo
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from saic_ismart_client_ng.api.vehicle.schema import VehicleStatusResp
+    from saic_ismart_client_ng.api.vehicle_charging import (
+        ChrgMgmtDataResp,
+        ScheduledBatteryHeatingResp,
+    )
+
+    from fake_saic.fleet import FakeVehicle
+    from publisher.core import PublishTransaction, WirePayload
+    from status_publisher.charge.chrg_mgmt_data_resp import (
+        ChrgMgmtDataRespProcessingResult,
+    )
+    from status_publisher.vehicle.vehicle_status_resp import (
+        VehicleStatusRespProcessingResult,
+    )
+
+LOG = logging.getLogger("poll_benchmark")
+
+DEFAULT_VEHICLE_COUNTS = (1, 10, 100, 1000)
+# Simulated time runs this much faster, so that vehicles drive and charge during a run
+DEFAULT_TIME_SCALE = 600.0
+OSMAND_SERVER_URI = "http://osmand.invalid"
+
+STAGE_POLL = "poll"
+STAGE_FETCH = "fetch"
+STAGE_VEHICLE_STATUS = "vehicle_status"
+STAGE_CHARGE_STATUS = "charge_status"
+STAGE_PUBLISH = "publish"
+STAGE_OPENWB = "openwb"
+STAGE_ABRP = "abrp"
+STAGE_OSMAND = "osmand"
+STAGES = (
+    STAGE_POLL,
+    STAGE_FETCH,
+    STAGE_VEHICLE_STATUS,
+    STAGE_CHARGE_STATUS,
+    STAGE_PUBLISH,
+    STAGE_OPENWB,
+    STAGE_ABRP,
+    STAGE_OSMAND,
+)
+
+
+class StageTimer:
+    """Collect the wall-clock durations of each stage, in seconds."""
+
+    def __init__(self) -> None:
+        self.samples: defaultdict[str, list[float]] = defaultdict(list)
+
+    @contextlib.contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[stage].append(time.perf_counter() - started)
+
+    def clear(self) -> None:
+        self.samples.clear()
+
+
+def percentile(samples: list[float], q: float) -> float | None:
+    """Nearest-rank percentile, `q` between 0 and 1."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+class FakeSaicApi(SaicApi):
+    """Answer the poll calls straight from the simulated vehicles."""
+
+    def __init__(self, vehicles: dict[str, FakeVehicle], timer: StageTimer) -> None:
+        super().__init__(
+            SaicApiConfiguration(username=account_username(0), password=FAKE_PASSWORD)
+        )
+        self.__vehicles = vehicles
+        self.__timer = timer
+
+    @override
+    async def get_vehicle_status(self, vin: str) -> VehicleStatusResp:
+        with self.__timer.time(STAGE_FETCH):
+            return self.__vehicles[vin].vehicle_status()
+
+    @override
+    async def get_vehicle_charging_management_data(self, vin: str) -> ChrgMgmtDataResp:
+        with self.__timer.time(STAGE_FETCH):
+            return self.__vehicles[vin].charge_management_data()
+
+    @override
+    async def get_vehicle_battery_heating_schedule(
+        self, vin: str
+    ) -> ScheduledBatteryHeatingResp:
+        with self.__timer.time(STAGE_FETCH):
+            return self.__vehicles[vin].battery_heating_schedule()
+
+
+class RecordingPublisher(ConsolePublisher):
+    """Keep count of the published messages instead of logging them."""
+
+    def __init__(self, configuration: Configuration, timer: StageTimer) -> None:
+        super().__init__(configuration)
+        self.__timer = timer
+        self.messages = 0
+        self.payload_bytes = 0
+
+    @override
+    def internal_publish(
+        self, key: str, value: WirePayload | None, *, retain: bool = True
+    ) -> None:
+        self.messages += 1
+        if isinstance(value, str | bytes | bytearray):
+            self.payload_bytes += len(value)
+
+    @override
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[PublishTransaction]:
+        # Only the outermost transaction flushes, when its block ends
+        with super().transaction() as transaction:
+            outermost = transaction.depth == 0
+            try:
+                yield transaction
+            finally:
+                flush_started = time.perf_counter()
+        if outermost:
+            self.__timer.samples[STAGE_PUBLISH].append(
+                time.perf_counter() - flush_started
+            )
+
+
+class TimedVehicleState(VehicleState):
+    def __init__(self, *args: Any, timer: StageTimer, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.__timer = timer
+
+    @override
+    def handle_vehicle_status(
+        self, vehicle_status: VehicleStatusResp
+    ) -> VehicleStatusRespProcessingResult:
+        with self.__timer.time(STAGE_VEHICLE_STATUS):
+            return super().handle_vehicle_status(vehicle_status)
+
+    @override
+    def handle_charge_status(
+        self, charge_info_resp: ChrgMgmtDataResp
+    ) -> ChrgMgmtDataRespProcessingResult:
+        with self.__timer.time(STAGE_CHARGE_STATUS):
+            return super().handle_charge_status(charge_info_resp)
+
+
+class TimedOpenWBIntegration(OpenWBIntegration):
+    def __init__(self, *args: Any, timer: StageTimer, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.__timer = timer
+
+    @override
+    def update_openwb(
+        self,
+        vehicle_status: VehicleStatusRespProcessingResult,
+        charge_status: ChrgMgmtDataRespProcessingResult | None,
+    ) -> None:
+        with self.__timer.time(STAGE_OPENWB):
+            super().update_openwb(vehicle_status, charge_status)
+
+
+def _accept_everything(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"status": "ok"}, request=request)
+
+
+MOCK_TRANSPORT = httpx.MockTransport(_accept_everything)
+
+
+class TimedAbrpApi(AbrpApi):
+    def __init__(self, *args: Any, timer: StageTimer, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.__timer = timer
+        self.client = httpx.AsyncClient(transport=MOCK_TRANSPORT)
+
+    @override
+    async def update_abrp(
+        self,
+        vehicle_status: VehicleStatusResp | None,
+        charge_info: ChrgMgmtDataResp | None,
+    ) -> tuple[bool, str]:
+        with self.__timer.time(STAGE_ABRP):
+            return await super().update_abrp(vehicle_status, charge_info)
+
+
+class TimedOsmAndApi(OsmAndApi):
+    def __init__(self, *args: Any, timer: StageTimer, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.__timer = timer
+        self.client = httpx.AsyncClient(transport=MOCK_TRANSPORT)
+
+    @override
+    async def update_osmand(
+        self,
+        vehicle_status: VehicleStatusResp | None,
+        charge_info: ChrgMgmtDataResp | None,
+    ) -> tuple[bool, str]:
+        with self.__timer.time(STAGE_OSMAND):
+            return await super().update_osmand(vehicle_status, charge_info)
+
+
+def build_configuration(vehicles: list[FakeVehicle]) -> Configuration:
+    config = Configuration()
+    config.ha_discovery_enabled = False
+    config.abrp_api_key = "benchmark"
+    config.abrp_token_map = {v.vin: f"token-{v.vin}" for v in vehicles}
+    config.charging_stations_by_vin = {
+        v.vin: ChargingStation(
+            vin=v.vin,
+            charge_state_topic=f"openWB/lp/{i}/boolChargeStat",
+            charging_value="1",
+            soc_topic=f"openWB/set/lp/{i}/%Soc",
+            soc_ts_topic=f"openWB/set/lp/{i}/socTimestamp",
+            range_topic=f"openWB/set/lp/{i}/rangeKm",
+            connected_topic=f"openWB/lp/{i}/boolPlugStat",
+            connected_value="1",
+            imported_energy_topic=f"openWB/lp/{i}/kWhCounter",
+        )
+        for i, v in enumerate(vehicles)
+    }
+    return config
+
+
+async def build_handlers(
+    vehicle_count: int, args: argparse.Namespace, timer: StageTimer
+) -> tuple[list[VehicleHandler], RecordingPublisher]:
+    fleet = Fleet(
+        accounts=1,
+        vehicles_per_account=vehicle_count,
+        seed=args.seed,
+        time_scale=args.time_scale,
+    )
+    vehicles = fleet.accounts[account_username(0)].vehicles
+    config = build_configuration(list(vehicles.values()))
+    publisher = RecordingPublisher(config, timer)
+    saic_api = FakeSaicApi(vehicles, timer)
+    scheduler = AsyncIOScheduler()
+    relogin_handler = ReloginHandler(
+        relogin_relay=config.saic_relogin_delay, api=saic_api, scheduler=scheduler
+    )
+    handlers = []
+    for vin, vehicle in vehicles.items():
+        info = VehicleInfo(vehicle.vin_info(), None)
+        vehicle_state = TimedVehicleState(
+            publisher,
+            scheduler,
+            f"{account_username(0)}/vehicles/{vin}",
+            info,
+            timer=timer,
+        )
+        handler = VehicleHandler(
+            config, relogin_handler, saic_api, publisher, info, vehicle_state
+        )
+        # Swap the integrations for timed ones whose HTTP calls never leave the process
+        await handler.abrp_api.close()
+        handler.openwb_integration = TimedOpenWBIntegration(
+            charging_station=config.charging_stations_by_vin[vin],
+            publisher=publisher,
+            timer=timer,
+        )
+        handler.abrp_api = TimedAbrpApi(
+            config.abrp_api_key, config.abrp_token_map[vin], timer=timer
+        )
+        handler.osmand_api = TimedOsmAndApi(
+            server_uri=OSMAND_SERVER_URI,
+            device_id=vin,
+            use_knots=config.osmand_use_knots,
+            timer=timer,
+        )
+        handlers.append(handler)
+    return handlers, publisher
+
+
+async def poll_round(handlers: list[VehicleHandler], timer: StageTimer) -> None:
+    for handler in handlers:
+        with timer.time(STAGE_POLL):
+            await handler.poll()
+    for handler in handlers:
+        await handler.abrp_queue.join()
+        await handler.osmand_queue.join()
+
+
+async def measure_memory(handlers: list[VehicleHandler]) -> dict[str, float]:
+    """Trace the memory of some more polls, one by one.
+
+    CPython does not count allocations, so the transient high-water mark of a
+    poll and what it leaves behind stand in for them.
+    """
+    peaks = []
+    tracemalloc.start()
+    try:
+        round_start, _ = tracemalloc.get_traced_memory()
+        for handler in handlers:
+            tracemalloc.reset_peak()
+            poll_start, _ = tracemalloc.get_traced_memory()
+            await handler.poll()
+            await handler.abrp_queue.join()
+            await handler.osmand_queue.join()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - poll_start)
+        round_end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kib_per_poll": sum(peaks) / len(peaks) / 1024,
+        "retained_bytes_per_poll": (round_end - round_start) / len(handlers),
+    }
+
+
+async def measure(vehicle_count: int, args: argparse.Namespace) -> dict[str, Any]:
+    timer = StageTimer()
+    handlers, publisher = await build_handlers(vehicle_count, args, timer)
+    try:
+        # The first round publishes every topic, later ones mostly the changes
+        await poll_round(handlers, timer)
+        timer.clear()
+        publisher.messages = publisher.payload_bytes = 0
+
+        rounds = max(math.ceil(args.polls / vehicle_count), args.min_rounds)
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        for _ in range(rounds):
+            await poll_round(handlers, timer)
+        wall = time.perf_counter() - wall_started
+        cpu = time.process_time() - cpu_started
+        polls = rounds * vehicle_count
+
+        stages = {}
+        for stage in STAGES:
+            samples = timer.samples.get(stage, [])
+            p50, p99 = percentile(samples, 0.5), percentile(samples, 0.99)
+            stages[stage] = {
+                "count": len(samples),
+                "p50_ms": None if p50 is None else p50 * 1000,
+                "p99_ms": None if p99 is None else p99 * 1000,
+            }
+        return {
+            "vehicles": vehicle_count,
+            "polls": polls,
+            "polls_per_second": polls / wall,
+            # The gateway runs on a single event loop, so this is per core
+            "polls_per_cpu_second": polls / cpu if cpu else None,
+            "messages_per_poll": publisher.messages / polls,
+            "payload_bytes_per_poll": publisher.payload_bytes / polls,
+            "stages": stages,
+            # Tracing is slow, a sample of the vehicles is enough
+            "memory": await measure_memory(handlers[: args.memory_polls]),
+        }
+    finally:
+        for handler in handlers:
+            await handler.close()
+
+
+def _format_ms(value: float | None) -> str:
+    return "-" if value is None else f"{value:.3f}"
+
+
+def print_result(result: dict[str, Any]) -> None:
+    memory = result["memory"]
+    print(
+        f"{result['vehicles']} vehicle(s): {result['polls']} polls,"
+        f" {result['polls_per_cpu_second']:.0f} polls/CPU-s,"
+        f" {result['messages_per_poll']:.1f} messages/poll,"
+        f" peak {memory['peak_kib_per_poll']:.1f} KiB/poll,"
+        f" retained {memory['retained_bytes_per_poll']:.0f} B/poll"
+    )
+    for stage, stats in result["stages"].items():
+        print(
+            f"  {stage:<15} n={stats['count']:<7}"
+            f" p50={_format_ms(stats['p50_ms'])}ms p99={_format_ms(stats['p99_ms'])}ms"
+        )
+
+
+def _change(current: float | None, baseline: float | None) -> str:
+    if not current or not baseline:
+        return "-"
+    return f"{(current - baseline) / baseline * 100:+.1f}%"
+
+
+def print_comparison(results: list[dict[str, Any]], baseline: dict[str, Any]) -> None:
+    """Relative change of the throughput and of the p99 latencies, per vehicle count."""
+    baseline_by_count = {r["vehicles"]: r for r in baseline["results"]}
+    print(f"Compared to {baseline['python']} on {baseline['machine']}:")
+    for result in results:
+        previous = baseline_by_count.get(result["vehicles"])
+        if previous is None:
+            continue
+        print(
+            f"{result['vehicles']} vehicle(s): throughput"
+            f" {_change(result['polls_per_cpu_second'], previous['polls_per_cpu_second'])}"
+        )
+        for stage, stats in result["stages"].items():
+            previous_stats = previous["stages"].get(stage, {})
+            print(
+                f"  {stage:<15} p99"
+                f" {_change(stats['p99_ms'], previous_stats.get('p99_ms'))}"
+            )
+
+
+async def main(args: argparse.Namespace) -> None:
+    results = []
+    for vehicle_count in args.vehicles:
+        result = await measure(vehicle_count, args)
+        print_result(result)
+        results.append(result)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "arguments": vars(args),
+        "results": results,
+    }
+    if args.baseline:
+        baseline = json.loads(await asyncio.to_thread(Path(args.baseline).read_text))
+        print_comparison(results, baseline)
+    if args.output:
+        await asyncio.to_thread(
+            Path(args.output).write_text, json.dumps(report, indent=2)
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Measure the throughput, the per-stage latency and the memory of the poll-to-publish pipeline.",
+    )
+    parser.add_argument(
+        "--vehicles",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_VEHICLE_COUNTS),
+        help="Fleet sizes to measure, default 1 10 100 1000",
+    )
+    parser.add_argument(
+        "--polls",
+        type=int,
+        default=2000,
+        help="Minimum number of measured polls per fleet size, default 2000",
+    )
+    parser.add_argument(
+        "--min-rounds",
+        type=int,
+        default=2,
+        help="Minimum number of times every vehicle is polled, default 2",
+    )
+    parser.add_argument(
+        "--memory-polls",
+        type=int,
+        default=100,
+        help="Number of polls traced to measure the memory, default 100",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=DEFAULT_TIME_SCALE,
+        help=f"How much faster the simulated vehicles live, default {DEFAULT_TIME_SCALE:.0f}",
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument(
+        "--baseline", help="Compare with the results of a previous --output"
+    )
+    parser.add_argument("--log-level", default="WARNING")
+    return parser
+
+
+if __name__ == "__main__":
+    arguments = build_parser().parse_args()
+    logging.basicConfig(level=arguments.log_level.upper(), stream=sys.stderr)
+    asyncio.run(main(arguments))